@@ -0,0 +1,196 @@
+import logging
+from collections.abc import Callable
+from functools import lru_cache
+
+from gpt_teacher_db.gpt_teacher.models.chat_message import ChatMessage
+from langchain.agents import create_agent
+from langchain.messages import AIMessage, HumanMessage
+
+from app.agents.consolidation_agent.model import (
+	BatchConsolidation,
+	ConsolidationReply,
+)
+from app.agents.consolidation_agent.prompt import (
+	BATCH_PROMPT,
+	BATCH_SESSION,
+	SESSION_PROMPT,
+	SYSTEM_PROMPT,
+)
+from app.core.config import settings
+from app.llm import get_model_by_difficulty
+from app.llm.resilience import ResilienceMiddleware
+from app.llm.tokens import count_tokens
+
+TASK_DIFFICULTY = settings.CONSOLIDATION_DIFFICULTY
+
+ROLE_LABELS = {'user': 'Aluno', 'assistant': 'Professor'}
+
+# Sem a chamada da ferramenta de saída estruturada o agente pede de novo ao
+# modelo; o limite evita repetir isso indefinidamente (~3 chamadas)
+BATCH_RECURSION_LIMIT = 6
+
+logger = logging.getLogger(__name__)
+
+# Roda em segundo plano: sem hedge, a latência não importa
+resilience = ResilienceMiddleware(
+	difficulty=TASK_DIFFICULTY,
+	fallback=settings.LLM_FALLBACK_ENABLED,
+	attempt_timeout=settings.LLM_ATTEMPT_TIMEOUT_SECONDS,
+	deadline=settings.LLM_CALL_DEADLINE_SECONDS,
+	max_retries=settings.LLM_MAX_RETRIES,
+	backoff_base=settings.LLM_RETRY_BACKOFF_SECONDS,
+	backoff_max=settings.LLM_RETRY_BACKOFF_MAX_SECONDS,
+	hedge_after=0,
+)
+
+
+@lru_cache
+def get_consolidation_agent():
+	# O prompt de sistema é fixo: um único agente por processo
+	return create_agent(
+		model=get_model_by_difficulty(TASK_DIFFICULTY),
+		tools=[],
+		middleware=[resilience],
+		system_prompt=SYSTEM_PROMPT,
+	)
+
+
+@lru_cache
+def get_batch_consolidation_agent():
+	return create_agent(
+		model=get_model_by_difficulty(TASK_DIFFICULTY),
+		tools=[],
+		middleware=[resilience],
+		system_prompt=SYSTEM_PROMPT,
+		response_format=BatchConsolidation,
+	)
+
+
+def format_transcript(messages: list[ChatMessage]) -> str:
+	return '\n'.join(
+		f'{ROLE_LABELS.get(message.role, message.role)}: {message.content}'
+		for message in messages
+	)
+
+
+def transcript_tokens(messages: list[ChatMessage]) -> int:
+	return count_tokens(format_transcript(messages))
+
+
+def pack_batches[T](
+	items: list[T], tokens: Callable[[T], int]
+) -> list[list[T]]:
+	"""
+	Agrupa os itens (sessões) em lotes de até CONSOLIDATION_BATCH_SIZE
+	sessões e CONSOLIDATION_BATCH_MAX_TOKENS tokens de conversa. Conversas
+	acima de CONSOLIDATION_BATCH_SESSION_MAX_TOKENS ficam sozinhas.
+	"""
+	batches = []
+	current, used = [], 0
+	for item in items:
+		size = tokens(item)
+		if size > settings.CONSOLIDATION_BATCH_SESSION_MAX_TOKENS:
+			batches.append([item])
+			continue
+		if current and (
+			len(current) >= settings.CONSOLIDATION_BATCH_SIZE
+			or used + size > settings.CONSOLIDATION_BATCH_MAX_TOKENS
+		):
+			batches.append(current)
+			current, used = [], 0
+		current.append(item)
+		used += size
+	if current:
+		batches.append(current)
+	return batches
+
+
+def _log_usage(kind: str, message: AIMessage, sessions: int) -> None:
+	usage = message.usage_metadata or {}
+	logger.info(
+		'Consolidação %s: sessions=%s model=%s fallback=%s '
+		'prompt_tokens=%s completion_tokens=%s',
+		kind,
+		sessions,
+		message.response_metadata.get('model_name'),
+		message.response_metadata.get('model_fallback', False),
+		usage.get('input_tokens'),
+		usage.get('output_tokens'),
+	)
+
+
+async def generate_consolidation(
+	*,
+	problem_title: str,
+	problem_description: str,
+	messages: list[ChatMessage],
+) -> ConsolidationReply:
+	"""Resume a conversa de uma sessão encerrada para o professor"""
+	prompt = SESSION_PROMPT.format(
+		problem_title=problem_title,
+		problem_description=problem_description,
+		transcript=format_transcript(messages),
+	)
+	response = await get_consolidation_agent().ainvoke(
+		{'messages': [HumanMessage(content=prompt)]}
+	)
+	message = response['messages'][-1]
+	usage = message.usage_metadata or {}
+	metadata = message.response_metadata
+	_log_usage('individual', message, 1)
+	return ConsolidationReply(
+		content=message.text,
+		prompt_tokens=usage.get('input_tokens'),
+		completion_tokens=usage.get('output_tokens'),
+		model_name=metadata.get('model_name'),
+		model_fallback=metadata.get('model_fallback', False),
+	)
+
+
+async def generate_batch_consolidation(
+	*,
+	problem_title: str,
+	problem_description: str,
+	transcripts: dict[str, list[ChatMessage]],
+) -> dict[str, str]:
+	"""
+	Consolida várias sessões do mesmo problema em uma chamada, com saída
+	estruturada. Retorna a consolidação por id de sessão; sessões que o
+	modelo deixou de fora não aparecem no resultado.
+	"""
+	# Identificadores curtos no prompt, mapeados de volta para as sessões
+	keys = {
+		f'S{index}': session_id
+		for index, session_id in enumerate(transcripts, 1)
+	}
+	sessions = '\n\n'.join(
+		BATCH_SESSION.format(
+			key=key, transcript=format_transcript(transcripts[session_id])
+		)
+		for key, session_id in keys.items()
+	)
+	prompt = BATCH_PROMPT.format(
+		problem_title=problem_title,
+		problem_description=problem_description,
+		sessions=sessions,
+	)
+	response = await get_batch_consolidation_agent().ainvoke(
+		{'messages': [HumanMessage(content=prompt)]},
+		{'recursion_limit': BATCH_RECURSION_LIMIT},
+	)
+	result = response.get('structured_response')
+	if result is None:
+		raise ValueError('Batch consolidation without structured response')
+
+	# Saída estruturada por ferramenta: a última mensagem não é do modelo
+	message = next(
+		message
+		for message in reversed(response['messages'])
+		if isinstance(message, AIMessage)
+	)
+	_log_usage('em lote', message, len(keys))
+	return {
+		keys[item.session]: item.content
+		for item in result.consolidations
+		if item.session in keys and item.content.strip()
+	}
@@ -0,0 +1,20 @@
+from pydantic import BaseModel, Field
+
+
+class ConsolidationReply(BaseModel):
+	content: str = ''
+	prompt_tokens: int | None = None
+	completion_tokens: int | None = None
+	model_name: str | None = None
+	model_fallback: bool = False
+
+
+class SessionConsolidation(BaseModel):
+	session: str = Field(description='Identificador da sessão (ex.: S1)')
+	content: str = Field(description='Consolidação da sessão')
+
+
+class BatchConsolidation(BaseModel):
+	"""Saída estruturada da consolidação em lote"""
+
+	consolidations: list[SessionConsolidation]
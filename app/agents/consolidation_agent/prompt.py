@@ -0,0 +1,37 @@
+SYSTEM_PROMPT = """
+## PERSONA
+    Você é um Professor de Programação que acompanha o progresso dos alunos de uma turma.
+
+## TAREFA
+    Você receberá o problema e a conversa de tutoria entre o professor virtual e um aluno. Escreva a consolidação da sessão para o professor da turma:
+        1. O que o aluno tentou fazer e até onde chegou.
+        2. Dificuldades e erros recorrentes (sintaxe, lógica ou lacuna de conceito).
+        3. Conceitos explicados e dicas já dadas.
+        4. Próximos passos recomendados para o aluno.
+
+## REGRAS DE SAÍDA
+    - Texto curto, em tópicos, sem repetir a conversa.
+    - Não invente informações que não estão na conversa.
+"""
+
+SESSION_PROMPT = """
+## PROBLEMA
+{problem_title} - {problem_description}
+
+## CONVERSA
+{transcript}
+"""
+
+BATCH_PROMPT = """
+## PROBLEMA
+{problem_title} - {problem_description}
+
+## SESSÕES
+    Cada sessão abaixo é de um aluno diferente. Consolide cada uma separadamente, sem misturar informações entre elas, e devolva uma consolidação por sessão com o identificador dela.
+
+{sessions}
+"""
+
+BATCH_SESSION = """<session id="{key}">
+{transcript}
+</session>"""
@@ -0,0 +1,256 @@
+import asyncio
+import logging
+
+import anyio
+from gpt_teacher_db.gpt_teacher.models.chat_message import ChatMessage
+from gpt_teacher_db.gpt_teacher.models.problem import Problem
+from langchain.agents.structured_output import StructuredOutputError
+from langgraph.errors import GraphRecursionError
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.agents.consolidation_agent import (
+	generate_batch_consolidation,
+	generate_consolidation,
+	pack_batches,
+	transcript_tokens,
+)
+from app.core.config import settings
+from app.core.db import async_engine
+from app.cruds import chat_message as message_crud
+from app.cruds import consolidated as consolidated_crud
+from app.cruds import consolidation_job as job_crud
+from app.cruds import problem as problem_crud
+from app.llm.resilience import is_provider_error
+from app.models import ConsolidationJob
+from app.utils.notifier import consolidation_notifier
+
+logger = logging.getLogger(__name__)
+
+_tasks: list[asyncio.Task] = []
+_stats = {
+	'running': 0,
+	'completed': 0,
+	'retried': 0,
+	'failed': 0,
+	# Tarefas retomadas por outro worker (lease vencido): nada foi gravado
+	'lease_lost': 0,
+	'batch_calls': 0,
+	'single_calls': 0,
+}
+
+
+def _is_generation_error(error: Exception) -> bool:
+	"""
+	Falhas esperadas ao gerar a consolidação: resposta fora do formato,
+	vazia ou inválida, e erros do provedor. As demais são bugs ou falhas do
+	banco e derrubam o processamento das tarefas
+	"""
+	return isinstance(
+		error, (StructuredOutputError, GraphRecursionError, ValueError)
+	) or is_provider_error(error)
+
+
+async def _complete(
+	session: AsyncSession, job: ConsolidationJob, content: str | None
+) -> None:
+	if content is not None:
+		consolidated_crud.add_consolidated(
+			session, job.student_id, job.problem_id, job.session_id, content
+		)
+	# Uma consolidação por sessão: com a reserva perdida, quem retomou a
+	# tarefa é quem grava
+	if await job_crud.acomplete_consolidation_job(session, job) is None:
+		_stats['lease_lost'] += 1
+		return
+	_stats['completed'] += 1
+
+
+async def _fail(
+	session: AsyncSession, job: ConsolidationJob, error: Exception
+) -> None:
+	logger.error('Falha ao consolidar a sessão %s: %r', job.session_id, error)
+	await session.rollback()
+	finished = await job_crud.afail_consolidation_job(
+		session,
+		job,
+		repr(error),
+		settings.CONSOLIDATION_MAX_ATTEMPTS,
+		settings.CONSOLIDATION_RETRY_BACKOFF_SECONDS,
+	)
+	if finished is None:
+		_stats['lease_lost'] += 1
+	elif finished.status == 'failed':
+		_stats['failed'] += 1
+	else:
+		_stats['retried'] += 1
+
+
+async def _consolidate_batch(
+	session: AsyncSession,
+	problem: Problem,
+	batch: list[tuple[ConsolidationJob, list[ChatMessage]]],
+) -> None:
+	"""
+	Gera e grava as consolidações de um lote em uma chamada ao modelo. As
+	sessões que falham ou faltam na resposta do lote são geradas uma a uma
+	"""
+	contents = {}
+	held = await job_crud.arenew_consolidation_leases(
+		session, [job for job, _ in batch]
+	)
+	held_ids = {job.session_id for job in held}
+	_stats['lease_lost'] += len(batch) - len(held)
+	batch = [item for item in batch if item[0].session_id in held_ids]
+	if len(batch) > 1:
+		try:
+			_stats['batch_calls'] += 1
+			contents = await generate_batch_consolidation(
+				problem_title=problem.title,
+				problem_description=problem.description,
+				transcripts={
+					job.session_id: messages for job, messages in batch
+				},
+			)
+		except Exception as error:
+			if not _is_generation_error(error):
+				raise
+			logger.exception('Falha na consolidação em lote, gerando 1 a 1')
+
+	for job, messages in batch:
+		try:
+			content = contents.get(job.session_id)
+			if content is None:
+				if not await job_crud.arenew_consolidation_leases(
+					session, [job]
+				):
+					_stats['lease_lost'] += 1
+					continue
+				_stats['single_calls'] += 1
+				reply = await generate_consolidation(
+					problem_title=problem.title,
+					problem_description=problem.description,
+					messages=messages,
+				)
+				content = reply.content
+				if not content.strip():
+					raise ValueError('Empty consolidation')
+			await _complete(session, job, content)
+		except Exception as error:
+			if not _is_generation_error(error):
+				raise
+			await _fail(session, job, error)
+
+
+async def _consolidate(
+	session: AsyncSession, jobs: list[ConsolidationJob]
+) -> None:
+	problem = await problem_crud.aget_problem_by_id(
+		session, jobs[0].problem_id
+	)
+	if problem is None:
+		raise LookupError(f'Problem not found: {jobs[0].problem_id}')
+	session_ids = [job.session_id for job in jobs]
+	# Idempotente: a consolidação pode ter sido gravada por uma tentativa
+	# que caiu antes de marcar a tarefa como concluída
+	existing = await consolidated_crud.aget_consolidated_session_ids(
+		session, session_ids
+	)
+	transcripts = await message_crud.aget_session_transcripts(
+		session, [id for id in session_ids if id not in existing]
+	)
+	# Não segura a conexão durante as chamadas ao modelo
+	await session.commit()
+
+	pending = []
+	for job in jobs:
+		messages = transcripts.get(job.session_id)
+		# Já consolidada, ou sessão sem conversa: nada a gerar
+		if not messages:
+			await _complete(session, job, None)
+		else:
+			pending.append((job, messages))
+
+	batches = pack_batches(pending, lambda item: transcript_tokens(item[1]))
+	for batch in batches:
+		await _consolidate_batch(session, problem, batch)
+
+
+async def _process_jobs(
+	session: AsyncSession, jobs: list[ConsolidationJob]
+) -> None:
+	_stats['running'] += len(jobs)
+	try:
+		await _consolidate(session, jobs)
+	except asyncio.CancelledError:
+		# Desligamento: devolve as tarefas à fila sem contar a tentativa
+		with anyio.CancelScope(shield=True):
+			await session.rollback()
+			for job in jobs:
+				if job.status == 'running':
+					await job_crud.arelease_consolidation_job(session, job)
+		raise
+	except Exception as error:
+		# Erro inesperado: falha as tarefas ainda não finalizadas
+		logger.exception('Falha ao processar tarefas de consolidação')
+		for job in jobs:
+			if job.status == 'running':
+				await _fail(session, job, error)
+	finally:
+		_stats['running'] -= len(jobs)
+
+
+async def process_next_jobs() -> bool:
+	"""
+	Reserva e processa as próximas tarefas (até CONSOLIDATION_BATCH_SIZE do
+	mesmo problema); False se a fila está vazia
+	"""
+	async with AsyncSession(async_engine, expire_on_commit=False) as session:
+		jobs = await job_crud.aclaim_consolidation_batch(
+			session,
+			settings.CONSOLIDATION_BATCH_SIZE,
+			settings.CONSOLIDATION_LEASE_SECONDS,
+		)
+		if not jobs:
+			return False
+		await _process_jobs(session, jobs)
+	return True
+
+
+async def _run_worker() -> None:
+	with consolidation_notifier.listen('jobs') as listener:
+		while True:
+			try:
+				processed = await process_next_jobs()
+			except Exception:
+				logger.exception('Falha ao buscar tarefas de consolidação')
+				processed = False
+			if not processed:
+				# Acorda com novas tarefas deste processo ou após o intervalo
+				await listener.wait(settings.CONSOLIDATION_POLL_SECONDS)
+
+
+def start_consolidation_worker() -> None:
+	"""
+	Inicia os workers de consolidação do processo (startup da aplicação).
+
+	Cada processo da aplicação roda os seus; a fila no Postgres garante que
+	cada tarefa seja processada por um só.
+	"""
+	if _tasks or not settings.CONSOLIDATION_ENABLED:
+		return
+	for index in range(settings.CONSOLIDATION_WORKERS):
+		_tasks.append(
+			asyncio.create_task(_run_worker(), name=f'consolidation-{index}')
+		)
+
+
+async def stop_consolidation_worker() -> None:
+	"""Cancela os workers; tarefas em andamento voltam para a fila"""
+	for task in _tasks:
+		task.cancel()
+	await asyncio.gather(*_tasks, return_exceptions=True)
+	_tasks.clear()
+
+
+def get_consolidation_worker_stats() -> dict[str, int]:
+	return {'workers': len(_tasks), **_stats}
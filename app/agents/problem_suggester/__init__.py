@@ -0,0 +1,144 @@
+import asyncio
+from functools import lru_cache
+
+from langchain.agents import create_agent
+from langchain.messages import HumanMessage
+
+from app import storage
+from app.agents.problem_suggester.model import ProblemSuggestion
+from app.agents.problem_suggester.prompt import (
+	CHUNK,
+	SUGGEST_PROMPT,
+	SYSTEM_PROMPT,
+)
+from app.core.config import settings
+from app.llm import get_model_by_difficulty
+from app.llm.resilience import ResilienceMiddleware
+from app.utils.cache import LRUCache
+from app.utils.text_extraction import UnsupportedFileError, aextract_chunks
+
+TASK_DIFFICULTY = settings.PROBLEM_SUGGESTION_DIFFICULTY
+
+# Sem a chamada da ferramenta de saída estruturada o agente pede de novo ao
+# modelo; o limite evita repetir isso indefinidamente
+SUGGESTION_RECURSION_LIMIT = 6
+
+resilience = ResilienceMiddleware(
+	difficulty=TASK_DIFFICULTY,
+	fallback=settings.LLM_FALLBACK_ENABLED,
+	attempt_timeout=settings.LLM_ATTEMPT_TIMEOUT_SECONDS,
+	deadline=settings.LLM_CALL_DEADLINE_SECONDS,
+	max_retries=settings.LLM_MAX_RETRIES,
+	backoff_base=settings.LLM_RETRY_BACKOFF_SECONDS,
+	backoff_max=settings.LLM_RETRY_BACKOFF_MAX_SECONDS,
+	hedge_after=settings.LLM_HEDGE_AFTER_SECONDS,
+)
+
+# Por SHA-256 do arquivo: a mesma lista enviada em outra turma (ou pedida
+# de novo) não é extraída nem sugerida outra vez
+chunks_cache = LRUCache(settings.PROBLEM_SUGGESTION_CACHE_SIZE)
+suggestion_cache = LRUCache(settings.PROBLEM_SUGGESTION_CACHE_SIZE)
+
+
+@lru_cache
+def get_problem_suggester_agent():
+	return create_agent(
+		model=get_model_by_difficulty(TASK_DIFFICULTY),
+		tools=[],
+		middleware=[resilience],
+		system_prompt=SYSTEM_PROMPT,
+		response_format=ProblemSuggestion,
+	)
+
+
+def select_chunks(chunks: list[str], max_tokens: int) -> list[int]:
+	"""
+	Índices dos trechos enviados ao modelo: todos, se couberem em
+	`max_tokens`; senão o primeiro (em geral o enunciado) e os demais
+	espaçados ao longo do arquivo
+	"""
+	count = max(1, max_tokens // settings.PROBLEM_SUGGESTION_CHUNK_TOKENS)
+	if len(chunks) <= count:
+		return list(range(len(chunks)))
+	if count == 1:
+		return [0]
+	step = (len(chunks) - 1) / (count - 1)
+	return sorted({round(index * step) for index in range(count)})
+
+
+def _read_file(digest: str) -> bytes | None:
+	size = storage.stored_size(digest)
+	if size is None:
+		return None
+	# O arquivo inteiro vai para a memória (e para o processo de extração)
+	if size > settings.PROBLEM_SUGGESTION_MAX_FILE_BYTES:
+		raise storage.FileTooLargeError(
+			'File is larger than '
+			f'{settings.PROBLEM_SUGGESTION_MAX_FILE_BYTES} bytes'
+		)
+	if size == 0:
+		return b''
+	return b''.join(storage.read_file(digest, 0, size - 1))
+
+
+async def _get_chunks(digest: str, filename: str) -> list[str]:
+	chunks = chunks_cache.get(digest)
+	if chunks is None:
+		content = await asyncio.to_thread(_read_file, digest)
+		if content is None:
+			raise FileNotFoundError('File not found')
+		chunks = await aextract_chunks(content, filename)
+		chunks_cache.set(digest, chunks)
+	return chunks
+
+
+async def suggest_problem(file_url: str) -> ProblemSuggestion:
+	"""
+	Sugere título e descrição a partir do arquivo do problema (PDF,
+	Markdown ou texto).
+
+	FileNotFoundError se o arquivo não está no storage; FileTooLargeError
+	acima de PROBLEM_SUGGESTION_MAX_FILE_BYTES; UnsupportedFileError se não
+	há texto para extrair.
+	"""
+	stored = storage.parse_file_url(file_url)
+	if stored is None:
+		raise FileNotFoundError('File not found')
+	digest, filename = stored
+
+	suggestion = suggestion_cache.get(digest)
+	if suggestion is not None:
+		return suggestion
+
+	chunks = await _get_chunks(digest, filename)
+	if not chunks:
+		raise UnsupportedFileError('File has no text')
+
+	indexes = select_chunks(
+		chunks, settings.PROBLEM_SUGGESTION_MAX_INPUT_TOKENS
+	)
+	prompt = SUGGEST_PROMPT.format(
+		filename=filename,
+		chunks='\n\n'.join(
+			CHUNK.format(index=index + 1, text=chunks[index])
+			for index in indexes
+		),
+	)
+	response = await get_problem_suggester_agent().ainvoke(
+		{'messages': [HumanMessage(content=prompt)]},
+		{'recursion_limit': SUGGESTION_RECURSION_LIMIT},
+	)
+	suggestion = response.get('structured_response')
+	if suggestion is None:
+		raise ValueError('Problem suggestion without structured response')
+
+	suggestion_cache.set(digest, suggestion)
+	return suggestion
+
+
+def get_problem_suggestion_stats() -> dict[str, dict]:
+	return {
+		'texts': chunks_cache.stats(),
+		'suggestions': suggestion_cache.stats(),
+		'resilience': resilience.stats(),
+	}
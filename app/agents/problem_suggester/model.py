@@ -0,0 +1,8 @@
+from pydantic import BaseModel, Field
+
+
+class ProblemSuggestion(BaseModel):
+	"""Saída estruturada da sugestão de problema"""
+
+	title: str = Field(description='Título do problema')
+	description: str = Field(description='Descrição (enunciado) do problema')
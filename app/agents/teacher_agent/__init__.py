@@ -1,26 +1,65 @@
-from langchain.messages import HumanMessage
+import logging
+from collections.abc import AsyncIterator
+from hashlib import sha256
+
+from langchain.messages import AIMessage, AIMessageChunk, HumanMessage
 
 from app.llm import get_model_by_difficulty
-from app.agents.teacher_agent.prompt import SYSTEM_PROMPT
+from app.agents.teacher_agent.prompt import (
+	PROBLEM_PROMPT,
+	SYSTEM_PROMPT,
+	TURN_PROMPT,
+)
 from langchain_core.language_models import BaseChatModel
 from langchain.agents import create_agent
-from app.agents.teacher_agent.model import AgentInput
-from app.llm.db import get_db_uri
-from langgraph.checkpoint.postgres import PostgresSaver
+from app.agents.teacher_agent.cache import teacher_agent_cache
+from app.agents.teacher_agent.context import ContextWindowMiddleware
+from app.agents.teacher_agent.model import AgentInput, AgentReply
+from app.agents.teacher_agent.response_cache import (
+	estimate_tokens,
+	response_cache,
+)
+from app.core.config import settings
+from app.llm.checkpointer import get_checkpointer
+from app.llm.resilience import ResilienceMiddleware
+from app.llm.tokens import TokenUsageMiddleware, count_tokens
+from app.utils.telemetry import span
+from langgraph.checkpoint.base import BaseCheckpointSaver
 
 TASK_DIFFICULTY = 'MEDIUM'
 
+logger = logging.getLogger(__name__)
 
-def get_prompt(
-	*,
-	problem_title: str,
-	problem_description: str
-) -> str:
-	return SYSTEM_PROMPT.format(
-		**{
-			'problem_title': problem_title,
-			'problem_description': problem_description
-		}
+# Compartilhado por todos os agentes compilados (estatísticas globais)
+resilience = ResilienceMiddleware(
+	difficulty=TASK_DIFFICULTY,
+	fallback=settings.LLM_FALLBACK_ENABLED,
+	attempt_timeout=settings.LLM_ATTEMPT_TIMEOUT_SECONDS,
+	deadline=settings.LLM_CALL_DEADLINE_SECONDS,
+	max_retries=settings.LLM_MAX_RETRIES,
+	backoff_base=settings.LLM_RETRY_BACKOFF_SECONDS,
+	backoff_max=settings.LLM_RETRY_BACKOFF_MAX_SECONDS,
+	hedge_after=settings.LLM_HEDGE_AFTER_SECONDS,
+)
+# Resumo do contexto (ContextWindowMiddleware): mesma política, sem hedge
+summary_resilience = ResilienceMiddleware(
+	difficulty=settings.CONTEXT_SUMMARY_DIFFICULTY,
+	fallback=settings.LLM_FALLBACK_ENABLED,
+	attempt_timeout=settings.LLM_ATTEMPT_TIMEOUT_SECONDS,
+	deadline=settings.LLM_CALL_DEADLINE_SECONDS,
+	max_retries=settings.LLM_MAX_RETRIES,
+	backoff_base=settings.LLM_RETRY_BACKOFF_SECONDS,
+	backoff_max=settings.LLM_RETRY_BACKOFF_MAX_SECONDS,
+	hedge_after=0,
+)
+token_usage = TokenUsageMiddleware()
+
+
+def get_prompt(*, problem_title: str, problem_description: str) -> str:
+	# Prefixo fixo primeiro, bloco do problema depois (cache de prefixo)
+	return SYSTEM_PROMPT + PROBLEM_PROMPT.format(
+		problem_title=problem_title,
+		problem_description=problem_description,
 	)
 
 
@@ -28,46 +67,254 @@ def get_tools() -> list:
 	return []
 
 
+def get_middleware() -> list:
+	return [
+		ContextWindowMiddleware(
+			keep_turns=settings.CONTEXT_KEEP_TURNS,
+			summary_batch_turns=settings.CONTEXT_SUMMARY_BATCH_TURNS,
+			summary_resilience=summary_resilience
+			if settings.CONTEXT_SUMMARY_ENABLED
+			else None,
+		),
+		token_usage,
+		resilience,
+	]
+
+
 def get_teacher_agent(
 	*,
 	problem_title: str,
-	problem_description: str, 
-	checkpointer: PostgresSaver = None
+	problem_description: str,
+	checkpointer: BaseCheckpointSaver = None,
+	problem_id: str | None = None,
 ) -> BaseChatModel:
-	model = get_model_by_difficulty(TASK_DIFFICULTY)
-		
-	return create_agent(
-		model=model,
-		tools=get_tools(),
-		checkpointer=checkpointer,
-		system_prompt=get_prompt(
-			problem_title=problem_title,
-			problem_description=problem_description
-		)
+	system_prompt = get_prompt(
+		problem_title=problem_title, problem_description=problem_description
 	)
+	tools = get_tools()
 
+	# O grafo compilado só depende destes itens, então é reaproveitado
+	# entre mensagens do mesmo problema
+	cache_key = (
+		problem_id,
+		sha256(system_prompt.encode()).hexdigest(),
+		TASK_DIFFICULTY,
+		tuple(getattr(tool, 'name', repr(tool)) for tool in tools),
+		id(checkpointer),
+	)
+	agent = teacher_agent_cache.get(cache_key)
+	if agent is not None:
+		return agent
 
-def call_teacher_agent(agent_input: AgentInput) -> str:
-	DB_URI = get_db_uri()
+	agent = create_agent(
+		model=get_model_by_difficulty(TASK_DIFFICULTY),
+		tools=tools,
+		middleware=get_middleware(),
+		checkpointer=checkpointer,
+		system_prompt=system_prompt,
+	)
+	teacher_agent_cache.set(cache_key, agent)
+	return agent
 
-	with PostgresSaver.from_conn_string(DB_URI) as checkpointer:
-		checkpointer.setup()
-	
-		brain = get_teacher_agent(
-			problem_title=agent_input.problem_title,
-			problem_description=agent_input.problem_description, 
-			checkpointer=checkpointer
-		)
-	
-		response = brain.invoke(
-			{
-				'messages': [
-					HumanMessage(
-						content=f'* Código do Aluno: <student_code>{agent_input.student_code}</student_code>\n* Mensagem do Aluno: <student_message>{agent_input.user_message}</student_message>'
+
+def get_agent_payload(agent_input: AgentInput) -> tuple[dict, dict]:
+	"""Monta a entrada e a config (thread) do agente para um turno"""
+	return (
+		{
+			'messages': [
+				HumanMessage(
+					content=TURN_PROMPT.format(
+						student_code=agent_input.student_code,
+						user_message=agent_input.user_message,
 					)
-				]
-			},
-			{'configurable': {'thread_id': agent_input.session_id}},
+				)
+			]
+		},
+		{'configurable': {'thread_id': agent_input.session_id}},
+	)
+
+
+def get_token_usage_stats() -> dict[str, int | float]:
+	return {
+		**token_usage.stats(),
+		'static_prefix_tokens': count_tokens(SYSTEM_PROMPT),
+	}
+
+
+async def get_agent_for_input(agent_input: AgentInput) -> BaseChatModel:
+	return get_teacher_agent(
+		problem_title=agent_input.problem_title,
+		problem_description=agent_input.problem_description,
+		checkpointer=await get_checkpointer(),
+		problem_id=agent_input.problem_id,
+	)
+
+
+async def is_cacheable_turn(brain, agent_input: AgentInput) -> bool:
+	"""Só o primeiro turno da sessão não depende do histórico da conversa"""
+	if not settings.RESPONSE_CACHE_ENABLED:
+		return False
+
+	_, config = get_agent_payload(agent_input)
+	state = await brain.aget_state(config)
+	return not state.values.get('messages')
+
+
+async def get_cached_reply(brain, agent_input: AgentInput) -> str | None:
+	cached = response_cache.lookup(agent_input)
+	if cached is None:
+		return None
+
+	# Registra o turno no checkpointer para os próximos turnos terem contexto.
+	# O before_model não roda no hit: o código enviado é gravado aqui, para o
+	# próximo turno mandar o diff em relação a ele
+	payload, config = get_agent_payload(agent_input)
+	await brain.aupdate_state(
+		config,
+		{
+			'messages': [
+				*payload['messages'],
+				AIMessage(content=cached.content),
+			],
+			'last_student_code': agent_input.student_code,
+		},
+		as_node='model',
+	)
+	return cached.content
+
+
+def log_turn(agent_input: AgentInput, reply: AgentReply) -> AgentReply:
+	logger.info(
+		'Turno do agente: session=%s cached=%s model=%s fallback=%s '
+		'prompt_tokens=%s cached_prompt_tokens=%s completion_tokens=%s '
+		'estimated=%s',
+		agent_input.session_id,
+		reply.cached,
+		reply.model_name,
+		reply.model_fallback,
+		reply.prompt_tokens,
+		reply.cached_prompt_tokens,
+		reply.completion_tokens,
+		reply.usage_estimated,
+	)
+	return reply
+
+
+def add_usage(reply: AgentReply, usage: dict | None) -> None:
+	"""Soma o uso de tokens de uma chamada ao modelo na resposta do turno"""
+	if not usage:
+		return
+	output_tokens = usage['output_tokens']
+	reply.prompt_tokens = (reply.prompt_tokens or 0) + usage['input_tokens']
+	reply.completion_tokens = (reply.completion_tokens or 0) + output_tokens
+	# Tokens de entrada servidos do cache de prefixo do provedor
+	details = usage.get('input_token_details') or {}
+	if details.get('cache_read') is not None:
+		reply.cached_prompt_tokens = (
+			reply.cached_prompt_tokens or 0
+		) + details['cache_read']
+
+
+def add_model_info(reply: AgentReply, message: AIMessage) -> None:
+	"""Registra na resposta o modelo escolhido pela política de fallback"""
+	metadata = message.response_metadata
+	reply.model_name = metadata.get('model_name')
+	reply.model_tier = metadata.get('model_tier')
+	reply.model_fallback = metadata.get('model_fallback', False)
+	reply.usage_estimated = reply.usage_estimated or metadata.get(
+		'usage_estimated', False
+	)
+
+
+async def call_teacher_agent(agent_input: AgentInput) -> AgentReply:
+	with span('agent', 'build'):
+		brain = await get_agent_for_input(agent_input)
+
+	cacheable = await is_cacheable_turn(brain, agent_input)
+	if cacheable:
+		cached = await get_cached_reply(brain, agent_input)
+		if cached is not None:
+			return log_turn(
+				agent_input, AgentReply(content=cached, cached=True)
+			)
+
+	with span('agent', 'invoke'):
+		response = await brain.ainvoke(*get_agent_payload(agent_input))
+	message = response['messages'][-1]
+
+	reply = AgentReply(content=message.text)
+	add_usage(reply, message.usage_metadata)
+	add_model_info(reply, message)
+
+	if cacheable:
+		response_cache.store(
+			agent_input,
+			reply.content,
+			(reply.prompt_tokens or 0) + (reply.completion_tokens or 0)
+			or estimate_tokens(reply.content),
 		)
 
-		return response['messages'][-1].content
+	return log_turn(agent_input, reply)
+
+
+async def stream_teacher_agent(
+	agent_input: AgentInput, reply: AgentReply
+) -> AsyncIterator[tuple[str, str]]:
+	"""
+	Gera os eventos da resposta do agente conforme o modelo produz os tokens.
+
+	Emite ('token', texto) e, quando uma tentativa falha no meio e a chamada
+	é refeita (retentativa ou fallback), ('reset', '') para o cliente
+	descartar o texto parcial. `reply` é preenchida durante o streaming com
+	o conteúdo acumulado, o uso de tokens e o modelo usado.
+	"""
+	with span('agent', 'build'):
+		brain = await get_agent_for_input(agent_input)
+
+	cacheable = await is_cacheable_turn(brain, agent_input)
+	if cacheable:
+		cached = await get_cached_reply(brain, agent_input)
+		if cached is not None:
+			reply.content = cached
+			reply.cached = True
+			log_turn(agent_input, reply)
+			yield 'token', cached
+			return
+
+	payload, config = get_agent_payload(agent_input)
+	# Hedge desligado: duas respostas simultâneas misturariam os tokens
+	config['configurable']['hedge'] = False
+
+	run_id = None
+	async for mode, data in brain.astream(
+		payload, config, stream_mode=['messages', 'updates']
+	):
+		if mode == 'updates':
+			# Mensagem final do modelo, com uso de tokens e modelo escolhido
+			update = data.get('model') or {}
+			for message in update.get('messages', []):
+				if isinstance(message, AIMessage):
+					add_usage(reply, message.usage_metadata)
+					add_model_info(reply, message)
+			continue
+
+		chunk, metadata = data
+		# Ignora mensagens de outros nós do grafo (ex.: ferramentas)
+		if metadata.get('langgraph_node') != 'model':
+			continue
+		if not isinstance(chunk, AIMessageChunk) or not chunk.text:
+			continue
+		# Cada tentativa de chamada ao modelo é uma execução com outro id
+		if run_id != chunk.id:
+			if run_id is not None and reply.content:
+				reply.content = ''
+				yield 'reset', ''
+			run_id = chunk.id
+		reply.content += chunk.text
+		yield 'token', chunk.text
+
+	log_turn(agent_input, reply)
+	if cacheable and reply.content:
+		response_cache.store(
+			agent_input, reply.content, estimate_tokens(reply.content)
+		)
@@ -0,0 +1,14 @@
+from app.core.config import settings
+from app.utils.cache import LRUCache
+
+# Chave: (problem_id, hash do prompt, dificuldade, ferramentas, checkpointer)
+teacher_agent_cache = LRUCache(settings.TEACHER_AGENT_CACHE_SIZE)
+
+
+def invalidate_problem_agents(problem_id: str) -> int:
+	"""Descarta os agentes compilados de um problema (editado ou removido)"""
+	return teacher_agent_cache.discard_where(lambda key: key[0] == problem_id)
+
+
+def get_teacher_agent_cache_stats() -> dict[str, int | float]:
+	return teacher_agent_cache.stats()
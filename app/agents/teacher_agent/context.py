@@ -0,0 +1,241 @@
+import difflib
+import re
+from typing import NotRequired
+
+from langchain.agents.middleware import AgentMiddleware, AgentState
+from langchain_core.messages import (
+	AIMessage,
+	AnyMessage,
+	HumanMessage,
+	RemoveMessage,
+	SystemMessage,
+)
+from langgraph.graph.message import REMOVE_ALL_MESSAGES
+
+from app.agents.teacher_agent.prompt import (
+	SUMMARY_CODE,
+	SUMMARY_MESSAGE,
+	SUMMARY_PROMPT,
+)
+from app.llm import get_model_by_difficulty
+from app.llm.resilience import ResilienceMiddleware
+
+SUMMARY_MESSAGE_ID = 'conversation-summary'
+CODE_UNCHANGED_BLOCK = (
+	'<student_code_unchanged>'
+	'O código não mudou desde a última mensagem.'
+	'</student_code_unchanged>'
+)
+
+_STUDENT_CODE_RE = re.compile(r'<student_code>(.*?)</student_code>', re.DOTALL)
+
+
+class TeacherAgentState(AgentState):
+	# Último código completo enviado ao modelo, para mandar só o diff
+	last_student_code: NotRequired[str]
+	# Texto do resumo dos turnos removidos (sem o cabeçalho da mensagem)
+	conversation_summary: NotRequired[str]
+
+
+def _replace_student_code(content: str, previous: str | None) -> str | None:
+	"""
+	Troca o código repetido do aluno por um aviso ou por um diff.
+
+	Retorna None quando a mensagem deve ser mantida como está.
+	"""
+	match = _STUDENT_CODE_RE.search(content)
+	if not match or previous is None:
+		return None
+
+	code = match.group(1)
+	if code == previous:
+		block = CODE_UNCHANGED_BLOCK
+	else:
+		diff = '\n'.join(
+			difflib.unified_diff(
+				previous.splitlines(),
+				code.splitlines(),
+				'codigo_anterior',
+				'codigo_atual',
+				lineterm='',
+			)
+		)
+		if len(diff) >= len(code):
+			return None
+		block = f'<student_code_diff>{diff}</student_code_diff>'
+
+	return content[: match.start()] + block + content[match.end() :]
+
+
+def _split_turns(messages: list[AnyMessage]) -> list[int]:
+	"""Índices das mensagens do aluno, que iniciam cada turno"""
+	return [
+		index
+		for index, message in enumerate(messages)
+		if isinstance(message, HumanMessage)
+	]
+
+
+def _transcript(messages: list[AnyMessage]) -> str:
+	lines = []
+	for message in messages:
+		if isinstance(message, HumanMessage):
+			lines.append(f'Aluno: {message.text}')
+		elif isinstance(message, AIMessage) and message.text:
+			lines.append(f'Professor: {message.text}')
+	return '\n'.join(lines)
+
+
+class ContextWindowMiddleware(AgentMiddleware):
+	"""
+	Limita o contexto enviado ao modelo a cada turno.
+
+	- Mantém os últimos `keep_turns` turnos na íntegra e resume os anteriores
+	  em uma mensagem de sistema salva no checkpoint. O resumo é refeito a
+	  cada `summary_batch_turns` turnos excedentes.
+	- Envia apenas o diff do código do aluno quando ele já foi enviado antes.
+	"""
+
+	state_schema = TeacherAgentState
+
+	def __init__(
+		self,
+		*,
+		keep_turns: int,
+		summary_batch_turns: int,
+		summary_resilience: ResilienceMiddleware | None,
+	):
+		"""
+		`summary_resilience`: política (prazo, retentativas, fallback) das
+		chamadas de resumo, com a dificuldade do modelo; None desativa o
+		resumo
+		"""
+		super().__init__()
+		# O turno atual precisa ficar fora do resumo
+		if keep_turns < 1:
+			raise ValueError('keep_turns must be at least 1')
+		self.keep_turns = keep_turns
+		self.summary_batch_turns = summary_batch_turns
+		self.summary_resilience = summary_resilience
+
+	def _dedupe_code(self, state: TeacherAgentState) -> dict:
+		messages = state['messages']
+		if not messages or not isinstance(messages[-1], HumanMessage):
+			return {}
+
+		last = messages[-1]
+		match = _STUDENT_CODE_RE.search(last.text)
+		if not match:
+			return {}
+
+		update = {'last_student_code': match.group(1)}
+		content = _replace_student_code(
+			last.text, state.get('last_student_code')
+		)
+		if content is not None:
+			# Mesmo id: o reducer de mensagens substitui a mensagem original
+			update['messages'] = [HumanMessage(content=content, id=last.id)]
+		return update
+
+	def _summary_split(
+		self, messages: list[AnyMessage], summary: str | None
+	) -> tuple[str, list[AnyMessage], list[AnyMessage]] | None:
+		"""Separa (resumo atual, mensagens a resumir, mensagens mantidas)"""
+		if self.summary_resilience is None:
+			return None
+
+		if messages and messages[0].id == SUMMARY_MESSAGE_ID:
+			# Checkpoints anteriores ao conversation_summary
+			summary = summary or messages[0].text
+			messages = messages[1:]
+
+		turns = _split_turns(messages)
+		if len(turns) <= self.keep_turns + self.summary_batch_turns:
+			return None
+
+		cut = turns[-self.keep_turns]
+		return summary or '', messages[:cut], messages[cut:]
+
+	def _summary_update(
+		self, summary: str, kept: list[AnyMessage], code: str | None
+	) -> dict:
+		content = SUMMARY_MESSAGE.format(summary=summary)
+		# Sem nenhum código completo nos turnos mantidos, os avisos e diffs
+		# ficariam sem base: o resumo leva o código atual
+		if code is not None and not any(
+			isinstance(message, HumanMessage)
+			and _STUDENT_CODE_RE.search(message.text)
+			for message in kept
+		):
+			content += SUMMARY_CODE.format(code=code)
+		return {
+			'conversation_summary': summary,
+			'messages': [
+				RemoveMessage(id=REMOVE_ALL_MESSAGES),
+				SystemMessage(content=content, id=SUMMARY_MESSAGE_ID),
+				*kept,
+			],
+		}
+
+	def _summary_prompt(self, summary: str, older: list[AnyMessage]) -> str:
+		return SUMMARY_PROMPT.format(
+			summary=summary or '(vazio)', transcript=_transcript(older)
+		)
+
+	def _current_code(
+		self, state: TeacherAgentState, update: dict
+	) -> str | None:
+		return update.get('last_student_code', state.get('last_student_code'))
+
+	def _merge(self, state: TeacherAgentState, update: dict) -> list:
+		messages = list(state['messages'])
+		for message in update.get('messages', []):
+			if message.id == messages[-1].id:
+				messages[-1] = message
+		return messages
+
+	def before_model(self, state: TeacherAgentState, runtime) -> dict | None:
+		update = self._dedupe_code(state)
+
+		split = self._summary_split(
+			self._merge(state, update), state.get('conversation_summary')
+		)
+		if split:
+			summary, older, kept = split
+			prompt = self._summary_prompt(summary, older)
+			response, _ = self.summary_resilience.run(
+				lambda difficulty: get_model_by_difficulty(difficulty).invoke(
+					prompt
+				)
+			)
+			update.update(
+				self._summary_update(
+					response.text, kept, self._current_code(state, update)
+				)
+			)
+
+		return update or None
+
+	async def abefore_model(
+		self, state: TeacherAgentState, runtime
+	) -> dict | None:
+		update = self._dedupe_code(state)
+
+		split = self._summary_split(
+			self._merge(state, update), state.get('conversation_summary')
+		)
+		if split:
+			summary, older, kept = split
+			prompt = self._summary_prompt(summary, older)
+			response, _ = await self.summary_resilience.arun(
+				lambda difficulty: get_model_by_difficulty(difficulty).ainvoke(
+					prompt
+				)
+			)
+			update.update(
+				self._summary_update(
+					response.text, kept, self._current_code(state, update)
+				)
+			)
+
+		return update or None
@@ -7,3 +7,19 @@ class AgentInput(BaseModel):
 	problem_description: str
 	student_code: str
 	user_message: str
+	problem_id: str | None = None
+	classroom_id: str | None = None
+
+
+class AgentReply(BaseModel):
+	content: str = ''
+	prompt_tokens: int | None = None
+	# Parte de prompt_tokens lida do cache de prefixo do provedor
+	cached_prompt_tokens: int | None = None
+	completion_tokens: int | None = None
+	# Uso contado localmente (o provedor não informou)
+	usage_estimated: bool = False
+	cached: bool = False
+	model_name: str | None = None
+	model_tier: str | None = None
+	model_fallback: bool = False
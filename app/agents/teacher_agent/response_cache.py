@@ -0,0 +1,225 @@
+import ast
+import io
+import random
+import re
+import tokenize
+import unicodedata
+from collections import deque
+from dataclasses import dataclass
+from hashlib import blake2b, sha256
+from threading import Lock
+
+from app.agents.teacher_agent.model import AgentInput
+from app.core.config import settings
+from app.utils.cache import LRUCache
+
+_CODE_TOKEN_RE = re.compile(r'\w+|[^\w\s]')
+_MESSAGE_NOISE_RE = re.compile(r'[^\w\s]')
+
+_MINHASH_PRIME = (1 << 61) - 1
+SHINGLE_SIZE = 3
+# Códigos parecidos guardados por (turma, problema, mensagem)
+SIMILAR_CANDIDATES_PER_BUCKET = 32
+
+
+@dataclass(frozen=True)
+class CachedReply:
+	content: str
+	tokens: int
+	signature: tuple[int, ...] | None = None
+
+
+def normalize_code(code: str) -> str:
+	"""
+	Remove comentários, linhas vazias e espaços redundantes de código Python.
+
+	Os comentários são identificados pelo tokenize, então um '#' dentro de
+	string continua no código. Se o código não for Python válido, retorna o
+	texto exato: cada linguagem tem sua própria sintaxe de comentário.
+	"""
+	try:
+		ast.parse(code)
+		tokens = []
+		depth = 0
+		for token in tokenize.generate_tokens(io.StringIO(code).readline):
+			if token.type in (tokenize.COMMENT, tokenize.NL):
+				continue
+			string = token.string
+			# Tabs ou espaços: a indentação vira 4 espaços por nível
+			if token.type == tokenize.INDENT:
+				depth += 1
+				string = '    ' * depth
+			elif token.type == tokenize.DEDENT:
+				depth -= 1
+			tokens.append((token.type, string))
+	except (SyntaxError, ValueError, tokenize.TokenError):
+		return code
+	return tokenize.untokenize(tokens).strip()
+
+
+def normalize_message(message: str) -> str:
+	"""Minúsculas, sem acentos, pontuação ou espaços redundantes"""
+	text = unicodedata.normalize('NFKD', message)
+	text = ''.join(char for char in text if not unicodedata.combining(char))
+	text = _MESSAGE_NOISE_RE.sub(' ', text.lower())
+	return ' '.join(text.split())
+
+
+def estimate_tokens(text: str) -> int:
+	return max(1, len(text) // 4)
+
+
+def _minhash_permutations(count: int) -> list[tuple[int, int]]:
+	rng = random.Random(0)
+	return [
+		(rng.randrange(1, _MINHASH_PRIME), rng.randrange(0, _MINHASH_PRIME))
+		for _ in range(count)
+	]
+
+
+def minhash_signature(
+	code: str, permutations: list[tuple[int, int]]
+) -> tuple[int, ...]:
+	"""Assinatura MinHash dos shingles de tokens do código normalizado"""
+	tokens = _CODE_TOKEN_RE.findall(code)
+	shingles = {
+		' '.join(tokens[i : i + SHINGLE_SIZE])
+		for i in range(max(1, len(tokens) - SHINGLE_SIZE + 1))
+	}
+	hashes = [
+		int.from_bytes(blake2b(shingle.encode(), digest_size=8).digest())
+		for shingle in shingles
+	]
+	return tuple(
+		min((a * value + b) % _MINHASH_PRIME for value in hashes)
+		for a, b in permutations
+	)
+
+
+def estimate_similarity(
+	signature: tuple[int, ...], other: tuple[int, ...]
+) -> float:
+	"""Estimativa da similaridade de Jaccard entre duas assinaturas"""
+	equal = sum(1 for a, b in zip(signature, other) if a == b)
+	return equal / len(signature)
+
+
+class ResponseCache:
+	"""
+	Cache de respostas do agente para o primeiro turno de uma sessão.
+
+	A chave exata é (turma, problema, código normalizado, mensagem
+	normalizada). Com `similarity_threshold` > 0, uma mensagem igual com código
+	parecido (MinHash) também é aproveitada.
+	"""
+
+	def __init__(
+		self,
+		maxsize: int,
+		ttl: float | None,
+		similarity_threshold: float,
+		permutations: int,
+	):
+		self._entries = LRUCache(maxsize, ttl)
+		self._similar = LRUCache(maxsize)
+		self._similarity_threshold = similarity_threshold
+		self._permutations = _minhash_permutations(permutations)
+		self._lock = Lock()
+		self.exact_hits = 0
+		self.similar_hits = 0
+		self.misses = 0
+		self.saved_tokens = 0
+
+	def _keys(self, agent_input: AgentInput) -> tuple[tuple, tuple, str]:
+		code = normalize_code(agent_input.student_code)
+		bucket_key = (
+			agent_input.classroom_id,
+			agent_input.problem_id,
+			normalize_message(agent_input.user_message),
+		)
+		entry_key = (*bucket_key, sha256(code.encode()).hexdigest())
+		return entry_key, bucket_key, code
+
+	@property
+	def _similarity_enabled(self) -> bool:
+		return self._similarity_threshold > 0
+
+	def _find_similar(
+		self, bucket_key: tuple, code: str
+	) -> CachedReply | None:
+		candidates = self._similar.get(bucket_key)
+		if not candidates:
+			return None
+
+		signature = minhash_signature(code, self._permutations)
+		best, best_score = None, self._similarity_threshold
+		for entry_key in list(candidates):
+			reply = self._entries.get(entry_key)
+			if reply is None or reply.signature is None:
+				continue
+			score = estimate_similarity(signature, reply.signature)
+			if score >= best_score:
+				best, best_score = reply, score
+		return best
+
+	def lookup(self, agent_input: AgentInput) -> CachedReply | None:
+		entry_key, bucket_key, code = self._keys(agent_input)
+
+		reply = self._entries.get(entry_key)
+		hit_kind = 'exact'
+		if reply is None and self._similarity_enabled:
+			reply = self._find_similar(bucket_key, code)
+			hit_kind = 'similar'
+
+		with self._lock:
+			if reply is None:
+				self.misses += 1
+			elif hit_kind == 'exact':
+				self.exact_hits += 1
+			else:
+				self.similar_hits += 1
+			if reply is not None:
+				self.saved_tokens += reply.tokens
+		return reply
+
+	def store(
+		self, agent_input: AgentInput, content: str, tokens: int
+	) -> None:
+		entry_key, bucket_key, code = self._keys(agent_input)
+
+		signature = None
+		if self._similarity_enabled:
+			signature = minhash_signature(code, self._permutations)
+			with self._lock:
+				candidates = self._similar.get(bucket_key)
+				if candidates is None:
+					candidates = deque(maxlen=SIMILAR_CANDIDATES_PER_BUCKET)
+					self._similar.set(bucket_key, candidates)
+				if entry_key not in candidates:
+					candidates.append(entry_key)
+
+		self._entries.set(entry_key, CachedReply(content, tokens, signature))
+
+	def invalidate_problem(self, problem_id: str) -> None:
+		self._entries.discard_where(lambda key: key[1] == problem_id)
+		self._similar.discard_where(lambda key: key[1] == problem_id)
+
+	def stats(self) -> dict[str, int | float]:
+		hits = self.exact_hits + self.similar_hits
+		lookups = hits + self.misses
+		return {
+			'size': len(self._entries),
+			'exact_hits': self.exact_hits,
+			'similar_hits': self.similar_hits,
+			'misses': self.misses,
+			'hit_rate': hits / lookups if lookups else 0.0,
+			'saved_tokens': self.saved_tokens,
+		}
+
+
+response_cache = ResponseCache(
+	maxsize=settings.RESPONSE_CACHE_SIZE,
+	ttl=settings.RESPONSE_CACHE_TTL_SECONDS,
+	similarity_threshold=settings.RESPONSE_CACHE_SIMILARITY_THRESHOLD,
+	permutations=settings.RESPONSE_CACHE_MINHASH_PERMUTATIONS,
+)
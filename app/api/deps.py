@@ -1,35 +1,114 @@
 from typing import Annotated
 
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Query, status
 from fastapi.security import OAuth2PasswordBearer
 from jwt.exceptions import InvalidTokenError
-from pydantic import ValidationError
+from pydantic import BaseModel, ValidationError
+from sqlalchemy.orm import make_transient_to_detached
 from sqlmodel import Session
+from sqlmodel.ext.asyncio.session import AsyncSession
 
+from gpt_teacher_db.gpt_teacher.models.classroom import Classroom
+from gpt_teacher_db.gpt_teacher.models.problem import Problem
 from gpt_teacher_db.gpt_teacher.models.teacher import Teacher
 from gpt_teacher_db.gpt_teacher.models.student import Student
 
 from app.core.config import settings
-from app.core.db import get_db
+from app.core.db import get_async_db, get_db
+from app.cruds import access as access_crud
+from app.utils.pagination import CURSOR_FIELDS, PageParams, decode_cursor
+from app.utils.principal_cache import principal_cache
 from app.utils.security import decode_jwt_token
+from app.utils.telemetry import traced
 
 reusable_oauth2 = OAuth2PasswordBearer(
 	tokenUrl=f'{settings.API_V1_STR}/auth/login/access-token'
 )
 
 SessionDep = Annotated[Session, Depends(get_db)]
+AsyncSessionDep = Annotated[AsyncSession, Depends(get_async_db)]
 TokenDep = Annotated[str, Depends(reusable_oauth2)]
 
 
-def get_current_teacher_user(session: SessionDep, token: TokenDep) -> Teacher:
+def _from_snapshot(
+	session: Session | AsyncSession,
+	model: type[Teacher | Student],
+	snapshot: dict,
+) -> Teacher | Student | None:
+	# Snapshot vazio: o sub não é desse tipo de usuário
+	if not snapshot:
+		return None
+	user = model.model_validate({**snapshot, 'hashed_password': ''})
+	make_transient_to_detached(user)
+	session.add(user)
+	# O hash da senha fica fora do cache: é carregado do banco se lido (na
+	# sessão assíncrona, com refresh)
+	session.expire(user, ['hashed_password'])
+	return user
+
+
+@traced('auth', 'load_principal')
+def _load_principal(
+	session: Session, model: type[Teacher | Student], kind: str, sub: str
+) -> Teacher | Student | None:
+	"""
+	Carrega o usuário do token, usando o cache de principais quando possível.
+
+	No hit, a instância é reconstruída do snapshot e anexada à sessão sem
+	consultar o banco, para as rotas poderem alterá-la normalmente.
+	"""
+	snapshot = principal_cache.get(kind, sub)
+	if snapshot is not None:
+		return _from_snapshot(session, model, snapshot)
+
+	user = session.get(model, sub)
+	principal_cache.set(
+		kind,
+		sub,
+		user.model_dump(mode='json', exclude={'hashed_password'})
+		if user
+		else {},
+	)
+	return user
+
+
+@traced('auth', 'load_principal')
+async def _aload_principal(
+	session: AsyncSession,
+	model: type[Teacher | Student],
+	kind: str,
+	sub: str,
+) -> Teacher | Student | None:
+	"""_load_principal com a sessão assíncrona da rota"""
+	snapshot = principal_cache.get(kind, sub)
+	if snapshot is not None:
+		return _from_snapshot(session, model, snapshot)
+
+	user = await session.get(model, sub)
+	principal_cache.set(
+		kind,
+		sub,
+		user.model_dump(mode='json', exclude={'hashed_password'})
+		if user
+		else {},
+	)
+	return user
+
+
+@traced('auth', 'decode_token')
+def _decode_token(token: str):
 	try:
-		token_data = decode_jwt_token(token, verify_exp=True)
+		return decode_jwt_token(token, verify_exp=True)
 	except (InvalidTokenError, ValidationError):
 		raise HTTPException(
 			status_code=status.HTTP_401_UNAUTHORIZED,
 			detail='Could not validate credentials',
 		)
-	user = session.get(Teacher, token_data.sub)
+
+
+def get_current_teacher_user(session: SessionDep, token: TokenDep) -> Teacher:
+	token_data = _decode_token(token)
+	user = _load_principal(session, Teacher, 'teacher', token_data.sub)
 
 	if not user:
 		raise HTTPException(
@@ -41,14 +120,28 @@ def get_current_teacher_user(session: SessionDep, token: TokenDep) -> Teacher:
 
 
 def get_current_student_user(session: SessionDep, token: TokenDep) -> Student:
-	try:
-		token_data = decode_jwt_token(token, verify_exp=True)
-	except (InvalidTokenError, ValidationError):
+	token_data = _decode_token(token)
+	user = _load_principal(session, Student, 'student', token_data.sub)
+
+	if not user:
 		raise HTTPException(
-			status_code=status.HTTP_401_UNAUTHORIZED,
-			detail='Could not validate credentials',
+			status_code=404, detail='Token not related to a Student'
 		)
-	user = session.get(Student, token_data.sub)
+	if not user.is_active:
+		raise HTTPException(status_code=400, detail='Inactive user')
+	return user
+
+
+async def aget_current_student_user(
+	session: AsyncSessionDep, token: TokenDep
+) -> Student:
+	"""
+	get_current_student_user para rotas assíncronas: usa a mesma sessão
+	assíncrona da rota, que pode devolver a conexão ao pool enquanto espera
+	(long-poll, chamada ao LLM)
+	"""
+	token_data = _decode_token(token)
+	user = await _aload_principal(session, Student, 'student', token_data.sub)
 
 	if not user:
 		raise HTTPException(
@@ -59,5 +152,142 @@ def get_current_student_user(session: SessionDep, token: TokenDep) -> Student:
 	return user
 
 
+def get_current_user(
+	session: SessionDep, token: TokenDep
+) -> Teacher | Student:
+	"""Professor ou aluno do token (rotas acessíveis pelos dois)"""
+	token_data = _decode_token(token)
+	user = _load_principal(
+		session, Teacher, 'teacher', token_data.sub
+	) or _load_principal(session, Student, 'student', token_data.sub)
+
+	if not user:
+		raise HTTPException(
+			status_code=404, detail='Token not related to a User'
+		)
+	if not user.is_active:
+		raise HTTPException(status_code=400, detail='Inactive user')
+	return user
+
+
 CurrentTeacherUser = Annotated[Teacher, Depends(get_current_teacher_user)]
 CurrentStudentUser = Annotated[Student, Depends(get_current_student_user)]
+AsyncCurrentStudentUser = Annotated[
+	Student, Depends(aget_current_student_user)
+]
+CurrentUser = Annotated[Teacher | Student, Depends(get_current_user)]
+
+
+# Autorização: cada dependência busca a entidade do path e verifica o acesso
+# do usuário na mesma consulta (404 se não existe, 403 sem acesso)
+
+
+def _classroom_or_error(
+	session: Session, classroom_id: str, user: Teacher | Student
+) -> Classroom:
+	row = access_crud.get_classroom_access(session, classroom_id, user)
+	if not row:
+		raise HTTPException(status_code=404, detail='Classroom not found')
+	classroom, has_access = row
+	if not has_access:
+		raise HTTPException(
+			status_code=403, detail='Not authorized to access this classroom'
+		)
+	return classroom
+
+
+def _problem_or_error(
+	session: Session, problem_id: str, user: Teacher | Student
+) -> Problem:
+	row = access_crud.get_problem_access(session, problem_id, user)
+	if not row:
+		raise HTTPException(status_code=404, detail='Problem not found')
+	problem, has_access = row
+	if not has_access:
+		raise HTTPException(
+			status_code=403, detail='Not authorized to access this problem'
+		)
+	return problem
+
+
+def get_teacher_classroom(
+	session: SessionDep, current_user: CurrentTeacherUser, classroom_id: str
+) -> Classroom:
+	"""Turma do path, desde que seja do professor logado"""
+	return _classroom_or_error(session, classroom_id, current_user)
+
+
+def get_user_classroom(
+	session: SessionDep, current_user: CurrentUser, classroom_id: str
+) -> Classroom:
+	"""Turma do path, para o professor dono ou um aluno matriculado"""
+	return _classroom_or_error(session, classroom_id, current_user)
+
+
+def get_teacher_problem(
+	session: SessionDep, current_user: CurrentTeacherUser, problem_id: str
+) -> Problem:
+	"""Problema do path, desde que seja de uma turma do professor logado"""
+	return _problem_or_error(session, problem_id, current_user)
+
+
+def get_student_problem(
+	session: SessionDep, current_user: CurrentStudentUser, problem_id: str
+) -> Problem:
+	"""Problema do path, desde que o aluno logado esteja na turma"""
+	return _problem_or_error(session, problem_id, current_user)
+
+
+def get_user_problem(
+	session: SessionDep, current_user: CurrentUser, problem_id: str
+) -> Problem:
+	"""Problema do path, para o professor dono ou um aluno da turma"""
+	return _problem_or_error(session, problem_id, current_user)
+
+
+TeacherClassroom = Annotated[Classroom, Depends(get_teacher_classroom)]
+UserClassroom = Annotated[Classroom, Depends(get_user_classroom)]
+TeacherProblem = Annotated[Problem, Depends(get_teacher_problem)]
+StudentProblem = Annotated[Problem, Depends(get_student_problem)]
+UserProblem = Annotated[Problem, Depends(get_user_problem)]
+
+
+class Pagination:
+	"""
+	Dependência com os parâmetros de paginação de uma listagem cujos itens
+	seguem o schema `model`: `limit`, `cursor` (o `next_cursor` da página
+	anterior) e `fields` (campos separados por vírgula).
+	"""
+
+	def __init__(self, model: type[BaseModel]):
+		self.allowed_fields = set(model.model_fields)
+
+	def __call__(
+		self,
+		limit: Annotated[
+			int, Query(ge=1, le=settings.PAGINATION_MAX_LIMIT)
+		] = settings.PAGINATION_DEFAULT_LIMIT,
+		cursor: str | None = None,
+		fields: str | None = None,
+	) -> PageParams:
+		after = None
+		if cursor:
+			try:
+				after = decode_cursor(cursor)
+			except ValueError:
+				raise HTTPException(status_code=400, detail='Invalid cursor')
+
+		selected = None
+		if fields:
+			requested = [
+				name.strip() for name in fields.split(',') if name.strip()
+			]
+			unknown = set(requested) - self.allowed_fields
+			if unknown:
+				raise HTTPException(
+					status_code=400,
+					detail=f'Unknown fields: {", ".join(sorted(unknown))}',
+				)
+			selected = tuple(dict.fromkeys([*CURSOR_FIELDS, *requested]))
+
+		return PageParams(limit=limit, after=after, fields=selected)
@@ -1,7 +1,7 @@
 from datetime import timedelta
 from typing import Annotated
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException
 from fastapi.security import OAuth2PasswordRequestForm
 from pydantic import BaseModel
 
@@ -16,7 +16,7 @@ from gpt_teacher_db.gpt_teacher.models.student import (
 	StudentPublic,
 )
 
-from app.api.deps import SessionDep
+from app.api.deps import AsyncSessionDep
 from app.core.config import settings
 from app.cruds import teacher as teacher_crud
 from app.cruds import student as student_crud
@@ -37,63 +37,66 @@ class UserType:
 
 
 @router.post('/register/teacher', response_model=TeacherPublic)
-def register_teacher(
-	session: SessionDep,
+async def register_teacher(
+	session: AsyncSessionDep,
 	teacher_in: TeacherCreate,
 ) -> Teacher:
 	"""
 	Cadastro de professor
 	"""
 	# Verifica se o email já existe
-	existing_teacher = teacher_crud.get_teacher_by_email(
+	existing_teacher = await teacher_crud.aget_teacher_by_email(
 		session, teacher_in.email
 	)
 	if existing_teacher:
 		raise HTTPException(status_code=400, detail='Email already registered')
 
-	teacher = teacher_crud.create_teacher(session, teacher_in)
+	teacher = await teacher_crud.acreate_teacher(session, teacher_in)
 	return teacher
 
 
 @router.post('/register/student', response_model=StudentPublic)
-def register_student(
-	session: SessionDep,
+async def register_student(
+	session: AsyncSessionDep,
 	student_in: StudentCreate,
 ) -> Student:
 	"""
 	Cadastro de aluno
 	"""
 	# Verifica se o email já existe
-	existing_student = student_crud.get_student_by_email(
+	existing_student = await student_crud.aget_student_by_email(
 		session, student_in.email
 	)
 	if existing_student:
 		raise HTTPException(status_code=400, detail='Email already registered')
 
-	student = student_crud.create_student(session, student_in)
+	student = await student_crud.acreate_student(session, student_in)
 	return student
 
 
 @router.post('/login/access-token', response_model=Token)
-def login_access_token(
-	session: SessionDep,
+async def login_access_token(
+	session: AsyncSessionDep,
 	form_data: Annotated[OAuth2PasswordRequestForm, Depends()],
+	background_tasks: BackgroundTasks,
 ) -> Token:
 	"""
 	OAuth2 compatible token login, get an access token for future requests.
 	Use client_id to specify user type: 'teacher' or 'student'
 	"""
 	if form_data.client_id == UserType.TEACHER:
-		user = auth.authenticate_teacher(
+		user = await auth.aauthenticate_teacher(
 			session=session,
 			username=form_data.username,
 			password=form_data.password,
+			background_tasks=background_tasks,
 		)
 	elif form_data.client_id == UserType.STUDENT:
-		user = auth.authenticate_student(
+		user = await auth.aauthenticate_student(
 			session=session,
 			username=form_data.username,
 			password=form_data.password,
+			background_tasks=background_tasks,
 		)
 	else:
 		raise HTTPException(
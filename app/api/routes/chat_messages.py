@@ -1,37 +1,93 @@
-from fastapi import APIRouter, HTTPException
-from app.agents.teacher_agent.model import AgentInput
-from app.agents.teacher_agent.utils import generate_ai_response
+import asyncio
+import hashlib
+import json
+import logging
+from collections.abc import AsyncIterator
+from dataclasses import replace
+from datetime import datetime
+from math import ceil
+from typing import Annotated
+
+import anyio
+from fastapi import (
+	APIRouter,
+	Depends,
+	HTTPException,
+	Query,
+	Request,
+	Response,
+)
+from fastapi.responses import StreamingResponse
+from sqlmodel.ext.asyncio.session import AsyncSession
+from starlette.background import BackgroundTask
+
+from app.agents.teacher_agent import call_teacher_agent, stream_teacher_agent
+from app.agents.teacher_agent.model import AgentInput, AgentReply
 
 
 from gpt_teacher_db.gpt_teacher.models.chat_message import (
+	ChatMessage,
 	ChatMessageCreate,
 	ChatMessagePublic,
 )
+from gpt_teacher_db.gpt_teacher.models.student import Student
 
-from app.api.deps import SessionDep, CurrentStudentUser
+from app.api.deps import (
+	AsyncCurrentStudentUser,
+	AsyncSessionDep,
+	Pagination,
+)
+from app.core.config import settings
+from app.core.db import async_engine
 from app.cruds import chat_message as message_crud
 from app.cruds import student_session as session_crud
+from app.llm.admission import AdmissionRejected, AdmissionSlot, llm_admission
+from app.llm.resilience import is_transient_error
+from app.models import ChatMessageMetadata
+from app.utils.notifier import chat_notifier
+from app.utils.pagination import Page, PageParams, partial_model
+
 
+logger = logging.getLogger(__name__)
 
 router = APIRouter(tags=['chat-messages'])
 
+MessagePageParams = Annotated[
+	PageParams, Depends(Pagination(ChatMessagePublic))
+]
 
-@router.post(
-	'/call-agent/student-session/{session_id}/chat-messages',
-	response_model=ChatMessagePublic,
-)
-def send_chat_message(
-	session: SessionDep,
-	current_user: CurrentStudentUser,
+
+async def _acquire_llm_slot(
+	current_user: Student, agent_input: AgentInput
+) -> AdmissionSlot:
+	try:
+		return await llm_admission.acquire(
+			str(current_user.id), agent_input.classroom_id
+		)
+	except AdmissionRejected as error:
+		raise HTTPException(
+			status_code=429,
+			detail=error.detail,
+			headers={'Retry-After': str(ceil(error.retry_after))},
+		)
+
+
+async def _prepare_agent_turn(
+	session: AsyncSession,
+	current_user: Student,
 	session_id: str,
 	agent_input: AgentInput,
-):
-
-	student_session = session_crud.get_student_session_by_id(
+) -> AdmissionSlot:
+	"""
+	Valida a sessão do aluno, reserva uma vaga de chamada ao LLM e registra
+	a mensagem enviada. A vaga deve ser liberada pelo chamador.
+	"""
+	row = await session_crud.aget_student_session_with_classroom(
 		session, session_id
 	)
-	if not student_session:
+	if not row:
 		raise HTTPException(status_code=404, detail='Session not found')
+	student_session, classroom_id = row
 
 	if student_session.student_id != str(current_user.id):
 		raise HTTPException(
@@ -41,37 +97,230 @@ def send_chat_message(
 	if not student_session.is_active:
 		raise HTTPException(status_code=400, detail='Session is not active')
 
-	message_crud.create_chat_message(
-		session, agent_input.student_input, session_id
+	# A thread do checkpointer é sempre a sessão da rota
+	agent_input.session_id = session_id
+	agent_input.problem_id = str(student_session.problem_id)
+	agent_input.classroom_id = str(classroom_id)
+
+	# Devolve a conexão ao pool antes de esperar a vaga e chamar o LLM; o
+	# commit da mensagem também a libera, e a sessão fica sem conexão até a
+	# resposta do agente ser gravada
+	await session.close()
+
+	# Mensagens recusadas (429) não chegam a ser registradas
+	slot = await _acquire_llm_slot(current_user, agent_input)
+
+	student_message_in = ChatMessageCreate(
+		content=agent_input.user_message,
+		role='user',
 	)
+	try:
+		await message_crud.acreate_chat_message(
+			session, student_message_in, session_id
+		)
+	except BaseException:
+		slot.release()
+		raise
+	return slot
 
-	ai_response_content = generate_ai_response(agent_input)
+
+@router.post(
+	'/call-agent/student-session/{session_id}/chat-messages',
+	response_model=ChatMessagePublic,
+)
+async def send_chat_message(
+	session: AsyncSessionDep,
+	current_user: AsyncCurrentStudentUser,
+	session_id: str,
+	agent_input: AgentInput,
+	response: Response,
+):
+	slot = await _prepare_agent_turn(
+		session, current_user, session_id, agent_input
+	)
+	try:
+		reply = await call_teacher_agent(agent_input)
+	except TimeoutError:
+		raise HTTPException(
+			status_code=504, detail='Agent took too long to respond'
+		)
+	except Exception as error:
+		if not is_transient_error(error):
+			raise
+		raise HTTPException(
+			status_code=503, detail='Agent is unavailable, try again'
+		)
+	finally:
+		slot.release()
+	_set_usage_headers(response, reply)
 
 	ai_message_in = ChatMessageCreate(
-		content=ai_response_content,
+		content=reply.content,
 		role='assistant',
 	)
-	ai_message = message_crud.create_chat_message(
-		session, ai_message_in, session_id
+	ai_message = await message_crud.acreate_chat_message(
+		session, ai_message_in, session_id, _reply_metadata(reply)
 	)
 
 	return ai_message
 
 
+def _set_usage_headers(response: Response, reply: AgentReply) -> None:
+	if reply.prompt_tokens is not None:
+		response.headers['X-Prompt-Tokens'] = str(reply.prompt_tokens)
+	if reply.cached_prompt_tokens is not None:
+		response.headers['X-Cached-Prompt-Tokens'] = str(
+			reply.cached_prompt_tokens
+		)
+	if reply.completion_tokens is not None:
+		response.headers['X-Completion-Tokens'] = str(reply.completion_tokens)
+	if reply.model_name is not None:
+		response.headers['X-LLM-Model'] = reply.model_name
+
+
+def _reply_metadata(reply: AgentReply) -> ChatMessageMetadata:
+	return ChatMessageMetadata(
+		model_name=reply.model_name,
+		model_tier=reply.model_tier,
+		model_fallback=reply.model_fallback,
+		cached=reply.cached,
+		prompt_tokens=reply.prompt_tokens,
+		cached_prompt_tokens=reply.cached_prompt_tokens,
+		completion_tokens=reply.completion_tokens,
+		usage_estimated=reply.usage_estimated,
+	)
+
+
+def _sse_event(event: str, data: dict) -> str:
+	payload = json.dumps(data, ensure_ascii=False)
+	return f'event: {event}\ndata: {payload}\n\n'
+
+
+async def _persist_ai_message(
+	session_id: str, reply: AgentReply
+) -> ChatMessage | None:
+	if not reply.content:
+		return None
+
+	# A sessão da requisição não é garantida durante o streaming
+	async with AsyncSession(async_engine, expire_on_commit=False) as session:
+		return await message_crud.acreate_chat_message(
+			session,
+			ChatMessageCreate(content=reply.content, role='assistant'),
+			session_id,
+			_reply_metadata(reply),
+		)
+
+
+async def _stream_agent_reply(
+	agent_input: AgentInput, session_id: str, slot: AdmissionSlot
+) -> AsyncIterator[str]:
+	reply = AgentReply()
+	failed = False
+	try:
+		async for event, content in stream_teacher_agent(agent_input, reply):
+			yield _sse_event(event, {'content': content})
+	except Exception:
+		logger.exception('Agent stream failed for session %s', session_id)
+		failed = True
+		yield _sse_event('error', {'detail': 'Agent failed to respond'})
+	finally:
+		slot.release()
+		# Persiste o que foi gerado mesmo se o cliente desconectar
+		with anyio.CancelScope(shield=True):
+			ai_message = await _persist_ai_message(session_id, reply)
+
+	# Após um erro a resposta ficou incompleta e não é anunciada como final
+	if ai_message and not failed:
+		yield _sse_event(
+			'done',
+			{
+				'message': ChatMessagePublic.model_validate(
+					ai_message
+				).model_dump(mode='json'),
+				'usage': {
+					'prompt_tokens': reply.prompt_tokens,
+					'cached_prompt_tokens': reply.cached_prompt_tokens,
+					'completion_tokens': reply.completion_tokens,
+					'estimated': reply.usage_estimated,
+				},
+				'model': reply.model_name,
+			},
+		)
+
+
+@router.post('/call-agent/student-session/{session_id}/chat-messages/stream')
+async def stream_chat_message(
+	session: AsyncSessionDep,
+	current_user: AsyncCurrentStudentUser,
+	session_id: str,
+	agent_input: AgentInput,
+) -> StreamingResponse:
+	"""
+	Envia mensagem ao agente e recebe a resposta via Server-Sent Events
+	"""
+	slot = await _prepare_agent_turn(
+		session, current_user, session_id, agent_input
+	)
+
+	return StreamingResponse(
+		_stream_agent_reply(agent_input, session_id, slot),
+		media_type='text/event-stream',
+		headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'},
+		# Garante a liberação caso o streaming nem chegue a começar
+		background=BackgroundTask(slot.release),
+	)
+
+
+def _messages_etag(
+	session_id: str, version: tuple[int, datetime | None], request: Request
+) -> str:
+	# `wait` não muda o conteúdo: long-poll e consulta comum, mesmo ETag
+	query = sorted(
+		(key, value)
+		for key, value in request.query_params.multi_items()
+		if key != 'wait'
+	)
+	count, last_created_at = version
+	raw = json.dumps([session_id, count, str(last_created_at), query])
+	return f'"{hashlib.sha1(raw.encode()).hexdigest()}"'
+
+
+def _etag_matches(if_none_match: str | None, etag: str) -> bool:
+	if not if_none_match:
+		return False
+	tags = [tag.strip().removeprefix('W/') for tag in if_none_match.split(',')]
+	return '*' in tags or etag in tags
+
+
 @router.get(
 	'/student-session/{session_id}/chat-messages',
-	response_model=list[ChatMessagePublic],
+	response_model=Page[partial_model(ChatMessagePublic)],
+	response_model_exclude_unset=True,
+	responses={304: {'description': 'Mensagens não mudaram (ETag)'}},
 )
-def get_chat_messages(
-	session: SessionDep,
-	current_user: CurrentStudentUser,
+async def get_chat_messages(
+	session: AsyncSessionDep,
+	current_user: AsyncCurrentStudentUser,
 	session_id: str,
+	page: MessagePageParams,
+	request: Request,
+	response: Response,
+	since: str | None = None,
+	wait: Annotated[
+		float, Query(ge=0, le=settings.CHAT_POLL_MAX_WAIT_SECONDS)
+	] = 0,
 ):
 	"""
-	Lista mensagens da sessão
+	Lista mensagens da sessão.
+
+	- `since`: id de uma mensagem ou data ISO; retorna só as mais novas.
+	- Sem `since`, a resposta tem ETag; com `If-None-Match` igual, 304.
+	- `wait`: segundos que a requisição pode esperar (long-poll) até haver
+	  mensagem nova, ou a lista mudar em relação ao ETag enviado.
 	"""
 	# Verifica se a sessão existe e pertence ao aluno
-	student_session = session_crud.get_student_session_by_id(
+	student_session = await session_crud.aget_student_session_by_id(
 		session, session_id
 	)
 	if not student_session:
@@ -82,5 +331,53 @@ def get_chat_messages(
 			status_code=403, detail='Not authorized to access this session'
 		)
 
-	messages = message_crud.get_messages_by_session(session, session_id)
+	since_at = None
+	if since and page.after is None:
+		try:
+			since_at = datetime.fromisoformat(since)
+		except ValueError:
+			position = await message_crud.aget_message_position(
+				session, session_id, since
+			)
+			if position is None:
+				raise HTTPException(
+					status_code=400, detail='Invalid since parameter'
+				)
+			page = replace(page, after=position)
+
+	if_none_match = request.headers.get('if-none-match')
+	loop = asyncio.get_running_loop()
+	deadline = loop.time() + wait
+	with chat_notifier.listen(session_id) as listener:
+		while True:
+			messages = None
+			if since:
+				messages = await message_crud.aget_messages_by_session(
+					session, session_id, page, since_at
+				)
+				changed = bool(messages.items)
+			else:
+				version = await message_crud.aget_messages_version(
+					session, session_id
+				)
+				etag = _messages_etag(session_id, version, request)
+				changed = not _etag_matches(if_none_match, etag)
+				if changed:
+					messages = await message_crud.aget_messages_by_session(
+						session, session_id, page
+					)
+
+			remaining = deadline - loop.time()
+			if changed or remaining <= 0:
+				break
+			# Devolve a conexão ao pool enquanto espera
+			await session.rollback()
+			await listener.wait(
+				min(remaining, settings.CHAT_POLL_INTERVAL_SECONDS)
+			)
+
+	if not since:
+		response.headers['ETag'] = etag
+		if messages is None:
+			return Response(status_code=304, headers={'ETag': etag})
 	return messages
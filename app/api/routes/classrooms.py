@@ -1,4 +1,7 @@
-from fastapi import APIRouter, HTTPException
+from datetime import datetime
+from typing import Annotated
+
+from fastapi import APIRouter, Depends, File, HTTPException, UploadFile
 from pydantic import BaseModel
 
 from gpt_teacher_db.gpt_teacher.models.classroom import (
@@ -9,18 +12,87 @@ from gpt_teacher_db.gpt_teacher.models.classroom import (
 )
 from gpt_teacher_db.gpt_teacher.models.student import StudentPublic
 
-from app.api.deps import SessionDep, CurrentTeacherUser
+from app.api.deps import (
+	SessionDep,
+	CurrentTeacherUser,
+	Pagination,
+	TeacherClassroom,
+)
+from app.core.config import settings
+from app.cruds import analytics as analytics_crud
 from app.cruds import classroom as classroom_crud
 from app.cruds import student as student_crud
+from app.utils.csv_import import CSVImportError, parse_csv
+from app.utils.pagination import Page, PageParams, partial_model
 
 
 router = APIRouter(tags=['classrooms'])
 
+ClassroomPageParams = Annotated[
+	PageParams, Depends(Pagination(ClassroomPublic))
+]
+StudentPageParams = Annotated[PageParams, Depends(Pagination(StudentPublic))]
+
 
 class AddStudentRequest(BaseModel):
 	student_id: str
 
 
+class BulkEnrollmentRequest(BaseModel):
+	# Ids ou emails dos alunos
+	students: list[str]
+
+
+class EnrollmentResult(BaseModel):
+	row: int
+	value: str
+	# added, already_enrolled, duplicate, not_found ou invalid
+	status: str
+	student_id: str | None = None
+
+
+class BulkEnrollmentResponse(BaseModel):
+	added: int
+	results: list[EnrollmentResult]
+
+
+class ProblemAnalytics(BaseModel):
+	problem_id: str
+	title: str
+	students: int = 0
+	sessions_started: int = 0
+	sessions_closed: int = 0
+	messages_per_session: float | None = None
+	avg_session_seconds: float | None = None
+	students_stuck: int = 0
+	last_activity_at: datetime | None = None
+
+
+class ClassroomAnalytics(BaseModel):
+	classroom_id: str
+	problems: list[ProblemAnalytics]
+
+
+def _problem_analytics(problem_id: str, title: str, row) -> ProblemAnalytics:
+	if row is None:
+		return ProblemAnalytics(problem_id=problem_id, title=title)
+	return ProblemAnalytics(
+		problem_id=problem_id,
+		title=title,
+		students=row.students,
+		sessions_started=row.sessions_started,
+		sessions_closed=row.sessions_closed,
+		messages_per_session=row.messages / row.sessions_started
+		if row.sessions_started
+		else None,
+		avg_session_seconds=row.session_seconds / row.sessions_closed
+		if row.sessions_closed
+		else None,
+		students_stuck=row.students_stuck,
+		last_activity_at=row.last_activity_at,
+	)
+
+
 @router.post('', response_model=ClassroomPublic)
 def create_classroom(
 	session: SessionDep,
@@ -36,162 +108,217 @@ def create_classroom(
 	return classroom
 
 
-@router.get('', response_model=list[ClassroomPublic])
+@router.get(
+	'',
+	response_model=Page[partial_model(ClassroomPublic)],
+	response_model_exclude_unset=True,
+)
 def get_classrooms(
 	session: SessionDep,
 	current_user: CurrentTeacherUser,
+	page: ClassroomPageParams,
 ):
 	"""
 	Lista turmas do professor
 	"""
 	classrooms = classroom_crud.get_classrooms_by_teacher(
-		session, str(current_user.id)
+		session, str(current_user.id), page
 	)
 	return classrooms
 
 
-@router.get('/{id}', response_model=ClassroomPublic)
+@router.get('/{classroom_id}', response_model=ClassroomPublic)
 def get_classroom(
-	session: SessionDep,
-	current_user: CurrentTeacherUser,
-	id: str,
+	classroom: TeacherClassroom,
 ) -> Classroom:
 	"""
 	Detalhes de uma turma
 	"""
-	classroom = classroom_crud.get_classroom_by_id(session, id)
-	if not classroom:
-		raise HTTPException(status_code=404, detail='Classroom not found')
-
-	if classroom.teacher_id != str(current_user.id):
-		raise HTTPException(
-			status_code=403, detail='Not authorized to access this classroom'
-		)
-
 	return classroom
 
 
-@router.put('/{id}', response_model=ClassroomPublic)
+@router.put('/{classroom_id}', response_model=ClassroomPublic)
 def update_classroom(
 	session: SessionDep,
-	current_user: CurrentTeacherUser,
-	id: str,
+	classroom: TeacherClassroom,
 	classroom_in: ClassroomUpdate,
 ) -> Classroom:
 	"""
 	Atualiza turma
 	"""
-	classroom = classroom_crud.get_classroom_by_id(session, id)
-	if not classroom:
-		raise HTTPException(status_code=404, detail='Classroom not found')
-
-	if classroom.teacher_id != str(current_user.id):
-		raise HTTPException(
-			status_code=403, detail='Not authorized to update this classroom'
-		)
-
 	classroom = classroom_crud.update_classroom(
 		session, classroom, classroom_in
 	)
 	return classroom
 
 
-@router.delete('/{id}')
+@router.delete('/{classroom_id}')
 def delete_classroom(
 	session: SessionDep,
-	current_user: CurrentTeacherUser,
-	id: str,
+	classroom: TeacherClassroom,
 ):
 	"""
 	Remove turma
 	"""
-	classroom = classroom_crud.get_classroom_by_id(session, id)
-	if not classroom:
-		raise HTTPException(status_code=404, detail='Classroom not found')
-
-	if classroom.teacher_id != str(current_user.id):
-		raise HTTPException(
-			status_code=403, detail='Not authorized to delete this classroom'
-		)
-
 	classroom_crud.delete_classroom(session, classroom)
 	return {'message': 'Classroom deleted successfully'}
 
 
-@router.post('/{id}/students')
+@router.post('/{classroom_id}/students')
 def add_student_to_classroom(
 	session: SessionDep,
-	current_user: CurrentTeacherUser,
-	id: str,
+	classroom: TeacherClassroom,
 	request: AddStudentRequest,
 ):
 	"""
 	Adiciona aluno à turma
 	"""
-	classroom = classroom_crud.get_classroom_by_id(session, id)
-	if not classroom:
-		raise HTTPException(status_code=404, detail='Classroom not found')
-
-	if classroom.teacher_id != str(current_user.id):
-		raise HTTPException(
-			status_code=403, detail='Not authorized to modify this classroom'
-		)
-
 	# Verifica se o aluno existe
 	student = student_crud.get_student_by_id(session, request.student_id)
 	if not student:
 		raise HTTPException(status_code=404, detail='Student not found')
 
 	# Verifica se o aluno já está na turma
-	if classroom_crud.is_student_in_classroom(session, id, request.student_id):
+	classroom_id = str(classroom.id)
+	if classroom_crud.is_student_in_classroom(
+		session, classroom_id, request.student_id
+	):
 		raise HTTPException(
 			status_code=400, detail='Student already in classroom'
 		)
 
-	classroom_crud.add_student_to_classroom(session, id, request.student_id)
+	classroom_crud.add_student_to_classroom(
+		session, classroom_id, request.student_id
+	)
 	return {'message': 'Student added successfully'}
 
 
-@router.delete('/{id}/students/{student_id}')
-def remove_student_from_classroom(
+def _bulk_enroll(
+	session, classroom_id: str, values: list[str]
+) -> BulkEnrollmentResponse:
+	if len(values) > settings.BULK_IMPORT_MAX_ROWS:
+		raise HTTPException(
+			status_code=400,
+			detail=f'At most {settings.BULK_IMPORT_MAX_ROWS} students',
+		)
+
+	valid = [(row, value) for row, value in enumerate(values, 1) if value]
+	outcome = classroom_crud.bulk_add_students_to_classroom(
+		session, classroom_id, [value for _, value in valid]
+	)
+	results = {
+		row: EnrollmentResult(
+			row=row, value=value, status=status, student_id=student_id
+		)
+		for (row, value), (status, student_id) in zip(valid, outcome)
+	}
+	return BulkEnrollmentResponse(
+		added=sum(status == 'added' for status, _ in outcome),
+		results=[
+			results.get(row)
+			or EnrollmentResult(row=row, value=value, status='invalid')
+			for row, value in enumerate(values, 1)
+		],
+	)
+
+
+@router.post(
+	'/{classroom_id}/students/bulk', response_model=BulkEnrollmentResponse
+)
+def bulk_add_students_to_classroom(
 	session: SessionDep,
-	current_user: CurrentTeacherUser,
-	id: str,
-	student_id: str,
-):
+	classroom: TeacherClassroom,
+	request: BulkEnrollmentRequest,
+) -> BulkEnrollmentResponse:
 	"""
-	Remove aluno da turma
+	Matricula vários alunos na turma (ids ou emails), com o resultado de
+	cada um
+	"""
+	values = [value.strip() for value in request.students]
+	return _bulk_enroll(session, str(classroom.id), values)
+
+
+@router.post(
+	'/{classroom_id}/students/bulk/csv',
+	response_model=BulkEnrollmentResponse,
+)
+def bulk_add_students_to_classroom_csv(
+	session: SessionDep,
+	classroom: TeacherClassroom,
+	file: UploadFile = File(...),
+) -> BulkEnrollmentResponse:
+	"""
+	Matricula os alunos de um CSV com a coluna `student_id` ou `email`
 	"""
-	classroom = classroom_crud.get_classroom_by_id(session, id)
-	if not classroom:
-		raise HTTPException(status_code=404, detail='Classroom not found')
+	try:
+		rows = parse_csv(file.file.read(), settings.BULK_IMPORT_MAX_ROWS)
+	except CSVImportError as error:
+		raise HTTPException(status_code=400, detail=str(error))
 
-	if classroom.teacher_id != str(current_user.id):
+	values = [row.get('student_id') or row.get('email') or '' for row in rows]
+	if rows and not any(values):
 		raise HTTPException(
-			status_code=403, detail='Not authorized to modify this classroom'
+			status_code=400,
+			detail='CSV must have a student_id or email column',
 		)
+	return _bulk_enroll(session, str(classroom.id), values)
 
-	classroom_crud.remove_student_from_classroom(session, id, student_id)
+
+@router.delete('/{classroom_id}/students/{student_id}')
+def remove_student_from_classroom(
+	session: SessionDep,
+	classroom: TeacherClassroom,
+	student_id: str,
+):
+	"""
+	Remove aluno da turma
+	"""
+	classroom_crud.remove_student_from_classroom(
+		session, str(classroom.id), student_id
+	)
 	return {'message': 'Student removed successfully'}
 
 
-@router.get('/{id}/students', response_model=list[StudentPublic])
+@router.get(
+	'/{classroom_id}/students',
+	response_model=Page[partial_model(StudentPublic)],
+	response_model_exclude_unset=True,
+)
 def get_classroom_students(
 	session: SessionDep,
-	current_user: CurrentTeacherUser,
-	id: str,
+	classroom: TeacherClassroom,
+	page: StudentPageParams,
 ):
 	"""
 	Lista alunos da turma
 	"""
-	classroom = classroom_crud.get_classroom_by_id(session, id)
-	if not classroom:
-		raise HTTPException(status_code=404, detail='Classroom not found')
+	students = classroom_crud.get_classroom_students(
+		session, str(classroom.id), page
+	)
+	return students
 
-	if classroom.teacher_id != str(current_user.id):
-		raise HTTPException(
-			status_code=403, detail='Not authorized to access this classroom'
-		)
 
-	students = classroom_crud.get_classroom_students(session, id)
-	return students
+@router.get('/{classroom_id}/analytics', response_model=ClassroomAnalytics)
+def get_classroom_analytics(
+	session: SessionDep,
+	classroom: TeacherClassroom,
+) -> ClassroomAnalytics:
+	"""
+	Estatísticas por problema da turma, lidas dos contadores mantidos a
+	cada sessão e mensagem
+	"""
+	classroom_id = str(classroom.id)
+	titles = analytics_crud.get_classroom_problem_titles(session, classroom_id)
+	rows = {
+		str(row.problem_id): row
+		for row in analytics_crud.get_classroom_analytics(
+			session, classroom_id, settings.ANALYTICS_STUCK_MESSAGES
+		)
+	}
+	return ClassroomAnalytics(
+		classroom_id=classroom_id,
+		problems=[
+			_problem_analytics(problem_id, title, rows.get(problem_id))
+			for problem_id, title in titles.items()
+		],
+	)
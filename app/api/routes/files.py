@@ -0,0 +1,90 @@
+from typing import Annotated
+
+from fastapi import APIRouter, Header, HTTPException, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+
+from app import storage
+from app.storage.base import content_disposition
+
+router = APIRouter(tags=['files'])
+
+
+def _parse_range(header: str | None, size: int) -> tuple[int, int] | None:
+	"""
+	(início, fim) inclusivos de um `Range: bytes=...` com um intervalo.
+	None para baixar o arquivo todo (sem Range ou com vários intervalos);
+	ValueError se o intervalo não cabe no arquivo.
+	"""
+	if not header or not header.startswith('bytes=') or ',' in header:
+		return None
+	start, _, end = header[len('bytes=') :].strip().partition('-')
+	try:
+		if not start:
+			# bytes=-N: os últimos N bytes
+			start, end = max(size - int(end), 0), size - 1
+		else:
+			start = int(start)
+			end = min(int(end), size - 1) if end else size - 1
+	except ValueError:
+		return None
+	if start > end or start >= size:
+		raise ValueError('Range not satisfiable')
+	return start, end
+
+
+@router.get('/files/{digest}')
+async def download_file(
+	digest: str,
+	name: str,
+	expires: int,
+	signature: str,
+	range: Annotated[str | None, Header()] = None,
+	if_none_match: Annotated[str | None, Header()] = None,
+):
+	"""
+	Download de um arquivo pelo link assinado de `GET
+	/problems/{problem_id}/file`, com suporte a Range
+	"""
+	if not storage.verify_download(digest, name, expires, signature):
+		raise HTTPException(status_code=403, detail='Invalid or expired link')
+
+	size = await run_in_threadpool(storage.stored_size, digest)
+	if size is None:
+		raise HTTPException(status_code=404, detail='File not found')
+
+	content_type = storage.guess_content_type(name)
+	headers = {
+		'Accept-Ranges': 'bytes',
+		'Content-Disposition': content_disposition(name, content_type),
+		'X-Content-Type-Options': 'nosniff',
+		# O conteúdo nunca muda: o nome do objeto é o próprio SHA-256
+		'ETag': f'"{digest}"',
+		'Cache-Control': 'private, max-age=86400, immutable',
+	}
+	if if_none_match == headers['ETag']:
+		return Response(status_code=304, headers=headers)
+
+	try:
+		byte_range = _parse_range(range, size)
+	except ValueError:
+		return Response(
+			status_code=416, headers={'Content-Range': f'bytes */{size}'}
+		)
+
+	status_code = 200
+	start, end = 0, size - 1
+	if byte_range is not None:
+		start, end = byte_range
+		status_code = 206
+		headers['Content-Range'] = f'bytes {start}-{end}/{size}'
+	headers['Content-Length'] = str(end - start + 1)
+
+	if size == 0:
+		return Response(headers=headers)
+	return StreamingResponse(
+		storage.read_file(digest, start, end),
+		status_code=status_code,
+		media_type=content_type,
+		headers=headers,
+	)
@@ -1,6 +1,14 @@
-from typing import Annotated, Union
-
-from fastapi import APIRouter, HTTPException, UploadFile, File, Form
+from typing import Annotated
+
+from fastapi import (
+	APIRouter,
+	Depends,
+	HTTPException,
+	UploadFile,
+	File,
+	Form,
+)
+from fastapi.responses import RedirectResponse
 from pydantic import BaseModel
 
 from gpt_teacher_db.gpt_teacher.models.problem import (
@@ -9,16 +17,29 @@ from gpt_teacher_db.gpt_teacher.models.problem import (
 	ProblemUpdate,
 	ProblemPublic,
 )
-from gpt_teacher_db.gpt_teacher.models.teacher import Teacher
-from gpt_teacher_db.gpt_teacher.models.student import Student
-
-from app.api.deps import SessionDep, CurrentTeacherUser, CurrentStudentUser
-from app.cruds import classroom as classroom_crud
+from app.api.deps import (
+	AsyncSessionDep,
+	SessionDep,
+	CurrentTeacherUser,
+	CurrentStudentUser,
+	Pagination,
+	TeacherClassroom,
+	TeacherProblem,
+	UserClassroom,
+	UserProblem,
+)
+from app.cruds import access as access_crud
 from app.cruds import problem as problem_crud
+from app import storage
+from app.agents import problem_suggester
+from app.utils.text_extraction import UnsupportedFileError
+from app.utils.pagination import Page, PageParams, partial_model
 
 
 router = APIRouter(tags=['problems'])
 
+ProblemPageParams = Annotated[PageParams, Depends(Pagination(ProblemPublic))]
+
 
 class ProblemSuggestRequest(BaseModel):
 	file_url: str
@@ -29,13 +50,23 @@ class ProblemSuggestResponse(BaseModel):
 	description: str
 
 
+async def _store_file(file: UploadFile | None) -> str | None:
+	"""Grava o arquivo enviado no storage e retorna o file_url"""
+	if not file:
+		return None
+	try:
+		stored = await storage.save_upload(file)
+	except storage.FileTooLargeError as error:
+		raise HTTPException(status_code=413, detail=str(error))
+	return stored.file_url
+
+
 @router.post(
 	'/classrooms/{classroom_id}/problems', response_model=ProblemPublic
 )
 async def create_problem(
 	session: SessionDep,
-	current_user: CurrentTeacherUser,
-	classroom_id: str,
+	classroom: TeacherClassroom,
 	title: Annotated[str, Form()],
 	description: Annotated[str, Form()],
 	file: UploadFile = File(None),
@@ -43,23 +74,7 @@ async def create_problem(
 	"""
 	Cria problema na turma (FormData com arquivo opcional)
 	"""
-	# Verifica se a turma existe e pertence ao professor
-	classroom = classroom_crud.get_classroom_by_id(session, classroom_id)
-	if not classroom:
-		raise HTTPException(status_code=404, detail='Classroom not found')
-
-	if classroom.teacher_id != str(current_user.id):
-		raise HTTPException(
-			status_code=403,
-			detail='Not authorized to add problems to this classroom',
-		)
-
-	# TODO: Upload do arquivo para storage (S3, GCS, etc)
-	file_url = None
-	if file:
-		# Aqui você implementaria o upload do arquivo
-		# Por enquanto, vamos apenas simular
-		file_url = f'uploads/{file.filename}'
+	file_url = await _store_file(file)
 
 	problem_in = ProblemCreate(
 		title=title,
@@ -67,132 +82,75 @@ async def create_problem(
 		file_url=file_url,
 	)
 
-	problem = problem_crud.create_problem(session, problem_in, classroom_id)
+	problem = problem_crud.create_problem(
+		session, problem_in, str(classroom.id)
+	)
 	return problem
 
 
 @router.get(
-	'/classrooms/{classroom_id}/problems', response_model=list[ProblemPublic]
+	'/classrooms/{classroom_id}/problems',
+	response_model=Page[partial_model(ProblemPublic)],
+	response_model_exclude_unset=True,
 )
 def get_classroom_problems(
 	session: SessionDep,
-	current_user: Union[Teacher, Student],
-	classroom_id: str,
+	classroom: UserClassroom,
+	page: ProblemPageParams,
 ):
 	"""
 	Lista problemas da turma (acessível por teacher e student)
 	"""
-	classroom = classroom_crud.get_classroom_by_id(session, classroom_id)
-	if not classroom:
-		raise HTTPException(status_code=404, detail='Classroom not found')
-
-	# Verifica se o usuário tem acesso à turma
-	if isinstance(current_user, Teacher):
-		if classroom.teacher_id != str(current_user.id):
-			raise HTTPException(
-				status_code=403,
-				detail='Not authorized to access this classroom',
-			)
-	elif isinstance(current_user, Student):
-		if not classroom_crud.is_student_in_classroom(
-			session, classroom_id, str(current_user.id)
-		):
-			raise HTTPException(
-				status_code=403,
-				detail='Not authorized to access this classroom',
-			)
-
 	problems = problem_crud.get_problems_by_classroom(
-		session, classroom_id, include_sandbox=False
+		session, str(classroom.id), page, include_sandbox=False
 	)
 	return problems
 
 
-@router.get('/problems/{id}', response_model=ProblemPublic)
+@router.get('/problems/{problem_id}', response_model=ProblemPublic)
 def get_problem(
-	session: SessionDep,
-	current_user: Union[Teacher, Student],
-	id: str,
+	problem: UserProblem,
 ) -> Problem:
 	"""
 	Detalhes de um problema
 	"""
-	problem = problem_crud.get_problem_by_id(session, id)
-	if not problem:
-		raise HTTPException(status_code=404, detail='Problem not found')
-
-	# Verifica se o usuário tem acesso ao problema
-	classroom = classroom_crud.get_classroom_by_id(
-		session, problem.classroom_id
-	)
-	if not classroom:
-		raise HTTPException(status_code=404, detail='Classroom not found')
+	return problem
 
-	if isinstance(current_user, Teacher):
-		if classroom.teacher_id != str(current_user.id):
-			raise HTTPException(
-				status_code=403, detail='Not authorized to access this problem'
-			)
-	elif isinstance(current_user, Student):
-		if not classroom_crud.is_student_in_classroom(
-			session, problem.classroom_id, str(current_user.id)
-		):
-			raise HTTPException(
-				status_code=403, detail='Not authorized to access this problem'
-			)
 
-	return problem
+@router.get('/problems/{problem_id}/file')
+def get_problem_file(
+	problem: UserProblem,
+) -> RedirectResponse:
+	"""
+	Redireciona para um link temporário de download do arquivo do problema
+	"""
+	stored = storage.parse_file_url(problem.file_url)
+	if stored is None:
+		raise HTTPException(status_code=404, detail='Problem has no file')
+	return RedirectResponse(storage.download_url(*stored), status_code=307)
 
 
-@router.put('/problems/{id}', response_model=ProblemPublic)
+@router.put('/problems/{problem_id}', response_model=ProblemPublic)
 def update_problem(
 	session: SessionDep,
-	current_user: CurrentTeacherUser,
-	id: str,
+	problem: TeacherProblem,
 	problem_in: ProblemUpdate,
 ) -> Problem:
 	"""
 	Atualiza problema
 	"""
-	problem = problem_crud.get_problem_by_id(session, id)
-	if not problem:
-		raise HTTPException(status_code=404, detail='Problem not found')
-
-	# Verifica se o professor é o dono da turma
-	classroom = classroom_crud.get_classroom_by_id(
-		session, problem.classroom_id
-	)
-	if not classroom or classroom.teacher_id != str(current_user.id):
-		raise HTTPException(
-			status_code=403, detail='Not authorized to update this problem'
-		)
-
 	problem = problem_crud.update_problem(session, problem, problem_in)
 	return problem
 
 
-@router.delete('/problems/{id}')
+@router.delete('/problems/{problem_id}')
 def delete_problem(
 	session: SessionDep,
-	current_user: CurrentTeacherUser,
-	id: str,
+	problem: TeacherProblem,
 ):
 	"""
 	Remove problema
 	"""
-	problem = problem_crud.get_problem_by_id(session, id)
-	if not problem:
-		raise HTTPException(status_code=404, detail='Problem not found')
-
-	# Verifica se o professor é o dono da turma
-	classroom = classroom_crud.get_classroom_by_id(
-		session, problem.classroom_id
-	)
-	if not classroom or classroom.teacher_id != str(current_user.id):
-		raise HTTPException(
-			status_code=403, detail='Not authorized to delete this problem'
-		)
-
 	problem_crud.delete_problem(session, problem)
 	return {'message': 'Problem deleted successfully'}
 
@@ -209,18 +167,16 @@ async def create_sandbox_problem(
 	"""
 	Aluno cria problema sandbox
 	"""
-	# Verifica se o aluno está na turma
-	if not classroom_crud.is_student_in_classroom(
-		session, classroom_id, str(current_user.id)
-	):
+	# Verifica se a turma existe e o aluno está nela (uma consulta)
+	row = access_crud.get_classroom_access(session, classroom_id, current_user)
+	if not row:
+		raise HTTPException(status_code=404, detail='Classroom not found')
+	if not row[1]:
 		raise HTTPException(
 			status_code=403, detail='Not authorized to access this classroom'
 		)
 
-	# TODO: Upload do arquivo para storage
-	file_url = None
-	if file:
-		file_url = f'uploads/{file.filename}'
+	file_url = await _store_file(file)
 
 	problem_in = ProblemCreate(
 		title=title,
@@ -239,43 +195,59 @@ async def create_sandbox_problem(
 
 
 @router.get(
-	'/classrooms/{id}/problems/sandbox', response_model=list[ProblemPublic]
+	'/classrooms/{classroom_id}/problems/sandbox',
+	response_model=Page[partial_model(ProblemPublic)],
+	response_model_exclude_unset=True,
 )
 def get_sandbox_problems(
 	session: SessionDep,
-	current_user: CurrentTeacherUser,
-	id: str,
+	classroom: TeacherClassroom,
+	page: ProblemPageParams,
 ):
 	"""
 	Lista problemas sandbox da turma
 	"""
-	classroom = classroom_crud.get_classroom_by_id(session, id)
-	if not classroom:
-		raise HTTPException(status_code=404, detail='Classroom not found')
-
-	if classroom.teacher_id != str(current_user.id):
-		raise HTTPException(
-			status_code=403, detail='Not authorized to access this classroom'
-		)
-
-	problems = problem_crud.get_sandbox_problems_by_classroom(session, id)
+	problems = problem_crud.get_sandbox_problems_by_classroom(
+		session, str(classroom.id), page
+	)
 	return problems
 
 
 @router.post('/problems/suggest', response_model=ProblemSuggestResponse)
-def suggest_problem(
-	session: SessionDep,
+async def suggest_problem(
+	session: AsyncSessionDep,
 	current_user: CurrentTeacherUser,
 	request: ProblemSuggestRequest,
 ) -> ProblemSuggestResponse:
 	"""
-	IA sugere título/descrição do problema
+	IA sugere título/descrição do problema a partir do arquivo enviado
 	"""
-	# TODO: Implementar integração com IA para sugerir título e descrição
-	# baseado no arquivo enviado (request.file_url)
+	# Só arquivos de problemas das turmas do professor
+	stored = storage.parse_file_url(request.file_url)
+	if stored is None or not await access_crud.ahas_file_access(
+		session, stored[0], current_user
+	):
+		raise HTTPException(status_code=404, detail='File not found')
+	# Não segura a conexão durante a extração e a chamada ao modelo
+	await session.close()
+
+	try:
+		suggestion = await problem_suggester.suggest_problem(request.file_url)
+	except FileNotFoundError:
+		raise HTTPException(status_code=404, detail='File not found')
+	except storage.FileTooLargeError as error:
+		raise HTTPException(status_code=413, detail=str(error))
+	except UnsupportedFileError as error:
+		raise HTTPException(status_code=415, detail=str(error))
+	except TimeoutError:
+		raise HTTPException(
+			status_code=504, detail='Suggestion took too long to generate'
+		)
+	except ValueError:
+		raise HTTPException(
+			status_code=502, detail='Could not generate a suggestion'
+		)
 
-	# Por enquanto, retorna um exemplo
 	return ProblemSuggestResponse(
-		title='Problema sugerido pela IA',
-		description='Descrição sugerida pela IA baseada no arquivo fornecido.',
+		title=suggestion.title, description=suggestion.description
 	)
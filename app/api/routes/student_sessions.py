@@ -1,4 +1,6 @@
-from fastapi import APIRouter, HTTPException
+from typing import Annotated
+
+from fastapi import APIRouter, Depends, HTTPException
 
 from gpt_teacher_db.gpt_teacher.models.student_session import (
 	StudentSession,
@@ -6,10 +8,15 @@ from gpt_teacher_db.gpt_teacher.models.student_session import (
 	StudentSessionPublic,
 )
 
-from app.api.deps import SessionDep, CurrentStudentUser
+from app.api.deps import (
+	SessionDep,
+	CurrentStudentUser,
+	Pagination,
+	StudentProblem,
+)
+from app.cruds import access as access_crud
 from app.cruds import student_session as session_crud
-from app.cruds import problem as problem_crud
-from app.cruds import classroom as classroom_crud
+from app.utils.pagination import Page, PageParams, partial_model
 
 
 router = APIRouter(tags=['student-sessions'])
@@ -24,15 +31,13 @@ def create_student_session(
 	"""
 	Inicia sessão (fecha anterior automaticamente)
 	"""
-	# Verifica se o problema existe
-	problem = problem_crud.get_problem_by_id(session, session_in.problem_id)
-	if not problem:
+	# Verifica se o problema existe e o aluno está na turma (uma consulta)
+	row = access_crud.get_problem_access(
+		session, session_in.problem_id, current_user
+	)
+	if not row:
 		raise HTTPException(status_code=404, detail='Problem not found')
-
-	# Verifica se o aluno tem acesso ao problema (está na turma)
-	if not classroom_crud.is_student_in_classroom(
-		session, problem.classroom_id, str(current_user.id)
-	):
+	if not row[1]:
 		raise HTTPException(
 			status_code=403, detail='Not authorized to access this problem'
 		)
@@ -58,16 +63,18 @@ def get_active_session(
 	return active_session
 
 
-@router.get('/{id}', response_model=StudentSessionPublic)
+@router.get('/{session_id}', response_model=StudentSessionPublic)
 def get_student_session(
 	session: SessionDep,
 	current_user: CurrentStudentUser,
-	id: str,
+	session_id: str,
 ) -> StudentSession:
 	"""
 	Detalhes da sessão (inclui messages via relationship)
 	"""
-	student_session = session_crud.get_student_session_by_id(session, id)
+	student_session = session_crud.get_student_session_by_id(
+		session, session_id
+	)
 	if not student_session:
 		raise HTTPException(status_code=404, detail='Session not found')
 
@@ -79,16 +86,18 @@ def get_student_session(
 	return student_session
 
 
-@router.post('/{id}/close', response_model=StudentSessionPublic)
+@router.post('/{session_id}/close', response_model=StudentSessionPublic)
 def close_student_session(
 	session: SessionDep,
 	current_user: CurrentStudentUser,
-	id: str,
+	session_id: str,
 ) -> StudentSession:
 	"""
-	Fecha sessão manualmente
+	Fecha sessão manualmente. A consolidação é gerada em segundo plano
 	"""
-	student_session = session_crud.get_student_session_by_id(session, id)
+	student_session = session_crud.get_student_session_by_id(
+		session, session_id
+	)
 	if not student_session:
 		raise HTTPException(status_code=404, detail='Session not found')
 
@@ -102,39 +111,25 @@ def close_student_session(
 			status_code=400, detail='Session is already closed'
 		)
 
-	# TODO: Gerar consolidação com IA antes de fechar a sessão
-	# consolidated = generate_consolidation(student_session)
-
 	student_session = session_crud.close_session(session, student_session)
 	return student_session
 
 
 @router.get(
 	'/problems/{problem_id}/sessions',
-	response_model=list[StudentSessionPublic],
+	response_model=Page[partial_model(StudentSessionPublic)],
+	response_model_exclude_unset=True,
 )
 def get_problem_student_sessions(
 	session: SessionDep,
 	current_user: CurrentStudentUser,
-	problem_id: str,
+	problem: StudentProblem,
+	page: Annotated[PageParams, Depends(Pagination(StudentSessionPublic))],
 ):
 	"""
 	Histórico de sessões do aluno no problema
 	"""
-	# Verifica se o problema existe
-	problem = problem_crud.get_problem_by_id(session, problem_id)
-	if not problem:
-		raise HTTPException(status_code=404, detail='Problem not found')
-
-	# Verifica se o aluno tem acesso ao problema
-	if not classroom_crud.is_student_in_classroom(
-		session, problem.classroom_id, str(current_user.id)
-	):
-		raise HTTPException(
-			status_code=403, detail='Not authorized to access this problem'
-		)
-
 	sessions = session_crud.get_sessions_by_problem_and_student(
-		session, problem_id, str(current_user.id)
+		session, str(problem.id), str(current_user.id), page
 	)
 	return sessions
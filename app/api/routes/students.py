@@ -1,4 +1,8 @@
-from fastapi import APIRouter
+import secrets
+from typing import Annotated
+
+from fastapi import APIRouter, Depends, File, Form, HTTPException, UploadFile
+from pydantic import BaseModel
 
 from gpt_teacher_db.gpt_teacher.models.student import (
 	Student,
@@ -7,13 +11,39 @@ from gpt_teacher_db.gpt_teacher.models.student import (
 )
 from gpt_teacher_db.gpt_teacher.models.classroom import ClassroomPublic
 
-from app.api.deps import SessionDep, CurrentStudentUser
+from app.api.deps import (
+	AsyncSessionDep,
+	CurrentStudentUser,
+	CurrentTeacherUser,
+	Pagination,
+	SessionDep,
+)
+from app.core.config import settings
+from app.cruds import access as access_crud
 from app.cruds import student as student_crud
+from app.utils.csv_import import CSVImportError, parse_csv
+from app.utils.pagination import Page, PageParams, partial_model
 
 
 router = APIRouter(tags=['students'])
 
 
+class ProvisionedStudent(BaseModel):
+	row: int
+	email: str
+	# created, duplicate, email_taken, registration_number_taken ou invalid
+	status: str
+	student_id: str | None = None
+	# Senha inicial gerada (quando o CSV não tem a coluna password)
+	password: str | None = None
+
+
+class BulkProvisionResponse(BaseModel):
+	created: int
+	enrolled: int
+	results: list[ProvisionedStudent]
+
+
 @router.get('/me', response_model=StudentPublic)
 def get_student_me(
 	current_user: CurrentStudentUser,
@@ -37,15 +67,82 @@ def update_student_me(
 	return student
 
 
-@router.get('/me/classrooms', response_model=list[ClassroomPublic])
+@router.get(
+	'/me/classrooms',
+	response_model=Page[partial_model(ClassroomPublic)],
+	response_model_exclude_unset=True,
+)
 def get_student_classrooms(
 	session: SessionDep,
 	current_user: CurrentStudentUser,
+	page: Annotated[PageParams, Depends(Pagination(ClassroomPublic))],
 ):
 	"""
 	Lista turmas que o aluno participa
 	"""
 	classrooms = student_crud.get_student_classrooms(
-		session, str(current_user.id)
+		session, str(current_user.id), page
 	)
 	return classrooms
+
+
+@router.post('/bulk', response_model=BulkProvisionResponse)
+async def bulk_create_students(
+	session: AsyncSessionDep,
+	current_user: CurrentTeacherUser,
+	file: UploadFile = File(...),
+	classroom_id: str | None = Form(None),
+) -> BulkProvisionResponse:
+	"""
+	Cadastra os alunos de um CSV (email, name, registration_number e,
+	opcional, password), e os matricula na turma `classroom_id` se passada.
+	Sem a coluna password, a senha inicial é gerada e vem na resposta.
+	"""
+	if classroom_id is not None:
+		row = await access_crud.aget_classroom_access(
+			session, classroom_id, current_user
+		)
+		if row is None:
+			raise HTTPException(status_code=404, detail='Classroom not found')
+		if not row[1]:
+			raise HTTPException(
+				status_code=403,
+				detail='Not authorized to access this classroom',
+			)
+
+	try:
+		rows = parse_csv(await file.read(), settings.BULK_IMPORT_MAX_ROWS)
+	except CSVImportError as error:
+		raise HTTPException(status_code=400, detail=str(error))
+	if rows and not {'email', 'name'} <= rows[0].keys():
+		raise HTTPException(
+			status_code=400, detail='CSV must have email and name columns'
+		)
+
+	results = [
+		ProvisionedStudent(row=number, email=row['email'], status='invalid')
+		for number, row in enumerate(rows, 1)
+	]
+	valid = []
+	for result, row in zip(results, rows):
+		if '@' not in row['email'] or not row['name']:
+			continue
+		if not row.get('password'):
+			result.password = row['password'] = secrets.token_urlsafe(9)
+		valid.append((result, row))
+
+	outcome = await student_crud.abulk_create_students(
+		session, [row for _, row in valid], classroom_id
+	)
+	for (result, _), (status, student_id) in zip(valid, outcome):
+		result.status = status
+		result.student_id = student_id
+		if status != 'created':
+			result.password = None
+
+	created = sum(result.status == 'created' for result in results)
+	return BulkProvisionResponse(
+		created=created,
+		enrolled=created if classroom_id is not None else 0,
+		results=results,
+	)
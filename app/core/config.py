@@ -65,5 +65,186 @@ class Settings(BaseSettings):
 			)
 		)
 
+	# Pool de conexões do SQLAlchemy (por engine e processo). As rotas do
+	# chat não seguram conexão durante a chamada ao LLM
+	DB_POOL_SIZE: int = 20
+	DB_MAX_OVERFLOW: int = 20
+	# Segundos esperando uma conexão livre antes de falhar
+	DB_POOL_TIMEOUT: float = 30.0
+
+	# Pool de conexões do checkpointer do agente (LangGraph)
+	CHECKPOINTER_POOL_MIN_SIZE: int = 1
+	CHECKPOINTER_POOL_MAX_SIZE: int = 10
+	# Segundos esperando uma conexão livre antes de falhar
+	CHECKPOINTER_POOL_TIMEOUT: float = 30.0
+	# Segundos até fechar conexões ociosas acima do min_size
+	CHECKPOINTER_POOL_MAX_IDLE: float = 600.0
+
+	# Esquema dos novos hashes de senha: 'bcrypt_sha256', 'bcrypt' ou
+	# 'argon2' (extra opcional). Hashes em outro esquema ou custo são
+	# refeitos no próximo login
+	PASSWORD_HASH_SCHEME: str = 'bcrypt_sha256'
+	# Hashes bcrypt puros ainda não refeitos: 'bcrypt' (antigo security.py,
+	# usado pelos cadastros), 'sha256' (pré-hash do security_v2) ou 'both'
+	# (bases com os dois; senha errada custa dois bcrypt)
+	PASSWORD_LEGACY_BCRYPT_FORMAT: str = 'bcrypt'
+	# Custo do bcrypt (log2 das iterações)
+	BCRYPT_ROUNDS: int = 12
+	ARGON2_TIME_COST: int = 2
+	# Memória do argon2 em KiB
+	ARGON2_MEMORY_COST: int = 19_456
+	ARGON2_PARALLELISM: int = 1
+	# Processos dedicados ao hash de senhas (login e cadastro); 0 usa threads
+	PASSWORD_HASH_WORKERS: int = 2
+	# Chamadas enviadas ao pool ao mesmo tempo; as demais esperam na fila
+	PASSWORD_HASH_MAX_PENDING: int = 64
+
+	# Cache do usuário autenticado por token; TTL 0 desativa. Com
+	# AUTH_CACHE_REDIS_URL o cache é compartilhado entre os workers
+	AUTH_CACHE_SIZE: int = 10_000
+	AUTH_CACHE_TTL_SECONDS: float = 60.0
+	# TTL das entradas de sub sem usuário daquele tipo
+	AUTH_CACHE_NEGATIVE_TTL_SECONDS: float = 5.0
+	AUTH_CACHE_REDIS_URL: str | None = None
+
+	# Itens por página nas listagens (paginação por cursor)
+	PAGINATION_DEFAULT_LIMIT: int = 50
+	PAGINATION_MAX_LIMIT: int = 200
+
+	# Linhas aceitas nas importações em lote (matrícula e cadastro)
+	BULK_IMPORT_MAX_ROWS: int = 1_000
+
+	# Arquivos dos problemas: 'local' (disco) ou 's3' (S3 ou compatível,
+	# como MinIO; extra opcional). Os objetos são endereçados pelo SHA-256
+	STORAGE_BACKEND: str = 'local'
+	STORAGE_LOCAL_PATH: str = 'storage'
+	STORAGE_S3_BUCKET: str = 'gpt-teacher'
+	STORAGE_S3_ENDPOINT_URL: str | None = None
+	STORAGE_S3_REGION: str | None = None
+	STORAGE_S3_ACCESS_KEY: str | None = None
+	STORAGE_S3_SECRET_KEY: str | None = None
+	# Com False os downloads passam pela API em vez de ir direto ao S3
+	STORAGE_S3_PRESIGNED_URLS: bool = True
+	STORAGE_MAX_UPLOAD_BYTES: int = 20 * 1024 * 1024
+	STORAGE_CHUNK_BYTES: int = 1024 * 1024
+	# Validade dos links de download
+	STORAGE_URL_EXPIRE_SECONDS: int = 300
+
+	# Mensagens do aluno em um problema a partir das quais ele conta como
+	# travado na análise da turma
+	ANALYTICS_STUCK_MESSAGES: int = 15
+
+	# Long-poll das mensagens do chat: espera máxima pedida pelo cliente e
+	# intervalo para consultar o banco (mensagens de outros workers)
+	CHAT_POLL_MAX_WAIT_SECONDS: float = 30.0
+	CHAT_POLL_INTERVAL_SECONDS: float = 2.0
+
+	# Tempo por etapa (auth, db, checkpoint, agent, llm) em /metrics e no
+	# header Server-Timing; requisições acima do limite vão para o log.
+	# Spans do OpenTelemetry precisam do extra opcional otel
+	TELEMETRY_ENABLED: bool = True
+	TELEMETRY_SERVER_TIMING: bool = True
+	TELEMETRY_SLOW_REQUEST_SECONDS: float = 2.0
+	TELEMETRY_OTEL_ENABLED: bool = False
+
+	# Desenvolvimento e CI: quantidade e tempo das consultas SQL de cada
+	# requisição nos headers X-DB-Queries e X-DB-Time-Ms, e aviso no log
+	# quando o mesmo SQL se repete a partir do limite (N+1)
+	QUERY_COUNTER_ENABLED: bool = False
+	QUERY_COUNTER_REPEAT_THRESHOLD: int = 5
+
+	# Quantidade máxima de agentes compilados mantidos em memória
+	TEACHER_AGENT_CACHE_SIZE: int = 128
+
+	# Cache de respostas do primeiro turno (mesmo problema, código e dúvida)
+	RESPONSE_CACHE_ENABLED: bool = True
+	RESPONSE_CACHE_SIZE: int = 4096
+	RESPONSE_CACHE_TTL_SECONDS: float = 6 * 60 * 60
+	# Reaproveitar a resposta de um código só parecido (Jaccard via MinHash,
+	# opcional; 0 desativa). Arriscado: a correção de um único token mantém
+	# a similaridade acima de 0.9 e o aluno recebe a resposta da versão com
+	# o erro. Sem ele, só código idêntico (normalizado) usa o cache
+	RESPONSE_CACHE_SIMILARITY_THRESHOLD: float = 0.0
+	RESPONSE_CACHE_MINHASH_PERMUTATIONS: int = 64
+
+	# Turnos mantidos na íntegra no contexto do agente; os anteriores são
+	# resumidos a cada CONTEXT_SUMMARY_BATCH_TURNS turnos excedentes
+	CONTEXT_KEEP_TURNS: int = 6
+	CONTEXT_SUMMARY_BATCH_TURNS: int = 4
+	CONTEXT_SUMMARY_ENABLED: bool = True
+	CONTEXT_SUMMARY_DIFFICULTY: str = 'LOW'
+
+	# Controle de admissão das chamadas ao LLM (por processo)
+	LLM_MAX_CONCURRENCY: int = 32
+	LLM_CLASSROOM_MAX_CONCURRENCY: int = 8
+	# Mensagens por minuto de cada aluno, com rajada de LLM_STUDENT_BURST
+	LLM_STUDENT_RATE_PER_MINUTE: float = 6.0
+	LLM_STUDENT_BURST: int = 3
+	LLM_ADMISSION_MAX_WAIT_SECONDS: float = 15.0
+	LLM_ADMISSION_MAX_QUEUE: int = 500
+
+	# Prazo, retentativas e fallback das chamadas ao modelo do agente
+	LLM_ATTEMPT_TIMEOUT_SECONDS: float = 20.0
+	LLM_CALL_DEADLINE_SECONDS: float = 45.0
+	LLM_MAX_RETRIES: int = 2
+	LLM_RETRY_BACKOFF_SECONDS: float = 0.5
+	LLM_RETRY_BACKOFF_MAX_SECONDS: float = 4.0
+	# Segundos até disparar uma requisição paralela (hedge); 0 desativa
+	LLM_HEDGE_AFTER_SECONDS: float = 8.0
+	# Cai para as dificuldades mais baixas (MEDIUM -> LOW) após as falhas
+	LLM_FALLBACK_ENABLED: bool = True
+
+	# Geração das consolidações em segundo plano (fila no Postgres)
+	CONSOLIDATION_ENABLED: bool = True
+	# Tarefas processadas ao mesmo tempo por processo
+	CONSOLIDATION_WORKERS: int = 2
+	CONSOLIDATION_DIFFICULTY: str = 'MEDIUM'
+	# Intervalo para buscar tarefas sem notificação (de outros processos)
+	CONSOLIDATION_POLL_SECONDS: float = 5.0
+	CONSOLIDATION_MAX_ATTEMPTS: int = 5
+	CONSOLIDATION_RETRY_BACKOFF_SECONDS: float = 30.0
+	# Tarefa 'running' sem renovar o lease há mais tempo que isso é retomada
+	# (worker caiu). O lease é renovado antes de cada chamada ao modelo
+	CONSOLIDATION_LEASE_SECONDS: float = 300.0
+	# Sessões do mesmo problema consolidadas em uma chamada; 1 desativa.
+	# Conversas longas (em tokens) são consolidadas sozinhas
+	CONSOLIDATION_BATCH_SIZE: int = 8
+	CONSOLIDATION_BATCH_MAX_TOKENS: int = 8_000
+	CONSOLIDATION_BATCH_SESSION_MAX_TOKENS: int = 2_000
+
+	# Sugestão de título/descrição a partir do arquivo do problema. A
+	# extração do texto roda em processos próprios (0 usa threads); PDFs
+	# precisam do extra opcional pdf
+	PROBLEM_SUGGESTION_DIFFICULTY: str = 'MEDIUM'
+	PROBLEM_SUGGESTION_WORKERS: int = 1
+	PROBLEM_SUGGESTION_MAX_PAGES: int = 100
+	# Arquivos maiores não são lidos para a sugestão
+	PROBLEM_SUGGESTION_MAX_FILE_BYTES: int = 10 * 1024 * 1024
+	PROBLEM_SUGGESTION_CHUNK_TOKENS: int = 1_000
+	# Tokens do arquivo enviados ao modelo; acima disso vai uma amostra
+	PROBLEM_SUGGESTION_MAX_INPUT_TOKENS: int = 6_000
+	# Textos extraídos e sugestões guardados por SHA-256 do arquivo
+	PROBLEM_SUGGESTION_CACHE_SIZE: int = 256
+
+	# Provedor de LLM: 'groq', 'openai' (API compatível) ou 'fake' (local)
+	LLM_PROVIDER: str = 'groq'
+	LLM_TEMPERATURE: float = 0.3
+	# Encoding do tiktoken (extra opcional tokens) para contar os tokens
+	# localmente
+	LLM_TOKENIZER_ENCODING: str = 'o200k_base'
+	LLM_BASE_URL: str | None = None
+	LLM_API_KEY: str | None = None
+	# Sobrescrevem o modelo padrão de cada dificuldade
+	LLM_MODEL_LOW: str | None = None
+	LLM_MODEL_MEDIUM: str | None = None
+	LLM_MODEL_HIGH: str | None = None
+
+	# Modelo falso para benchmarks e testes de carga (LLM_PROVIDER=fake)
+	FAKE_LLM_LATENCY_SECONDS: float = 0.5
+	FAKE_LLM_TOKENS_PER_SECOND: float = 50.0
+	FAKE_LLM_RESPONSE_TOKENS: int = 120
+	FAKE_LLM_FAILURE_RATE: float = 0.0
+	FAKE_LLM_SEED: int | None = None
+
 
 settings = Settings()
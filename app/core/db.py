@@ -1,10 +1,104 @@
-from sqlmodel import Session, create_engine
+from sqlalchemy import inspect, text
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.schema import CreateColumn
+from sqlmodel import Session, SQLModel, create_engine
+from sqlmodel.ext.asyncio.session import AsyncSession
 
 from app.core.config import settings
+from app.cruds.analytics import backfill_statement
+from app.models import BACKEND_TABLES, StudentProblemStats
+from app.utils.query_counter import install_query_counter
 
-engine = create_engine(str(settings.SQLALCHEMY_DATABASE_URI))
+# Chave do advisory lock do init_db: cada worker roda o init_db no startup
+INIT_DB_LOCK_KEY = 7_301_452
+
+_POOL_OPTIONS = {
+	'pool_size': settings.DB_POOL_SIZE,
+	'max_overflow': settings.DB_MAX_OVERFLOW,
+	'pool_timeout': settings.DB_POOL_TIMEOUT,
+}
+
+engine = create_engine(str(settings.SQLALCHEMY_DATABASE_URI), **_POOL_OPTIONS)
+async_engine = create_async_engine(
+	str(settings.SQLALCHEMY_DATABASE_URI), **_POOL_OPTIONS
+)
+
+
+def _pool_stats(pool) -> dict[str, int]:
+	return {
+		'size': pool.size(),
+		'checked_out': pool.checkedout(),
+		'overflow': pool.overflow(),
+	}
+
+
+def get_db_pool_stats() -> dict[str, dict[str, int]]:
+	return {
+		'sync': _pool_stats(engine.pool),
+		'async': _pool_stats(async_engine.pool),
+	}
+
+
+# Consultas por requisição (QUERY_COUNTER_ENABLED) e assert_max_queries
+install_query_counter(engine)
+install_query_counter(async_engine.sync_engine)
+
+
+def _add_missing_columns(connection) -> None:
+	"""
+	Adiciona às tabelas do backend já existentes as colunas novas dos
+	modelos (o projeto não usa migrations). Linhas antigas recebem o DEFAULT
+	da coluna; uma coluna NOT NULL precisa de server_default.
+	"""
+	inspector = inspect(connection)
+	for table in BACKEND_TABLES:
+		if not inspector.has_table(table.name):
+			continue
+		existing = {
+			column['name'] for column in inspector.get_columns(table.name)
+		}
+		for column in table.columns:
+			if column.name in existing:
+				continue
+			definition = CreateColumn(column).compile(
+				dialect=connection.dialect
+			)
+			connection.execute(
+				text(
+					f'ALTER TABLE {table.name} '
+					f'ADD COLUMN IF NOT EXISTS {definition}'
+				)
+			)
+
+
+async def init_db() -> None:
+	"""Cria as tabelas do backend que ainda não existem"""
+	async with async_engine.begin() as connection:
+		# Um worker por vez: os demais esperam e já encontram tudo criado
+		if connection.dialect.name == 'postgresql':
+			await connection.execute(
+				text('SELECT pg_advisory_xact_lock(:key)'),
+				{'key': INIT_DB_LOCK_KEY},
+			)
+		stats_exists = await connection.run_sync(
+			lambda sync: inspect(sync).has_table(
+				StudentProblemStats.__tablename__
+			)
+		)
+		await connection.run_sync(
+			SQLModel.metadata.create_all, tables=BACKEND_TABLES
+		)
+		await connection.run_sync(_add_missing_columns)
+		# Contadores criados agora partem dos dados já existentes
+		if not stats_exists:
+			await connection.execute(backfill_statement())
 
 
 def get_db():
 	with Session(engine) as session:
 		yield session
+
+
+async def get_async_db():
+	async with AsyncSession(async_engine, expire_on_commit=False) as session:
+		yield session
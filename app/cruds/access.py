@@ -0,0 +1,98 @@
+from gpt_teacher_db.gpt_teacher.models.classroom import Classroom
+from gpt_teacher_db.gpt_teacher.models.classroom_student import (
+	ClassroomStudent,
+)
+from gpt_teacher_db.gpt_teacher.models.problem import Problem
+from gpt_teacher_db.gpt_teacher.models.student import Student
+from gpt_teacher_db.gpt_teacher.models.teacher import Teacher
+from sqlalchemy import exists, literal
+from sqlmodel import Session, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.utils.telemetry import traced
+
+# Cada função resolve "o usuário pode acessar Y" junto com a busca de Y, em
+# uma única consulta. Retorna None se Y não existe, senão (Y, tem acesso).
+
+
+def _classroom_access(classroom_id_column, user: Teacher | Student):
+	"""Expressão booleana: o usuário é dono ou aluno da turma"""
+	if isinstance(user, Teacher):
+		return exists().where(
+			Classroom.id == classroom_id_column,
+			Classroom.teacher_id == str(user.id),
+		)
+	if isinstance(user, Student):
+		return exists().where(
+			ClassroomStudent.classroom_id == classroom_id_column,
+			ClassroomStudent.student_id == str(user.id),
+		)
+	return literal(False)
+
+
+def _classroom_access_statement(classroom_id: str, user: Teacher | Student):
+	if isinstance(user, Teacher):
+		# A turma já tem o dono, não precisa de subconsulta
+		has_access = Classroom.teacher_id == str(user.id)
+	else:
+		has_access = _classroom_access(Classroom.id, user)
+
+	return select(Classroom, has_access).where(Classroom.id == classroom_id)
+
+
+@traced('db')
+def get_classroom_access(
+	session: Session, classroom_id: str, user: Teacher | Student
+) -> tuple[Classroom, bool] | None:
+	"""Busca a turma e se o usuário tem acesso a ela"""
+	statement = _classroom_access_statement(classroom_id, user)
+	return session.exec(statement).first()
+
+
+@traced('db')
+async def aget_classroom_access(
+	session: AsyncSession, classroom_id: str, user: Teacher | Student
+) -> tuple[Classroom, bool] | None:
+	"""Busca a turma e se o usuário tem acesso a ela (sessão assíncrona)"""
+	statement = _classroom_access_statement(classroom_id, user)
+	return (await session.exec(statement)).first()
+
+
+@traced('db')
+def get_problem_access(
+	session: Session, problem_id: str, user: Teacher | Student
+) -> tuple[Problem, bool] | None:
+	"""Busca o problema e se o usuário tem acesso à turma dele"""
+	statement = select(
+		Problem, _classroom_access(Problem.classroom_id, user)
+	).where(Problem.id == problem_id)
+	return session.exec(statement).first()
+
+
+@traced('db')
+def get_student_access(
+	session: Session, student_id: str, teacher: Teacher
+) -> tuple[Student, bool] | None:
+	"""Busca o aluno e se ele está em alguma turma do professor"""
+	has_access = exists().where(
+		ClassroomStudent.student_id == Student.id,
+		Classroom.id == ClassroomStudent.classroom_id,
+		Classroom.teacher_id == str(teacher.id),
+	)
+	statement = select(Student, has_access).where(Student.id == student_id)
+	return session.exec(statement).first()
+
+
+@traced('db')
+async def ahas_file_access(
+	session: AsyncSession, digest: str, teacher: Teacher
+) -> bool:
+	"""Se algum problema das turmas do professor usa o arquivo"""
+	statement = select(
+		exists().where(
+			Problem.file_url.startswith(f'files/{digest}/'),
+			Classroom.id == Problem.classroom_id,
+			Classroom.teacher_id == str(teacher.id),
+		)
+	)
+	return (await session.exec(statement)).one()
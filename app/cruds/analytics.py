@@ -0,0 +1,228 @@
+from datetime import datetime
+
+from gpt_teacher_db.gpt_teacher.models.chat_message import ChatMessage
+from gpt_teacher_db.gpt_teacher.models.problem import Problem
+from gpt_teacher_db.gpt_teacher.models.student_session import StudentSession
+from sqlalchemy import case, extract, literal, literal_column
+from sqlalchemy.dialects.postgresql import insert
+from sqlmodel import Session, func, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.models import StudentProblemStats
+from app.utils.telemetry import traced
+
+# As funções record_* rodam na transação de quem grava a sessão ou a
+# mensagem (sem commit): o contador só muda se a escrita for gravada.
+
+KEY_COLUMNS = ['problem_id', 'student_id', 'classroom_id']
+
+
+def _session_duration():
+	duration = StudentSession.ended_at - StudentSession.created_at
+	return extract('epoch', duration)
+
+
+def _upsert_stats(where, increments: dict, last_activity_at):
+	"""
+	INSERT ... SELECT a partir das sessões do aluno que atendem `where`,
+	somando `increments` (expressões SQL) aos contadores já existentes
+	"""
+	key = [StudentSession.problem_id, StudentSession.student_id]
+	source = (
+		select(
+			*key,
+			Problem.classroom_id,
+			*(func.sum(value) for value in increments.values()),
+			func.max(last_activity_at),
+		)
+		.join(Problem, Problem.id == StudentSession.problem_id)
+		.where(where)
+		# Uma linha por (problema, aluno): o ON CONFLICT não pode atualizar
+		# a mesma linha duas vezes no mesmo comando
+		.group_by(*key, Problem.classroom_id)
+	)
+	statement = insert(StudentProblemStats).from_select(
+		[*KEY_COLUMNS, *increments, 'last_activity_at'], source
+	)
+	excluded = statement.excluded
+	return statement.on_conflict_do_update(
+		index_elements=['problem_id', 'student_id'],
+		set_={
+			**{
+				name: getattr(StudentProblemStats, name)
+				+ getattr(excluded, name)
+				for name in increments
+			},
+			'last_activity_at': func.greatest(
+				StudentProblemStats.last_activity_at,
+				excluded.last_activity_at,
+			),
+		},
+	)
+
+
+@traced('db')
+def record_session_started(session: Session, session_id: str) -> None:
+	session.flush()
+	session.exec(
+		_upsert_stats(
+			StudentSession.id == session_id,
+			{'sessions_started': literal_column('1')},
+			literal(datetime.utcnow()),
+		)
+	)
+
+
+@traced('db')
+def record_sessions_closed(session: Session, session_ids: list[str]) -> None:
+	if not session_ids:
+		return
+	# A duração vem do ended_at já gravado na transação
+	session.flush()
+	session.exec(
+		_upsert_stats(
+			StudentSession.id.in_(session_ids),
+			{
+				'sessions_closed': literal_column('1'),
+				'session_seconds': _session_duration(),
+			},
+			StudentSession.ended_at,
+		)
+	)
+
+
+def _message_statement(session_id: str, role: str):
+	return _upsert_stats(
+		StudentSession.id == session_id,
+		{
+			'messages': literal_column('1'),
+			'student_messages': literal_column('1' if role == 'user' else '0'),
+		},
+		literal(datetime.utcnow()),
+	)
+
+
+@traced('db')
+def record_message(session: Session, session_id: str, role: str) -> None:
+	session.exec(_message_statement(session_id, role))
+
+
+@traced('db')
+async def arecord_message(
+	session: AsyncSession, session_id: str, role: str
+) -> None:
+	await session.exec(_message_statement(session_id, role))
+
+
+def backfill_statement():
+	"""
+	Recalcula todos os contadores a partir das sessões e mensagens (quando
+	a tabela é criada em um banco que já tem dados)
+	"""
+	key = [StudentSession.problem_id, StudentSession.student_id]
+	sessions = (
+		select(
+			*key,
+			func.count().label('sessions_started'),
+			func.count(StudentSession.ended_at).label('sessions_closed'),
+			func.coalesce(func.sum(_session_duration()), 0).label(
+				'session_seconds'
+			),
+			func.max(
+				func.coalesce(
+					StudentSession.ended_at, StudentSession.created_at
+				)
+			).label('last_activity_at'),
+		)
+		.group_by(*key)
+		.subquery()
+	)
+	messages = (
+		select(
+			*key,
+			func.count(ChatMessage.id).label('messages'),
+			func.count(ChatMessage.id)
+			.filter(ChatMessage.role == 'user')
+			.label('student_messages'),
+			func.max(ChatMessage.created_at).label('last_activity_at'),
+		)
+		.join(ChatMessage, ChatMessage.session_id == StudentSession.id)
+		.group_by(*key)
+		.subquery()
+	)
+	source = (
+		select(
+			sessions.c.problem_id,
+			sessions.c.student_id,
+			Problem.classroom_id,
+			sessions.c.sessions_started,
+			sessions.c.sessions_closed,
+			sessions.c.session_seconds,
+			func.coalesce(messages.c.messages, 0),
+			func.coalesce(messages.c.student_messages, 0),
+			func.greatest(
+				sessions.c.last_activity_at, messages.c.last_activity_at
+			),
+		)
+		.join(Problem, Problem.id == sessions.c.problem_id)
+		.outerjoin(
+			messages,
+			(messages.c.problem_id == sessions.c.problem_id)
+			& (messages.c.student_id == sessions.c.student_id),
+		)
+	)
+	return (
+		insert(StudentProblemStats)
+		.from_select(
+			[
+				*KEY_COLUMNS,
+				'sessions_started',
+				'sessions_closed',
+				'session_seconds',
+				'messages',
+				'student_messages',
+				'last_activity_at',
+			],
+			source,
+		)
+		.on_conflict_do_nothing()
+	)
+
+
+@traced('db')
+def get_classroom_analytics(
+	session: Session, classroom_id: str, stuck_messages: int
+) -> list:
+	"""
+	Totais por problema da turma, somando os contadores dos alunos. Aluno
+	travado: enviou `stuck_messages` ou mais mensagens no problema.
+	"""
+	stats = StudentProblemStats
+	statement = (
+		select(
+			stats.problem_id,
+			func.count().label('students'),
+			func.sum(stats.sessions_started).label('sessions_started'),
+			func.sum(stats.sessions_closed).label('sessions_closed'),
+			func.sum(stats.session_seconds).label('session_seconds'),
+			func.sum(stats.messages).label('messages'),
+			func.sum(
+				case((stats.student_messages >= stuck_messages, 1), else_=0)
+			).label('students_stuck'),
+			func.max(stats.last_activity_at).label('last_activity_at'),
+		)
+		.where(stats.classroom_id == classroom_id)
+		.group_by(stats.problem_id)
+	)
+	return list(session.exec(statement).all())
+
+
+@traced('db')
+def get_classroom_problem_titles(
+	session: Session, classroom_id: str
+) -> dict[str, str]:
+	"""Título de cada problema da turma (inclui os sem atividade)"""
+	statement = select(Problem.id, Problem.title).where(
+		Problem.classroom_id == classroom_id
+	)
+	return {str(id): title for id, title in session.exec(statement).all()}
@@ -1,11 +1,21 @@
-from sqlmodel import Session, select
+from datetime import datetime
+
+from sqlmodel import Session, func, select
+from sqlmodel.ext.asyncio.session import AsyncSession
 
 from gpt_teacher_db.gpt_teacher.models.chat_message import (
 	ChatMessage,
 	ChatMessageCreate,
 )
 
+from app.cruds import analytics as analytics_crud
+from app.models import ChatMessageMetadata
+from app.utils.notifier import chat_notifier
+from app.utils.pagination import Page, PageParams, apaginate, paginate
+from app.utils.telemetry import traced
+
 
+@traced('db')
 def create_chat_message(
 	session: Session, message_in: ChatMessageCreate, session_id: str
 ) -> ChatMessage:
@@ -16,19 +26,117 @@ def create_chat_message(
 		role=message_in.role,
 	)
 	session.add(chat_message)
+	analytics_crud.record_message(session, session_id, message_in.role)
 	session.commit()
 	session.refresh(chat_message)
+	chat_notifier.notify(session_id)
+	return chat_message
+
+
+@traced('db')
+async def acreate_chat_message(
+	session: AsyncSession,
+	message_in: ChatMessageCreate,
+	session_id: str,
+	metadata: ChatMessageMetadata | None = None,
+) -> ChatMessage:
+	"""
+	Cria uma nova mensagem no chat (sessão assíncrona), junto com os dados
+	da geração quando for do agente
+	"""
+	chat_message = ChatMessage(
+		session_id=session_id,
+		content=message_in.content,
+		role=message_in.role,
+	)
+	session.add(chat_message)
+	await session.flush()
+	if metadata is not None:
+		metadata.chat_message_id = str(chat_message.id)
+		session.add(metadata)
+	await analytics_crud.arecord_message(session, session_id, message_in.role)
+	# Recarrega antes do commit: um refresh depois abriria outra transação,
+	# segurando a conexão durante a chamada ao LLM (expire_on_commit=False)
+	await session.refresh(chat_message)
+	await session.commit()
+	chat_notifier.notify(session_id)
 	return chat_message
 
 
+@traced('db')
 def get_messages_by_session(
-	session: Session, session_id: str
-) -> list[ChatMessage]:
-	"""Lista todas as mensagens de uma sessão"""
+	session: Session, session_id: str, params: PageParams
+) -> Page:
+	"""Lista as mensagens de uma sessão, das mais antigas às mais novas"""
+	statement = select(ChatMessage).where(ChatMessage.session_id == session_id)
+	return paginate(session, statement, ChatMessage, params)
+
+
+@traced('db')
+async def aget_messages_by_session(
+	session: AsyncSession,
+	session_id: str,
+	params: PageParams,
+	since: datetime | None = None,
+) -> Page:
+	"""
+	Lista as mensagens de uma sessão (sessão assíncrona), só as criadas
+	depois de `since` quando informado
+	"""
+	statement = select(ChatMessage).where(ChatMessage.session_id == session_id)
+	if since is not None:
+		statement = statement.where(ChatMessage.created_at > since)
+	return await apaginate(session, statement, ChatMessage, params)
+
+
+@traced('db')
+async def aget_message_position(
+	session: AsyncSession, session_id: str, message_id: str
+) -> tuple[datetime, str] | None:
+	"""(created_at, id) de uma mensagem da sessão, para usar como cursor"""
+	try:
+		message_id = ChatMessage.id.type.python_type(message_id)
+	except ValueError:
+		return None
+	except (NotImplementedError, TypeError):
+		pass
+
+	statement = select(ChatMessage.created_at, ChatMessage.id).where(
+		ChatMessage.id == message_id,
+		ChatMessage.session_id == session_id,
+	)
+	row = (await session.exec(statement)).first()
+	return (row[0], str(row[1])) if row else None
+
+
+@traced('db')
+async def aget_messages_version(
+	session: AsyncSession, session_id: str
+) -> tuple[int, datetime | None]:
+	"""
+	Quantidade e data da última mensagem da sessão. As mensagens só são
+	inseridas, então isso muda sempre que a lista muda (usado no ETag)
+	"""
+	statement = select(func.count(), func.max(ChatMessage.created_at)).where(
+		ChatMessage.session_id == session_id
+	)
+	return tuple((await session.exec(statement)).one())
+
+
+@traced('db')
+async def aget_session_transcripts(
+	session: AsyncSession, session_ids: list[str]
+) -> dict[str, list[ChatMessage]]:
+	"""
+	Todas as mensagens de cada sessão, em ordem, em uma única consulta (para
+	a consolidação)
+	"""
 	statement = (
 		select(ChatMessage)
-		.where(ChatMessage.session_id == session_id)
-		.order_by(ChatMessage.created_at.asc())
+		.where(ChatMessage.session_id.in_(session_ids))
+		.order_by(ChatMessage.created_at, ChatMessage.id)
 	)
-
-	return list(session.exec(statement).all())
+	transcripts = {session_id: [] for session_id in session_ids}
+	for message in await session.exec(statement):
+		transcripts[str(message.session_id)].append(message)
+	return transcripts
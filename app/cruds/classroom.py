@@ -1,3 +1,5 @@
+from sqlalchemy import or_
+from sqlalchemy.dialects.postgresql import insert
 from sqlmodel import Session, select
 
 from gpt_teacher_db.gpt_teacher.models.classroom import (
@@ -9,8 +11,11 @@ from gpt_teacher_db.gpt_teacher.models.classroom_student import (
 	ClassroomStudent,
 )
 from gpt_teacher_db.gpt_teacher.models.student import Student
+from app.utils.pagination import Page, PageParams, paginate
+from app.utils.telemetry import traced
 
 
+@traced('db')
 def create_classroom(
 	session: Session, classroom_in: ClassroomCreate, teacher_id: str
 ) -> Classroom:
@@ -26,6 +31,7 @@ def create_classroom(
 	return classroom
 
 
+@traced('db')
 def get_classroom_by_id(
 	session: Session, classroom_id: str
 ) -> Classroom | None:
@@ -33,14 +39,16 @@ def get_classroom_by_id(
 	return session.get(Classroom, classroom_id)
 
 
+@traced('db')
 def get_classrooms_by_teacher(
-	session: Session, teacher_id: str
-) -> list[Classroom]:
-	"""Lista todas as turmas de um professor"""
+	session: Session, teacher_id: str, params: PageParams
+) -> Page:
+	"""Lista as turmas de um professor"""
 	statement = select(Classroom).where(Classroom.teacher_id == teacher_id)
-	return list(session.exec(statement).all())
+	return paginate(session, statement, Classroom, params)
 
 
+@traced('db')
 def update_classroom(
 	session: Session, classroom: Classroom, classroom_in: ClassroomUpdate
 ) -> Classroom:
@@ -56,12 +64,14 @@ def update_classroom(
 	return classroom
 
 
+@traced('db')
 def delete_classroom(session: Session, classroom: Classroom) -> None:
 	"""Remove uma turma"""
 	session.delete(classroom)
 	session.commit()
 
 
+@traced('db')
 def add_student_to_classroom(
 	session: Session, classroom_id: str, student_id: str
 ) -> ClassroomStudent:
@@ -76,6 +86,99 @@ def add_student_to_classroom(
 	return classroom_student
 
 
+def _is_valid_id(value: str) -> bool:
+	"""Evita consultar o banco com um id que não é do tipo da coluna"""
+	try:
+		Student.id.type.python_type(value)
+	except ValueError:
+		return False
+	except (NotImplementedError, TypeError):
+		pass
+	return True
+
+
+@traced('db')
+def bulk_add_students_to_classroom(
+	session: Session, classroom_id: str, identifiers: list[str]
+) -> list[tuple[str, str | None]]:
+	"""
+	Matricula vários alunos, por id ou email, com uma consulta para achar os
+	alunos, uma para as matrículas existentes e um único INSERT.
+
+	Retorna (status, id do aluno) de cada identificador, na ordem recebida:
+	'added', 'already_enrolled', 'duplicate' (repetido na lista) ou
+	'not_found'.
+	"""
+	emails = {value for value in identifiers if '@' in value}
+	ids = {
+		value
+		for value in identifiers
+		if '@' not in value and _is_valid_id(value)
+	}
+
+	# Identificador (id ou email) -> id do aluno
+	found: dict[str, str] = {}
+	if emails or ids:
+		statement = select(Student.id, Student.email).where(
+			or_(Student.id.in_(ids), Student.email.in_(emails))
+		)
+		for student_id, email in session.exec(statement):
+			student_id = str(student_id)
+			if student_id in ids:
+				found[student_id] = student_id
+			if email in emails:
+				found[email] = student_id
+
+	enrolled = set()
+	if found:
+		statement = select(ClassroomStudent.student_id).where(
+			ClassroomStudent.classroom_id == classroom_id,
+			ClassroomStudent.student_id.in_(set(found.values())),
+		)
+		enrolled = {str(student_id) for student_id in session.exec(statement)}
+
+	to_add = [
+		student_id
+		for student_id in dict.fromkeys(found.values())
+		if student_id not in enrolled
+	]
+	added = set()
+	if to_add:
+		rows = [
+			ClassroomStudent(
+				classroom_id=classroom_id, student_id=student_id
+			).model_dump(exclude_none=True)
+			for student_id in to_add
+		]
+		# Matrículas feitas em paralelo por outra requisição são ignoradas
+		statement = (
+			insert(ClassroomStudent)
+			.values(rows)
+			.on_conflict_do_nothing()
+			.returning(ClassroomStudent.student_id)
+		)
+		added = {str(id) for id in session.exec(statement).scalars()}
+		session.commit()
+
+	results = []
+	seen = set()
+	for value in identifiers:
+		student_id = found.get(value)
+		if student_id is None:
+			status = 'not_found'
+		elif student_id in seen:
+			status = 'duplicate'
+		elif student_id in added:
+			status = 'added'
+		else:
+			status = 'already_enrolled'
+		if student_id is not None:
+			seen.add(student_id)
+		results.append((status, student_id))
+	return results
+
+
+@traced('db')
 def remove_student_from_classroom(
 	session: Session, classroom_id: str, student_id: str
 ) -> None:
@@ -90,18 +193,20 @@ def remove_student_from_classroom(
 		session.commit()
 
 
+@traced('db')
 def get_classroom_students(
-	session: Session, classroom_id: str
-) -> list[Student]:
-	"""Lista todos os alunos de uma turma"""
+	session: Session, classroom_id: str, params: PageParams
+) -> Page:
+	"""Lista os alunos de uma turma"""
 	statement = (
 		select(Student)
 		.join(ClassroomStudent)
 		.where(ClassroomStudent.classroom_id == classroom_id)
 	)
-	return list(session.exec(statement).all())
+	return paginate(session, statement, Student, params)
 
 
+@traced('db')
 def is_student_in_classroom(
 	session: Session, classroom_id: str, student_id: str
 ) -> bool:
@@ -1,34 +1,34 @@
 from sqlmodel import Session, select
+from sqlmodel.ext.asyncio.session import AsyncSession
 
 from gpt_teacher_db.gpt_teacher.models.consolidated import Consolidated
+from app.utils.pagination import Page, PageParams, paginate
+from app.utils.telemetry import traced
 
 
+@traced('db')
 def get_consolidations_by_student(
-	session: Session, student_id: str
-) -> list[Consolidated]:
-	"""Lista todas as consolidações de um aluno"""
-	statement = (
-		select(Consolidated)
-		.where(Consolidated.student_id == student_id)
-		.order_by(Consolidated.created_at.desc())
+	session: Session, student_id: str, params: PageParams
+) -> Page:
+	"""Lista as consolidações de um aluno (mais novas primeiro)"""
+	statement = select(Consolidated).where(
+		Consolidated.student_id == student_id
 	)
-
-	return list(session.exec(statement).all())
+	return paginate(session, statement, Consolidated, params, descending=True)
 
 
+@traced('db')
 def get_consolidations_by_problem(
-	session: Session, problem_id: str
-) -> list[Consolidated]:
-	"""Lista todas as consolidações de um problema"""
-	statement = (
-		select(Consolidated)
-		.where(Consolidated.problem_id == problem_id)
-		.order_by(Consolidated.created_at.desc())
+	session: Session, problem_id: str, params: PageParams
+) -> Page:
+	"""Lista as consolidações de um problema (mais novas primeiro)"""
+	statement = select(Consolidated).where(
+		Consolidated.problem_id == problem_id
 	)
-
-	return list(session.exec(statement).all())
+	return paginate(session, statement, Consolidated, params, descending=True)
 
 
+@traced('db')
 def create_consolidated(
 	session: Session,
 	student_id: str,
@@ -47,3 +47,35 @@ def create_consolidated(
 	session.commit()
 	session.refresh(consolidated)
 	return consolidated
+
+
+def add_consolidated(
+	session: AsyncSession,
+	student_id: str,
+	problem_id: str,
+	session_id: str,
+	content: str,
+) -> Consolidated:
+	"""
+	Adiciona uma consolidação à transação atual, sem commit (gravada junto
+	com a conclusão da tarefa de consolidação)
+	"""
+	consolidated = Consolidated(
+		student_id=student_id,
+		problem_id=problem_id,
+		session_id=session_id,
+		content=content,
+	)
+	session.add(consolidated)
+	return consolidated
+
+
+@traced('db')
+async def aget_consolidated_session_ids(
+	session: AsyncSession, session_ids: list[str]
+) -> set[str]:
+	"""Quais das sessões já têm consolidação"""
+	statement = select(Consolidated.session_id).where(
+		Consolidated.session_id.in_(session_ids)
+	)
+	return {str(session_id) for session_id in await session.exec(statement)}
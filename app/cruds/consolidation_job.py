@@ -0,0 +1,211 @@
+from datetime import datetime, timedelta
+from uuid import uuid4
+
+from gpt_teacher_db.gpt_teacher.models.student_session import StudentSession
+from sqlalchemy import and_, or_, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlmodel import Session, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.models import ConsolidationJob
+from app.utils.telemetry import traced
+
+
+@traced('db')
+def enqueue_consolidation_jobs(
+	session: Session, student_sessions: list[StudentSession]
+) -> None:
+	"""
+	Enfileira a consolidação das sessões na transação atual (sem commit),
+	para a tarefa só existir se o fechamento da sessão for gravado. Sessões
+	já enfileiradas são ignoradas
+	"""
+	if not student_sessions:
+		return
+
+	rows = [
+		ConsolidationJob(
+			session_id=str(student_session.id),
+			student_id=str(student_session.student_id),
+			problem_id=str(student_session.problem_id),
+		).model_dump()
+		for student_session in student_sessions
+	]
+	statement = (
+		insert(ConsolidationJob)
+		.values(rows)
+		.on_conflict_do_nothing(index_elements=['session_id'])
+	)
+	session.exec(statement)
+
+
+@traced('db')
+async def aclaim_consolidation_jobs(
+	session: AsyncSession,
+	limit: int,
+	lease_seconds: float,
+	problem_id: str | None = None,
+) -> list[ConsolidationJob]:
+	"""
+	Reserva até `limit` tarefas prontas para rodar, mais antigas primeiro.
+
+	Usa FOR UPDATE SKIP LOCKED: workers concorrentes (inclusive de outros
+	processos) nunca pegam a mesma tarefa e não esperam uns pelos outros.
+	Tarefas 'running' há mais de `lease_seconds` (worker que caiu) voltam a
+	ser reservadas. Com `problem_id`, só tarefas desse problema.
+	"""
+	now = datetime.utcnow()
+	token = uuid4().hex
+	expired = now - timedelta(seconds=lease_seconds)
+	ready = or_(
+		and_(
+			ConsolidationJob.status == 'pending',
+			ConsolidationJob.run_after <= now,
+		),
+		and_(
+			ConsolidationJob.status == 'running',
+			ConsolidationJob.locked_at < expired,
+		),
+	)
+	if problem_id is not None:
+		ready = and_(ready, ConsolidationJob.problem_id == problem_id)
+	claimable = (
+		select(ConsolidationJob.session_id)
+		.where(ready)
+		.order_by(ConsolidationJob.run_after)
+		.limit(limit)
+		.with_for_update(skip_locked=True)
+	)
+	statement = (
+		update(ConsolidationJob)
+		.where(ConsolidationJob.session_id.in_(claimable.scalar_subquery()))
+		.values(
+			status='running',
+			attempts=ConsolidationJob.attempts + 1,
+			locked_at=now,
+			locked_by=token,
+			updated_at=now,
+		)
+		.returning(ConsolidationJob)
+	)
+	jobs = list((await session.exec(statement)).scalars().all())
+	await session.commit()
+	# Desanexadas: um rollback durante o processamento não as expira
+	for job in jobs:
+		session.expunge(job)
+	return jobs
+
+
+@traced('db')
+async def aclaim_consolidation_batch(
+	session: AsyncSession, batch_size: int, lease_seconds: float
+) -> list[ConsolidationJob]:
+	"""
+	Reserva a tarefa mais antiga e até `batch_size - 1` outras do mesmo
+	problema, para serem consolidadas juntas
+	"""
+	jobs = await aclaim_consolidation_jobs(session, 1, lease_seconds)
+	if jobs and batch_size > 1:
+		jobs += await aclaim_consolidation_jobs(
+			session, batch_size - 1, lease_seconds, jobs[0].problem_id
+		)
+	return jobs
+
+
+def _held(job: ConsolidationJob):
+	# A reserva deste worker ainda vale (ninguém retomou a tarefa)
+	return and_(
+		ConsolidationJob.session_id == job.session_id,
+		ConsolidationJob.locked_by == job.locked_by,
+	)
+
+
+@traced('db')
+async def arenew_consolidation_leases(
+	session: AsyncSession, jobs: list[ConsolidationJob]
+) -> list[ConsolidationJob]:
+	"""
+	Renova o lease das tarefas antes de uma chamada ao modelo, para uma
+	tentativa longa (lote e fallbacks) não ser retomada por outro worker.
+	Retorna as tarefas que continuam com este worker.
+	"""
+	now = datetime.utcnow()
+	statement = (
+		update(ConsolidationJob)
+		.where(or_(*(_held(job) for job in jobs)))
+		.values(locked_at=now, updated_at=now)
+		.returning(ConsolidationJob.session_id)
+	)
+	held = set((await session.exec(statement)).scalars().all())
+	await session.commit()
+	return [job for job in jobs if job.session_id in held]
+
+
+async def _afinish_job(
+	session: AsyncSession, job: ConsolidationJob, **values
+) -> ConsolidationJob | None:
+	"""
+	Grava o resultado da tentativa, com commit, se a reserva ainda é deste
+	worker; senão desfaz a transação (inclusive o que foi adicionado antes)
+	e retorna None
+	"""
+	values.update(locked_at=None, locked_by=None, updated_at=datetime.utcnow())
+	statement = update(ConsolidationJob).where(_held(job)).values(**values)
+	result = await session.exec(statement)
+	if result.rowcount == 0:
+		await session.rollback()
+		return None
+	await session.commit()
+	for key, value in values.items():
+		setattr(job, key, value)
+	return job
+
+
+@traced('db')
+async def acomplete_consolidation_job(
+	session: AsyncSession, job: ConsolidationJob
+) -> ConsolidationJob | None:
+	"""
+	Marca a tarefa como concluída, na mesma transação da consolidação
+	adicionada antes (add_consolidated): com a reserva perdida, nenhuma das
+	duas é gravada e retorna None
+	"""
+	return await _afinish_job(session, job, status='done', last_error=None)
+
+
+@traced('db')
+async def afail_consolidation_job(
+	session: AsyncSession,
+	job: ConsolidationJob,
+	error: str,
+	max_attempts: int,
+	backoff_seconds: float,
+) -> ConsolidationJob | None:
+	"""
+	Registra a falha da tentativa: a tarefa volta para a fila com backoff
+	exponencial, ou fica 'failed' ao atingir `max_attempts`. None se a
+	reserva foi perdida
+	"""
+	if job.attempts >= max_attempts:
+		return await _afinish_job(
+			session, job, status='failed', last_error=error
+		)
+
+	delay = backoff_seconds * 2 ** (job.attempts - 1)
+	return await _afinish_job(
+		session,
+		job,
+		status='pending',
+		last_error=error,
+		run_after=datetime.utcnow() + timedelta(seconds=delay),
+	)
+
+
+@traced('db')
+async def arelease_consolidation_job(
+	session: AsyncSession, job: ConsolidationJob
+) -> ConsolidationJob | None:
+	"""Devolve à fila uma tarefa interrompida, sem contar a tentativa"""
+	return await _afinish_job(
+		session, job, status='pending', attempts=job.attempts - 1
+	)
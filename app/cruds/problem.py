@@ -1,4 +1,5 @@
 from sqlmodel import Session, select
+from sqlmodel.ext.asyncio.session import AsyncSession
 
 from gpt_teacher_db.gpt_teacher.models.problem import (
 	Problem,
@@ -6,7 +7,13 @@ from gpt_teacher_db.gpt_teacher.models.problem import (
 	ProblemUpdate,
 )
 
+from app.agents.teacher_agent.cache import invalidate_problem_agents
+from app.agents.teacher_agent.response_cache import response_cache
+from app.utils.pagination import Page, PageParams, paginate
+from app.utils.telemetry import traced
 
+
+@traced('db')
 def create_problem(
 	session: Session,
 	problem_in: ProblemCreate,
@@ -30,33 +37,48 @@ def create_problem(
 	return problem
 
 
+@traced('db')
 def get_problem_by_id(session: Session, problem_id: str) -> Problem | None:
 	"""Busca problema por ID"""
 	return session.get(Problem, problem_id)
 
 
+@traced('db')
+async def aget_problem_by_id(
+	session: AsyncSession, problem_id: str
+) -> Problem | None:
+	"""Busca problema por ID (sessão assíncrona)"""
+	return await session.get(Problem, problem_id)
+
+
+@traced('db')
 def get_problems_by_classroom(
-	session: Session, classroom_id: str, include_sandbox: bool = False
-) -> list[Problem]:
-	"""Lista todos os problemas de uma turma"""
+	session: Session,
+	classroom_id: str,
+	params: PageParams,
+	include_sandbox: bool = False,
+) -> Page:
+	"""Lista os problemas de uma turma"""
 	statement = select(Problem).where(Problem.classroom_id == classroom_id)
 
 	if not include_sandbox:
 		statement = statement.where(Problem.is_sandbox == False)
 
-	return list(session.exec(statement).all())
+	return paginate(session, statement, Problem, params)
 
 
+@traced('db')
 def get_sandbox_problems_by_classroom(
-	session: Session, classroom_id: str
-) -> list[Problem]:
+	session: Session, classroom_id: str, params: PageParams
+) -> Page:
 	"""Lista problemas sandbox de uma turma"""
 	statement = select(Problem).where(
 		Problem.classroom_id == classroom_id, Problem.is_sandbox == True
 	)
-	return list(session.exec(statement).all())
+	return paginate(session, statement, Problem, params)
 
 
+@traced('db')
 def update_problem(
 	session: Session, problem: Problem, problem_in: ProblemUpdate
 ) -> Problem:
@@ -69,10 +91,16 @@ def update_problem(
 	session.add(problem)
 	session.commit()
 	session.refresh(problem)
+	invalidate_problem_agents(str(problem.id))
+	response_cache.invalidate_problem(str(problem.id))
 	return problem
 
 
+@traced('db')
 def delete_problem(session: Session, problem: Problem) -> None:
 	"""Remove um problema"""
+	problem_id = str(problem.id)
 	session.delete(problem)
 	session.commit()
+	invalidate_problem_agents(problem_id)
+	response_cache.invalidate_problem(problem_id)
@@ -1,4 +1,7 @@
+from sqlalchemy import or_
+from sqlalchemy.dialects.postgresql import insert
 from sqlmodel import Session, select
+from sqlmodel.ext.asyncio.session import AsyncSession
 
 from gpt_teacher_db.gpt_teacher.models.student import (
 	Student,
@@ -9,9 +12,17 @@ from gpt_teacher_db.gpt_teacher.models.classroom import Classroom
 from gpt_teacher_db.gpt_teacher.models.classroom_student import (
 	ClassroomStudent,
 )
-from app.utils.security import get_password_hash
+from app.utils.pagination import Page, PageParams, paginate
+from app.utils.principal_cache import principal_cache
+from app.utils.security import (
+	aget_password_hash,
+	aget_password_hashes,
+	get_password_hash,
+)
+from app.utils.telemetry import traced
 
 
+@traced('db')
 def create_student(session: Session, student_in: StudentCreate) -> Student:
 	"""Cria um novo aluno"""
 	student = Student(
@@ -26,17 +37,157 @@ def create_student(session: Session, student_in: StudentCreate) -> Student:
 	return student
 
 
+@traced('db')
+async def acreate_student(
+	session: AsyncSession, student_in: StudentCreate
+) -> Student:
+	"""Cria um novo aluno (hash da senha no pool de processos)"""
+	student = Student(
+		email=student_in.email,
+		name=student_in.name,
+		hashed_password=await aget_password_hash(student_in.password),
+		is_active=True,
+	)
+	session.add(student)
+	await session.commit()
+	await session.refresh(student)
+	return student
+
+
+@traced('db')
+async def abulk_create_students(
+	session: AsyncSession,
+	students: list[dict[str, str]],
+	classroom_id: str | None = None,
+) -> list[tuple[str, str | None]]:
+	"""
+	Cadastra vários alunos (`email`, `name`, `password` e, opcional,
+	`registration_number`) com um único INSERT e, se `classroom_id` for
+	passado, os matricula na turma na mesma transação.
+
+	Retorna (status, id do aluno) de cada linha, na ordem recebida:
+	'created', 'duplicate' (email repetido na lista), 'email_taken' ou
+	'registration_number_taken'.
+	"""
+	emails = {student['email'] for student in students}
+	numbers = {
+		student['registration_number']
+		for student in students
+		if student.get('registration_number')
+	}
+	statement = select(Student.email, Student.registration_number).where(
+		or_(
+			Student.email.in_(emails),
+			Student.registration_number.in_(numbers),
+		)
+	)
+	taken_emails, taken_numbers = set(), set()
+	for email, number in await session.exec(statement):
+		taken_emails.add(email)
+		if number is not None:
+			taken_numbers.add(number)
+
+	statuses: list[str] = []
+	to_create: dict[str, dict[str, str]] = {}
+	seen_numbers = set()
+	for student in students:
+		number = student.get('registration_number') or None
+		if student['email'] in taken_emails:
+			status = 'email_taken'
+		elif number in taken_numbers:
+			status = 'registration_number_taken'
+		elif student['email'] in to_create or number in seen_numbers:
+			status = 'duplicate'
+		else:
+			status = 'created'
+			to_create[student['email']] = student
+			if number:
+				seen_numbers.add(number)
+		statuses.append(status)
+
+	if not to_create:
+		return [(status, None) for status in statuses]
+
+	# Libera a conexão enquanto as senhas são processadas no pool
+	await session.rollback()
+	hashes = await aget_password_hashes(
+		[student['password'] for student in to_create.values()]
+	)
+	rows = [
+		Student(
+			email=student['email'],
+			name=student['name'],
+			registration_number=student.get('registration_number') or None,
+			hashed_password=hashed_password,
+			is_active=True,
+		).model_dump()
+		for student, hashed_password in zip(to_create.values(), hashes)
+	]
+	# Cadastros feitos em paralelo por outra requisição são ignorados
+	statement = (
+		insert(Student)
+		.values(rows)
+		.on_conflict_do_nothing()
+		.returning(Student.email, Student.id)
+	)
+	created = {
+		email: str(id) for email, id in (await session.exec(statement)).all()
+	}
+	raced = [email for email in to_create if email not in created]
+	raced_emails = set()
+	if raced:
+		# Qual das chaves únicas foi cadastrada nesse meio tempo
+		statement = select(Student.email).where(Student.email.in_(raced))
+		raced_emails = set(await session.exec(statement))
+
+	if classroom_id is not None and created:
+		enrollments = [
+			ClassroomStudent(
+				classroom_id=classroom_id, student_id=student_id
+			).model_dump(exclude_none=True)
+			for student_id in created.values()
+		]
+		await session.exec(insert(ClassroomStudent).values(enrollments))
+	await session.commit()
+
+	results = []
+	for student, status in zip(students, statuses):
+		student_id = None
+		if status == 'created':
+			student_id = created.get(student['email'])
+			if student_id is None:
+				status = (
+					'email_taken'
+					if student['email'] in raced_emails
+					else 'registration_number_taken'
+				)
+		results.append((status, student_id))
+	return results
+
+
+@traced('db')
 def get_student_by_id(session: Session, student_id: str) -> Student | None:
 	"""Busca aluno por ID"""
 	return session.get(Student, student_id)
 
 
+@traced('db')
 def get_student_by_email(session: Session, email: str) -> Student | None:
 	"""Busca aluno por email"""
 	statement = select(Student).where(Student.email == email)
 	return session.exec(statement).first()
 
 
+@traced('db')
+async def aget_student_by_email(
+	session: AsyncSession, email: str
+) -> Student | None:
+	"""Busca aluno por email (sessão assíncrona)"""
+	statement = select(Student).where(Student.email == email)
+	return (await session.exec(statement)).first()
+
+
+@traced('db')
 def update_student(
 	session: Session, student: Student, student_in: StudentUpdate
 ) -> Student:
@@ -54,16 +205,19 @@ def update_student(
 	session.add(student)
 	session.commit()
 	session.refresh(student)
+	# Status, email e senha valem para as próximas requisições
+	principal_cache.invalidate('student', str(student.id))
 	return student
 
 
+@traced('db')
 def get_student_classrooms(
-	session: Session, student_id: str
-) -> list[Classroom]:
-	"""Lista todas as turmas do aluno"""
+	session: Session, student_id: str, params: PageParams
+) -> Page:
+	"""Lista as turmas do aluno"""
 	statement = (
 		select(Classroom)
 		.join(ClassroomStudent)
 		.where(ClassroomStudent.student_id == student_id)
 	)
-	return list(session.exec(statement).all())
+	return paginate(session, statement, Classroom, params)
@@ -1,12 +1,20 @@
 from datetime import datetime
 from sqlmodel import Session, select
+from sqlmodel.ext.asyncio.session import AsyncSession
 
+from gpt_teacher_db.gpt_teacher.models.problem import Problem
 from gpt_teacher_db.gpt_teacher.models.student_session import (
 	StudentSession,
 	StudentSessionCreate,
 )
+from app.cruds import analytics as analytics_crud
+from app.cruds.consolidation_job import enqueue_consolidation_jobs
+from app.utils.notifier import consolidation_notifier
+from app.utils.pagination import Page, PageParams, paginate
+from app.utils.telemetry import traced
 
 
+@traced('db')
 def create_student_session(
 	session: Session, session_in: StudentSessionCreate, student_id: str
 ) -> StudentSession:
@@ -20,11 +28,14 @@ def create_student_session(
 		is_active=True,
 	)
 	session.add(student_session)
+	session.flush()
+	analytics_crud.record_session_started(session, str(student_session.id))
 	session.commit()
 	session.refresh(student_session)
 	return student_session
 
 
+@traced('db')
 def get_student_session_by_id(
 	session: Session, session_id: str
 ) -> StudentSession | None:
@@ -32,6 +43,29 @@ def get_student_session_by_id(
 	return session.get(StudentSession, session_id)
 
 
+@traced('db')
+async def aget_student_session_by_id(
+	session: AsyncSession, session_id: str
+) -> StudentSession | None:
+	"""Busca sessão por ID (sessão assíncrona)"""
+	return await session.get(StudentSession, session_id)
+
+
+@traced('db')
+async def aget_student_session_with_classroom(
+	session: AsyncSession, session_id: str
+) -> tuple[StudentSession, str] | None:
+	"""Busca sessão por ID junto com a turma do problema (uma consulta)"""
+	statement = (
+		select(StudentSession, Problem.classroom_id)
+		.join(Problem, Problem.id == StudentSession.problem_id)
+		.where(StudentSession.id == session_id)
+	)
+	result = await session.exec(statement)
+	return result.first()
+
+
+@traced('db')
 def get_active_session_by_student(
 	session: Session, student_id: str
 ) -> StudentSession | None:
@@ -43,20 +77,27 @@ def get_active_session_by_student(
 	return session.exec(statement).first()
 
 
+@traced('db')
 def close_session(
 	session: Session, student_session: StudentSession
 ) -> StudentSession:
-	"""Fecha uma sessão"""
+	"""Fecha uma sessão e enfileira a geração da consolidação"""
 	student_session.is_active = False
 	student_session.ended_at = datetime.utcnow()
 	session.add(student_session)
+	analytics_crud.record_sessions_closed(session, [str(student_session.id)])
+	enqueue_consolidation_jobs(session, [student_session])
 	session.commit()
+	consolidation_notifier.notify('jobs')
 	session.refresh(student_session)
 	return student_session
 
 
+@traced('db')
 def close_active_sessions(session: Session, student_id: str) -> None:
-	"""Fecha todas as sessões ativas do aluno"""
+	"""
+	Fecha todas as sessões ativas do aluno e enfileira a consolidação delas
+	"""
 	statement = select(StudentSession).where(
 		StudentSession.student_id == student_id,
 		StudentSession.is_active == True,
@@ -68,20 +109,24 @@ def close_active_sessions(session: Session, student_id: str) -> None:
 		active_session.ended_at = datetime.utcnow()
 		session.add(active_session)
 
+	analytics_crud.record_sessions_closed(
+		session, [str(active_session.id) for active_session in active_sessions]
+	)
+	enqueue_consolidation_jobs(session, active_sessions)
 	session.commit()
+	if active_sessions:
+		consolidation_notifier.notify('jobs')
 
 
+@traced('db')
 def get_sessions_by_problem_and_student(
-	session: Session, problem_id: str, student_id: str
-) -> list[StudentSession]:
-	"""Lista todas as sessões de um aluno em um problema"""
-	statement = (
-		select(StudentSession)
-		.where(
-			StudentSession.problem_id == problem_id,
-			StudentSession.student_id == student_id,
-		)
-		.order_by(StudentSession.created_at.desc())
+	session: Session, problem_id: str, student_id: str, params: PageParams
+) -> Page:
+	"""Lista as sessões de um aluno em um problema (mais novas primeiro)"""
+	statement = select(StudentSession).where(
+		StudentSession.problem_id == problem_id,
+		StudentSession.student_id == student_id,
+	)
+	return paginate(
+		session, statement, StudentSession, params, descending=True
 	)
-
-	return list(session.exec(statement).all())
@@ -1,13 +1,17 @@
 from sqlmodel import Session, select
+from sqlmodel.ext.asyncio.session import AsyncSession
 
 from gpt_teacher_db.gpt_teacher.models.teacher import (
 	Teacher,
 	TeacherCreate,
 	TeacherUpdate,
 )
-from app.utils.security import get_password_hash
+from app.utils.principal_cache import principal_cache
+from app.utils.security import aget_password_hash, get_password_hash
+from app.utils.telemetry import traced
 
 
+@traced('db')
 def create_teacher(session: Session, teacher_in: TeacherCreate) -> Teacher:
 	"""Cria um novo professor"""
 	teacher = Teacher(
@@ -22,17 +26,46 @@ def create_teacher(session: Session, teacher_in: TeacherCreate) -> Teacher:
 	return teacher
 
 
+@traced('db')
+async def acreate_teacher(
+	session: AsyncSession, teacher_in: TeacherCreate
+) -> Teacher:
+	"""Cria um novo professor (hash da senha no pool de processos)"""
+	teacher = Teacher(
+		email=teacher_in.email,
+		name=teacher_in.name,
+		hashed_password=await aget_password_hash(teacher_in.password),
+		is_active=True,
+	)
+	session.add(teacher)
+	await session.commit()
+	await session.refresh(teacher)
+	return teacher
+
+
+@traced('db')
 def get_teacher_by_id(session: Session, teacher_id: str) -> Teacher | None:
 	"""Busca professor por ID"""
 	return session.get(Teacher, teacher_id)
 
 
+@traced('db')
 def get_teacher_by_email(session: Session, email: str) -> Teacher | None:
 	"""Busca professor por email"""
 	statement = select(Teacher).where(Teacher.email == email)
 	return session.exec(statement).first()
 
 
+@traced('db')
+async def aget_teacher_by_email(
+	session: AsyncSession, email: str
+) -> Teacher | None:
+	"""Busca professor por email (sessão assíncrona)"""
+	statement = select(Teacher).where(Teacher.email == email)
+	return (await session.exec(statement)).first()
+
+
+@traced('db')
 def update_teacher(
 	session: Session, teacher: Teacher, teacher_in: TeacherUpdate
 ) -> Teacher:
@@ -50,4 +83,6 @@ def update_teacher(
 	session.add(teacher)
 	session.commit()
 	session.refresh(teacher)
+	# Status, email e senha valem para as próximas requisições
+	principal_cache.invalidate('teacher', str(teacher.id))
 	return teacher
@@ -1,4 +1,9 @@
-from langchain_groq import ChatGroq
+from functools import lru_cache
+
+from langchain_core.language_models import BaseChatModel
+
+from app.core.config import settings
+from app.llm.providers import get_provider
 
 
 class GroqModels(str):
@@ -14,10 +19,29 @@ MODEL_BY_DIFICULTY = {
 }
 
 
-def get_model_by_difficulty(task_dificulty: str) -> ChatGroq:
-	model = MODEL_BY_DIFICULTY.get(task_dificulty)
+def get_model_name(task_dificulty: str) -> str:
+	overrides = {
+		'LOW': settings.LLM_MODEL_LOW,
+		'MEDIUM': settings.LLM_MODEL_MEDIUM,
+		'HIGH': settings.LLM_MODEL_HIGH,
+	}
+	model = overrides.get(task_dificulty) or MODEL_BY_DIFICULTY.get(
+		task_dificulty
+	)
 
 	if not model:
 		raise ValueError('Model not Found')
 
-	return ChatGroq(model=model, temperature=0.3)
+	return model
+
+
+@lru_cache
+def get_chat_model(provider: str, model_name: str) -> BaseChatModel:
+	"""Cliente de chat reutilizável (um por provedor/modelo no processo)"""
+	return get_provider(provider)(model_name)
+
+
+def get_model_by_difficulty(task_dificulty: str) -> BaseChatModel:
+	return get_chat_model(
+		settings.LLM_PROVIDER, get_model_name(task_dificulty)
+	)
@@ -0,0 +1,224 @@
+import asyncio
+from collections import deque
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from time import monotonic
+
+from app.core.config import settings
+from app.utils.cache import LRUCache
+
+
+class AdmissionRejected(Exception):
+	"""Chamada ao LLM recusada; o cliente deve tentar após `retry_after`"""
+
+	def __init__(self, detail: str, retry_after: float):
+		super().__init__(detail)
+		self.detail = detail
+		self.retry_after = retry_after
+
+
+class TokenBucket:
+	def __init__(self, rate_per_second: float, capacity: int):
+		self.rate_per_second = rate_per_second
+		self.capacity = capacity
+		self.tokens = float(capacity)
+		self.updated_at = monotonic()
+
+	def take(self) -> float:
+		"""Consome um token; retorna 0 ou os segundos até haver um token"""
+		now = monotonic()
+		self.tokens = min(
+			self.capacity,
+			self.tokens + (now - self.updated_at) * self.rate_per_second,
+		)
+		self.updated_at = now
+
+		if self.tokens >= 1:
+			self.tokens -= 1
+			return 0.0
+		return (1 - self.tokens) / self.rate_per_second
+
+
+class AdmissionSlot:
+	"""Vaga concedida para uma chamada ao LLM; liberar é idempotente"""
+
+	def __init__(self, admission: 'LLMAdmission', classroom_id: str | None):
+		self._admission = admission
+		self._classroom_id = classroom_id
+		self._released = False
+
+	def release(self) -> None:
+		if not self._released:
+			self._released = True
+			self._admission._release(self._classroom_id)
+
+
+class LLMAdmission:
+	"""
+	Controle de admissão das chamadas ao LLM (por processo).
+
+	- Token bucket por aluno limita a taxa de mensagens.
+	- Semáforo global, dimensionado pelos limites do provedor.
+	- Limite de chamadas simultâneas por turma.
+	- Fila justa: quando uma vaga abre, as turmas com chamadas esperando são
+	  atendidas em rodízio, e a espera é limitada a `max_wait` segundos.
+	"""
+
+	def __init__(
+		self,
+		*,
+		max_concurrency: int,
+		classroom_max_concurrency: int,
+		student_rate_per_minute: float,
+		student_burst: int,
+		max_wait: float,
+		max_queue: int,
+	):
+		self.max_concurrency = max_concurrency
+		self.classroom_max_concurrency = classroom_max_concurrency
+		self.student_rate_per_minute = student_rate_per_minute
+		self.student_burst = student_burst
+		self.max_wait = max_wait
+		self.max_queue = max_queue
+
+		self._buckets = LRUCache(10_000)
+		self._active = 0
+		self._active_by_classroom: dict[str | None, int] = {}
+		self._waiting: dict[str | None, deque[asyncio.Future]] = {}
+		self._rotation: deque[str | None] = deque()
+		self.rate_limited = 0
+		self.queue_timeouts = 0
+		self.queue_full = 0
+
+	def _check_rate(self, student_id: str) -> None:
+		if self.student_rate_per_minute <= 0:
+			return
+
+		bucket = self._buckets.get(student_id)
+		if bucket is None:
+			bucket = TokenBucket(
+				self.student_rate_per_minute / 60, self.student_burst
+			)
+			self._buckets.set(student_id, bucket)
+
+		wait = bucket.take()
+		if wait > 0:
+			self.rate_limited += 1
+			raise AdmissionRejected('Too many messages, slow down', wait)
+
+	def _has_capacity(self, classroom_id: str | None) -> bool:
+		return (
+			self._active < self.max_concurrency
+			and self._active_by_classroom.get(classroom_id, 0)
+			< self.classroom_max_concurrency
+		)
+
+	def _grant(self, classroom_id: str | None) -> AdmissionSlot:
+		self._active += 1
+		self._active_by_classroom[classroom_id] = (
+			self._active_by_classroom.get(classroom_id, 0) + 1
+		)
+		return AdmissionSlot(self, classroom_id)
+
+	def _release(self, classroom_id: str | None) -> None:
+		self._active -= 1
+		remaining = self._active_by_classroom.get(classroom_id, 1) - 1
+		if remaining:
+			self._active_by_classroom[classroom_id] = remaining
+		else:
+			self._active_by_classroom.pop(classroom_id, None)
+		self._dispatch()
+
+	def _waiting_count(self) -> int:
+		return sum(len(queue) for queue in self._waiting.values())
+
+	def _dispatch(self) -> None:
+		"""Entrega as vagas livres às turmas em espera, em rodízio"""
+		skipped = 0
+		while self._rotation and skipped < len(self._rotation):
+			if self._active >= self.max_concurrency:
+				return
+
+			classroom_id = self._rotation[0]
+			queue = self._waiting[classroom_id]
+			while queue and queue[0].done():
+				queue.popleft()
+
+			if not queue:
+				self._rotation.popleft()
+				del self._waiting[classroom_id]
+				continue
+
+			if not self._has_capacity(classroom_id):
+				self._rotation.rotate(-1)
+				skipped += 1
+				continue
+
+			future = queue.popleft()
+			future.set_result(self._grant(classroom_id))
+			self._rotation.rotate(-1)
+			skipped = 0
+
+	async def acquire(
+		self, student_id: str, classroom_id: str | None
+	) -> AdmissionSlot:
+		self._check_rate(student_id)
+
+		if not self._rotation and self._has_capacity(classroom_id):
+			return self._grant(classroom_id)
+
+		if self._waiting_count() >= self.max_queue:
+			self.queue_full += 1
+			raise AdmissionRejected('Tutor is busy, try again', self.max_wait)
+
+		future = asyncio.get_running_loop().create_future()
+		if classroom_id not in self._waiting:
+			self._waiting[classroom_id] = deque()
+			self._rotation.append(classroom_id)
+		self._waiting[classroom_id].append(future)
+		self._dispatch()
+
+		try:
+			return await asyncio.wait_for(future, self.max_wait)
+		except (TimeoutError, asyncio.CancelledError) as error:
+			# A vaga pode ter sido concedida no mesmo ciclo do timeout ou do
+			# cancelamento: sem liberar, a capacidade diminuiria para sempre
+			if future.done() and not future.cancelled():
+				future.result().release()
+			if isinstance(error, asyncio.CancelledError):
+				raise
+			self.queue_timeouts += 1
+			raise AdmissionRejected('Tutor is busy, try again', self.max_wait)
+
+	@asynccontextmanager
+	async def slot(
+		self, student_id: str, classroom_id: str | None
+	) -> AsyncIterator[AdmissionSlot]:
+		admission_slot = await self.acquire(student_id, classroom_id)
+		try:
+			yield admission_slot
+		finally:
+			admission_slot.release()
+
+	def stats(self) -> dict:
+		return {
+			'active': self._active,
+			'active_by_classroom': {
+				str(key): value
+				for key, value in self._active_by_classroom.items()
+			},
+			'waiting': self._waiting_count(),
+			'rate_limited': self.rate_limited,
+			'queue_timeouts': self.queue_timeouts,
+			'queue_full': self.queue_full,
+		}
+
+
+llm_admission = LLMAdmission(
+	max_concurrency=settings.LLM_MAX_CONCURRENCY,
+	classroom_max_concurrency=settings.LLM_CLASSROOM_MAX_CONCURRENCY,
+	student_rate_per_minute=settings.LLM_STUDENT_RATE_PER_MINUTE,
+	student_burst=settings.LLM_STUDENT_BURST,
+	max_wait=settings.LLM_ADMISSION_MAX_WAIT_SECONDS,
+	max_queue=settings.LLM_ADMISSION_MAX_QUEUE,
+)
@@ -0,0 +1,96 @@
+from asyncio import Lock
+
+from langgraph.checkpoint.postgres.aio import AsyncPostgresSaver
+from psycopg.rows import dict_row
+from psycopg_pool import AsyncConnectionPool
+
+from app.core.config import settings
+from app.llm.db import get_db_uri
+from app.utils.telemetry import span
+
+_lock = Lock()
+_pool: AsyncConnectionPool | None = None
+_checkpointer: AsyncPostgresSaver | None = None
+
+
+class TracedPostgresSaver(AsyncPostgresSaver):
+	"""Mede as leituras e gravações do checkpoint (etapa 'checkpoint')"""
+
+	async def aget_tuple(self, *args, **kwargs):
+		with span('checkpoint', 'get_tuple'):
+			return await super().aget_tuple(*args, **kwargs)
+
+	async def aput(self, *args, **kwargs):
+		with span('checkpoint', 'put'):
+			return await super().aput(*args, **kwargs)
+
+	async def aput_writes(self, *args, **kwargs):
+		with span('checkpoint', 'put_writes'):
+			return await super().aput_writes(*args, **kwargs)
+
+
+async def open_checkpointer() -> AsyncPostgresSaver:
+	"""
+	Abre o pool de conexões do checkpointer e executa o setup() uma única vez.
+
+	Chamado no startup da aplicação (lifespan). Chamadas repetidas devolvem a
+	mesma instância.
+	"""
+	global _pool, _checkpointer
+
+	async with _lock:
+		if _checkpointer is not None:
+			return _checkpointer
+
+		pool = AsyncConnectionPool(
+			conninfo=get_db_uri(),
+			min_size=settings.CHECKPOINTER_POOL_MIN_SIZE,
+			max_size=settings.CHECKPOINTER_POOL_MAX_SIZE,
+			timeout=settings.CHECKPOINTER_POOL_TIMEOUT,
+			max_idle=settings.CHECKPOINTER_POOL_MAX_IDLE,
+			name='checkpointer',
+			kwargs={
+				'autocommit': True,
+				'prepare_threshold': 0,
+				'row_factory': dict_row,
+			},
+			open=False,
+		)
+		await pool.open(wait=True)
+
+		checkpointer = TracedPostgresSaver(pool)
+		with span('checkpoint', 'setup'):
+			await checkpointer.setup()
+
+		_pool = pool
+		_checkpointer = checkpointer
+		return checkpointer
+
+
+async def close_checkpointer() -> None:
+	"""Fecha o pool de conexões do checkpointer (shutdown da aplicação)"""
+	global _pool, _checkpointer
+
+	async with _lock:
+		if _pool is not None:
+			await _pool.close()
+		_pool = None
+		_checkpointer = None
+
+
+async def get_checkpointer() -> AsyncPostgresSaver:
+	"""
+	Retorna o checkpointer compartilhado do processo.
+
+	Fora da aplicação (scripts, testes manuais) o pool é aberto sob demanda.
+	"""
+	if _checkpointer is None:
+		return await open_checkpointer()
+	return _checkpointer
+
+
+def get_pool_stats() -> dict[str, int]:
+	"""Estatísticas do pool do checkpointer para monitoramento"""
+	if _pool is None:
+		return {}
+	return _pool.get_stats()
@@ -0,0 +1,150 @@
+import asyncio
+import random
+import time
+from collections.abc import AsyncIterator, Iterator
+from hashlib import sha256
+
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import (
+	ChatGeneration,
+	ChatGenerationChunk,
+	ChatResult,
+)
+from pydantic import PrivateAttr
+
+RESPONSE_OPENINGS = [
+	'Boa tentativa! Você já definiu bem a estrutura da função.',
+	'Legal, dá para ver que você entendeu a ideia principal do problema.',
+	'Você está no caminho certo, a lógica está quase lá.',
+]
+
+RESPONSE_WORDS = (
+	'o que acontece com a variável quando o laço termina observe a condição '
+	'pense no valor de retorno e compare com o exemplo do enunciado tente '
+	'simular a execução linha por linha com números pequenos'
+).split()
+
+
+class FakeLLMError(Exception):
+	"""Falha injetada pelo modelo falso, simulando um erro do provedor"""
+
+	status_code = 503
+
+
+class FakeChatModel(BaseChatModel):
+	"""
+	Modelo de chat local e determinístico para benchmarks e testes de carga.
+
+	Simula a latência até o primeiro token, a taxa de geração de tokens e
+	falhas do provedor, sem acessar a rede. A mesma entrada sempre produz a
+	mesma resposta.
+	"""
+
+	model_name: str = 'fake'
+	latency: float = 0.5
+	tokens_per_second: float = 50.0
+	response_tokens: int = 120
+	failure_rate: float = 0.0
+	seed: int | None = None
+
+	_rng: random.Random = PrivateAttr()
+
+	def model_post_init(self, context) -> None:
+		self._rng = random.Random(self.seed)
+
+	@property
+	def _llm_type(self) -> str:
+		return 'fake'
+
+	def bind_tools(self, tools, **kwargs) -> 'FakeChatModel':
+		return self
+
+	def _should_fail(self) -> bool:
+		return self.failure_rate > 0 and self._rng.random() < self.failure_rate
+
+	def _token_delay(self) -> float:
+		if self.tokens_per_second <= 0:
+			return 0.0
+		return 1 / self.tokens_per_second
+
+	def _tokens(self, messages: list[BaseMessage]) -> list[str]:
+		prompt = '\n'.join(str(message.content) for message in messages)
+		# A resposta depende só da entrada, não do estado de falhas
+		rng = random.Random(sha256(prompt.encode()).digest())
+		words = rng.choice(RESPONSE_OPENINGS).split()
+		while len(words) < self.response_tokens:
+			words.append(rng.choice(RESPONSE_WORDS))
+		words = words[: self.response_tokens]
+		return [word if i == 0 else f' {word}' for i, word in enumerate(words)]
+
+	def _usage(
+		self, messages: list[BaseMessage], tokens: list[str]
+	) -> dict[str, int]:
+		input_tokens = sum(
+			len(str(message.content).split()) for message in messages
+		)
+		return {
+			'input_tokens': input_tokens,
+			'output_tokens': len(tokens),
+			'total_tokens': input_tokens + len(tokens),
+		}
+
+	def _result(
+		self, messages: list[BaseMessage], tokens: list[str]
+	) -> ChatResult:
+		message = AIMessage(
+			content=''.join(tokens),
+			usage_metadata=self._usage(messages, tokens),
+			response_metadata={'model_name': self.model_name},
+		)
+		return ChatResult(generations=[ChatGeneration(message=message)])
+
+	def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+		time.sleep(self.latency)
+		if self._should_fail():
+			raise FakeLLMError('Injected failure')
+		tokens = self._tokens(messages)
+		time.sleep(self._token_delay() * len(tokens))
+		return self._result(messages, tokens)
+
+	async def _agenerate(
+		self, messages, stop=None, run_manager=None, **kwargs
+	):
+		await asyncio.sleep(self.latency)
+		if self._should_fail():
+			raise FakeLLMError('Injected failure')
+		tokens = self._tokens(messages)
+		await asyncio.sleep(self._token_delay() * len(tokens))
+		return self._result(messages, tokens)
+
+	def _chunks(
+		self, messages: list[BaseMessage], tokens: list[str]
+	) -> Iterator[ChatGenerationChunk]:
+		for token in tokens:
+			yield ChatGenerationChunk(message=AIMessageChunk(content=token))
+		yield ChatGenerationChunk(
+			message=AIMessageChunk(
+				content='',
+				usage_metadata=self._usage(messages, tokens),
+				response_metadata={'model_name': self.model_name},
+			)
+		)
+
+	def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+		time.sleep(self.latency)
+		if self._should_fail():
+			raise FakeLLMError('Injected failure')
+		for chunk in self._chunks(messages, self._tokens(messages)):
+			time.sleep(self._token_delay())
+			yield chunk
+
+	async def _astream(
+		self, messages, stop=None, run_manager=None, **kwargs
+	) -> AsyncIterator[ChatGenerationChunk]:
+		await asyncio.sleep(self.latency)
+		if self._should_fail():
+			raise FakeLLMError('Injected failure')
+		for chunk in self._chunks(messages, self._tokens(messages)):
+			await asyncio.sleep(self._token_delay())
+			yield chunk
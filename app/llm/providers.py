@@ -0,0 +1,64 @@
+from collections.abc import Callable
+
+from langchain_core.language_models import BaseChatModel
+
+from app.core.config import settings
+
+ProviderFactory = Callable[[str], BaseChatModel]
+
+PROVIDERS: dict[str, ProviderFactory] = {}
+
+
+def register_provider(
+	name: str,
+) -> Callable[[ProviderFactory], ProviderFactory]:
+	"""Registra uma fábrica de clientes de chat sob o nome do provedor"""
+
+	def decorator(factory: ProviderFactory) -> ProviderFactory:
+		PROVIDERS[name] = factory
+		return factory
+
+	return decorator
+
+
+def get_provider(name: str) -> ProviderFactory:
+	factory = PROVIDERS.get(name)
+
+	if not factory:
+		raise ValueError(f'LLM provider not found: {name}')
+
+	return factory
+
+
+@register_provider('groq')
+def build_groq_model(model_name: str) -> BaseChatModel:
+	from langchain_groq import ChatGroq
+
+	return ChatGroq(model=model_name, temperature=settings.LLM_TEMPERATURE)
+
+
+@register_provider('openai')
+def build_openai_compatible_model(model_name: str) -> BaseChatModel:
+	# Qualquer API compatível com OpenAI (vLLM, Ollama, LM Studio, ...)
+	from langchain_openai import ChatOpenAI
+
+	return ChatOpenAI(
+		model=model_name,
+		temperature=settings.LLM_TEMPERATURE,
+		base_url=settings.LLM_BASE_URL,
+		api_key=settings.LLM_API_KEY,
+	)
+
+
+@register_provider('fake')
+def build_fake_model(model_name: str) -> BaseChatModel:
+	from app.llm.fake import FakeChatModel
+
+	return FakeChatModel(
+		model_name=model_name,
+		latency=settings.FAKE_LLM_LATENCY_SECONDS,
+		tokens_per_second=settings.FAKE_LLM_TOKENS_PER_SECOND,
+		response_tokens=settings.FAKE_LLM_RESPONSE_TOKENS,
+		failure_rate=settings.FAKE_LLM_FAILURE_RATE,
+		seed=settings.FAKE_LLM_SEED,
+	)
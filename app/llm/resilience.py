@@ -0,0 +1,247 @@
+import asyncio
+import random
+import time
+from collections.abc import Awaitable, Callable
+from time import monotonic
+
+import httpx
+from langchain.agents.middleware import AgentMiddleware
+from langchain.agents.middleware.types import ModelRequest, ModelResponse
+from langchain_core.messages import AIMessage
+from langgraph.config import get_config
+
+from app.llm import get_model_by_difficulty, get_model_name
+from app.utils.telemetry import span
+
+# Da dificuldade mais alta para a mais baixa
+DIFFICULTY_ORDER = ['HIGH', 'MEDIUM', 'LOW']
+TRANSIENT_STATUS_CODES = {408, 409, 425, 429, 500, 502, 503, 504}
+
+
+def get_fallback_chain(difficulty: str, fallback: bool = True) -> list[str]:
+	"""Dificuldade pedida seguida das mais baixas (ex.: MEDIUM -> LOW)"""
+	if not fallback or difficulty not in DIFFICULTY_ORDER:
+		return [difficulty]
+	return DIFFICULTY_ORDER[DIFFICULTY_ORDER.index(difficulty) :]
+
+
+def _status_code(error: BaseException) -> int | None:
+	status_code = getattr(error, 'status_code', None)
+	if status_code is None:
+		status_code = getattr(
+			getattr(error, 'response', None), 'status_code', None
+		)
+	return status_code
+
+
+def is_transient_error(error: BaseException) -> bool:
+	"""Erros em que vale a pena tentar de novo (timeout, rede, 429, 5xx)"""
+	if isinstance(
+		error, (TimeoutError, ConnectionError, httpx.TransportError)
+	):
+		return True
+	return _status_code(error) in TRANSIENT_STATUS_CODES
+
+
+def is_provider_error(error: BaseException) -> bool:
+	"""Erros do provedor: os transitórios e qualquer resposta HTTP de erro"""
+	return is_transient_error(error) or _status_code(error) is not None
+
+
+class ResilienceMiddleware(AgentMiddleware):
+	"""
+	Política de prazo, retentativa e fallback das chamadas ao modelo.
+
+	- Cada tentativa tem `attempt_timeout` segundos e a chamada inteira, com
+	  retentativas e fallbacks, tem `deadline` segundos. Cada dificuldade
+	  tem sua parte do prazo que resta, para o fallback sempre ter tempo.
+	- Erros transitórios são repetidos até `max_retries` vezes com backoff
+	  exponencial com jitter; depois, passa para a próxima dificuldade. Um
+	  timeout passa direto para ela (o modelo está lento, não instável).
+	- `arun`/`run` aplicam a mesma política fora do agente (ex.: o resumo
+	  do contexto).
+	- Com `hedge_after` > 0, uma segunda requisição igual é disparada se a
+	  primeira demorar mais que isso, e vale a que terminar primeiro. No
+	  streaming (`configurable.hedge = False`) o hedge é desligado para não
+	  misturar tokens de duas respostas.
+
+	A dificuldade e o modelo usados ficam no `response_metadata` da resposta
+	(`model_tier`, `model_name`, `model_fallback`).
+	"""
+
+	def __init__(
+		self,
+		*,
+		difficulty: str,
+		fallback: bool,
+		attempt_timeout: float,
+		deadline: float,
+		max_retries: int,
+		backoff_base: float,
+		backoff_max: float,
+		hedge_after: float,
+	):
+		super().__init__()
+		self.difficulties = get_fallback_chain(difficulty, fallback)
+		self.attempt_timeout = attempt_timeout
+		self.deadline = deadline
+		self.max_retries = max_retries
+		self.backoff_base = backoff_base
+		self.backoff_max = backoff_max
+		self.hedge_after = hedge_after
+		self.retries = 0
+		self.hedges = 0
+		self.fallbacks = 0
+		self.deadline_exceeded = 0
+
+	def _backoff(self, attempt: int) -> float:
+		# Full jitter: espera aleatória até o teto exponencial
+		return random.uniform(
+			0, min(self.backoff_max, self.backoff_base * 2**attempt)
+		)
+
+	def _tag(self, response, difficulty: str):
+		messages = (
+			response.result
+			if isinstance(response, ModelResponse)
+			else [response]
+		)
+		for message in messages:
+			if isinstance(message, AIMessage):
+				metadata = message.response_metadata
+				metadata.setdefault('model_name', get_model_name(difficulty))
+				metadata['model_tier'] = difficulty
+				metadata['model_fallback'] = difficulty != self.difficulties[0]
+		return response
+
+	def _hedge_enabled(self) -> bool:
+		if self.hedge_after <= 0:
+			return False
+		try:
+			configurable = get_config().get('configurable', {})
+		except RuntimeError:
+			return True
+		return configurable.get('hedge', True)
+
+	async def _attempt(self, call, timeout: float, hedge: bool):
+		tasks = {asyncio.ensure_future(call())}
+		try:
+			async with asyncio.timeout(timeout):
+				if hedge and self.hedge_after < timeout:
+					done, _ = await asyncio.wait(
+						tasks, timeout=self.hedge_after
+					)
+					if not done:
+						self.hedges += 1
+						tasks.add(asyncio.ensure_future(call()))
+
+				error = None
+				while tasks:
+					done, tasks = await asyncio.wait(
+						tasks, return_when=asyncio.FIRST_COMPLETED
+					)
+					for task in done:
+						if task.exception() is None:
+							return task.result()
+						error = task.exception()
+				raise error
+		finally:
+			for task in tasks:
+				task.cancel()
+
+	async def arun[T](
+		self, call: Callable[[str], Awaitable[T]]
+	) -> tuple[T, str]:
+		"""
+		Executa `call(dificuldade)` com a política; retorna (resultado,
+		dificuldade usada). TimeoutError quando o prazo acaba.
+		"""
+		hedge = self._hedge_enabled()
+		deadline = monotonic() + self.deadline
+		error = None
+
+		for index, difficulty in enumerate(self.difficulties):
+			if index:
+				self.fallbacks += 1
+			tiers_left = len(self.difficulties) - index
+			tier_deadline = monotonic() + (deadline - monotonic()) / tiers_left
+
+			for attempt in range(self.max_retries + 1):
+				remaining = tier_deadline - monotonic()
+				if remaining <= 0:
+					break
+
+				try:
+					with span('llm', difficulty):
+						result = await self._attempt(
+							lambda: call(difficulty),
+							min(self.attempt_timeout, remaining),
+							hedge,
+						)
+				except Exception as exc:
+					if not is_transient_error(exc):
+						raise
+					error = exc
+					if isinstance(exc, TimeoutError) and tiers_left > 1:
+						break
+					if attempt < self.max_retries:
+						self.retries += 1
+						await asyncio.sleep(
+							min(
+								self._backoff(attempt),
+								max(tier_deadline - monotonic(), 0),
+							)
+						)
+					continue
+
+				return result, difficulty
+
+		if error is None or isinstance(error, TimeoutError):
+			self.deadline_exceeded += 1
+			raise TimeoutError('Model call deadline exceeded') from error
+		raise error
+
+	def run[T](self, call: Callable[[str], T]) -> tuple[T, str]:
+		"""arun síncrono: sem prazo por tentativa nem hedge"""
+		error = None
+		for index, difficulty in enumerate(self.difficulties):
+			if index:
+				self.fallbacks += 1
+
+			for attempt in range(self.max_retries + 1):
+				try:
+					with span('llm', difficulty):
+						return call(difficulty), difficulty
+				except Exception as exc:
+					if not is_transient_error(exc):
+						raise
+					error = exc
+					if attempt < self.max_retries:
+						self.retries += 1
+						time.sleep(self._backoff(attempt))
+
+		raise error
+
+	async def awrap_model_call(self, request: ModelRequest, handler):
+		response, difficulty = await self.arun(
+			lambda difficulty: handler(
+				request.override(model=get_model_by_difficulty(difficulty))
+			)
+		)
+		return self._tag(response, difficulty)
+
+	def wrap_model_call(self, request: ModelRequest, handler):
+		response, difficulty = self.run(
+			lambda difficulty: handler(
+				request.override(model=get_model_by_difficulty(difficulty))
+			)
+		)
+		return self._tag(response, difficulty)
+
+	def stats(self) -> dict[str, int]:
+		return {
+			'retries': self.retries,
+			'hedges': self.hedges,
+			'fallbacks': self.fallbacks,
+			'deadline_exceeded': self.deadline_exceeded,
+		}
@@ -0,0 +1,115 @@
+import logging
+from functools import lru_cache
+
+from langchain.agents.middleware import AgentMiddleware
+from langchain.agents.middleware.types import ModelRequest, ModelResponse
+from langchain_core.messages import AIMessage, BaseMessage
+
+from app.core.config import settings
+
+# Tokens extras por mensagem (papel e separadores do formato de chat)
+MESSAGE_OVERHEAD_TOKENS = 4
+
+logger = logging.getLogger(__name__)
+
+
+@lru_cache(maxsize=1)
+def _get_encoding():
+	"""
+	Tokenizador local (tiktoken, extra opcional). Sem ele, ou sem o arquivo
+	do encoding (baixado no primeiro uso), vale a estimativa por caracteres
+	"""
+	try:
+		import tiktoken
+	except ImportError:
+		return None
+	try:
+		return tiktoken.get_encoding(settings.LLM_TOKENIZER_ENCODING)
+	except Exception:
+		logger.warning('Tokenizer unavailable', exc_info=True)
+		return None
+
+
+def count_tokens(text: str) -> int:
+	encoding = _get_encoding()
+	if encoding is None:
+		return max(1, len(text) // 4)
+	return len(encoding.encode(text, disallowed_special=()))
+
+
+def count_messages_tokens(
+	messages: list[BaseMessage], system_prompt: str | None = None
+) -> int:
+	"""Tokens de entrada de uma chamada de chat (contagem local)"""
+	total = sum(
+		count_tokens(message.text) + MESSAGE_OVERHEAD_TOKENS
+		for message in messages
+	)
+	if system_prompt:
+		total += count_tokens(system_prompt) + MESSAGE_OVERHEAD_TOKENS
+	return total
+
+
+class TokenUsageMiddleware(AgentMiddleware):
+	"""
+	Garante o uso de tokens em toda resposta do modelo: quando o provedor
+	não informa (ex.: streaming sem usage), conta localmente a entrada e a
+	saída e marca `usage_estimated` nos metadados da mensagem.
+
+	Também soma os tokens de entrada servidos do cache de prefixo do
+	provedor (`cache_read`), para acompanhar o efeito do layout do prompt.
+	"""
+
+	def __init__(self):
+		super().__init__()
+		self.calls = 0
+		self.estimated = 0
+		self.prompt_tokens = 0
+		self.cached_prompt_tokens = 0
+
+	def _account(self, request: ModelRequest, response):
+		messages = (
+			response.result
+			if isinstance(response, ModelResponse)
+			else [response]
+		)
+		for message in messages:
+			if not isinstance(message, AIMessage):
+				continue
+			usage = message.usage_metadata
+			estimated = not usage
+			if estimated:
+				input_tokens = count_messages_tokens(
+					request.messages, request.system_prompt
+				)
+				output_tokens = count_tokens(message.text)
+				usage = message.usage_metadata = {
+					'input_tokens': input_tokens,
+					'output_tokens': output_tokens,
+					'total_tokens': input_tokens + output_tokens,
+				}
+			message.response_metadata['usage_estimated'] = estimated
+			details = usage.get('input_token_details') or {}
+
+			self.calls += 1
+			self.estimated += estimated
+			self.prompt_tokens += usage['input_tokens']
+			self.cached_prompt_tokens += details.get('cache_read') or 0
+		return response
+
+	async def awrap_model_call(self, request: ModelRequest, handler):
+		return self._account(request, await handler(request))
+
+	def wrap_model_call(self, request: ModelRequest, handler):
+		return self._account(request, handler(request))
+
+	def stats(self) -> dict[str, int | float]:
+		return {
+			'calls': self.calls,
+			'estimated': self.estimated,
+			'prompt_tokens': self.prompt_tokens,
+			'cached_prompt_tokens': self.cached_prompt_tokens,
+			'cached_ratio': self.cached_prompt_tokens / self.prompt_tokens
+			if self.prompt_tokens
+			else 0.0,
+		}
@@ -1,7 +1,41 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 
+from app.agents.consolidation_agent.worker import (
+	get_consolidation_worker_stats,
+	start_consolidation_worker,
+	stop_consolidation_worker,
+)
+from app.agents.problem_suggester import get_problem_suggestion_stats
+from app.agents.teacher_agent import (
+	get_token_usage_stats,
+	resilience,
+	summary_resilience,
+)
+from app.agents.teacher_agent.cache import get_teacher_agent_cache_stats
+from app.agents.teacher_agent.response_cache import response_cache
 from app.core.config import settings
+from app.core.db import get_db_pool_stats, init_db
+from app.llm.admission import llm_admission
+from app.storage import get_storage_stats
+from app.llm.checkpointer import (
+	close_checkpointer,
+	get_pool_stats,
+	open_checkpointer,
+)
+from app.utils.hash_pool import (
+	close_hash_pool,
+	get_hash_pool_stats,
+	open_hash_pool,
+)
+from app.utils.notifier import chat_notifier
+from app.utils.principal_cache import principal_cache
+from app.utils.query_counter import QueryCountMiddleware
+from app.utils.telemetry import TelemetryMiddleware, render_metrics
+from app.utils.text_extraction import close_extraction_pool
 from app.api.routes import (
 	auth,
 	teachers,
@@ -11,11 +45,29 @@ from app.api.routes import (
 	student_sessions,
 	chat_messages,
 	consolidations,
+	files,
 )
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+	await init_db()
+	# Checkpointer do agente: pool único por processo, setup() uma vez
+	await open_checkpointer()
+	# Processos do bcrypt sobem antes da primeira rajada de logins
+	open_hash_pool()
+	start_consolidation_worker()
+	yield
+	await stop_consolidation_worker()
+	close_extraction_pool()
+	close_hash_pool()
+	await close_checkpointer()
+
+
 app = FastAPI(
 	title=settings.PROJECT_NAME,
 	openapi_url=f'{settings.API_V1_STR}/openapi.json',
+	lifespan=lifespan,
 )
 
 # CORS
@@ -28,6 +80,14 @@ if settings.all_cors_origins:
 		allow_headers=['*'],
 	)
 
+# Tempo por rota e por etapa (/metrics e Server-Timing)
+if settings.TELEMETRY_ENABLED:
+	app.add_middleware(TelemetryMiddleware)
+
+# Consultas SQL por requisição (headers X-DB-* e aviso de N+1)
+if settings.QUERY_COUNTER_ENABLED:
+	app.add_middleware(QueryCountMiddleware)
+
 
 # Include routers
 app.include_router(auth.router, prefix=f'{settings.API_V1_STR}/auth')
@@ -42,6 +102,7 @@ app.include_router(
 )
 app.include_router(chat_messages.router, prefix=f'{settings.API_V1_STR}')
 app.include_router(consolidations.router, prefix=f'{settings.API_V1_STR}')
+app.include_router(files.router, prefix=f'{settings.API_V1_STR}')
 
 
 @app.get('/')
@@ -49,6 +110,78 @@ def root():
 	return {'message': 'GPT Teacher Backend API'}
 
 
+@app.get('/metrics', include_in_schema=False)
+def metrics():
+	return PlainTextResponse(
+		render_metrics(), media_type='text/plain; version=0.0.4'
+	)
+
+
 @app.get('/health')
 def health_check():
 	return {'status': 'healthy'}
+
+
+@app.get('/health/db')
+def db_health():
+	return {'pool': get_db_pool_stats()}
+
+
+@app.get('/health/checkpointer')
+def checkpointer_health():
+	return {'pool': get_pool_stats()}
+
+
+@app.get('/health/auth-cache')
+def auth_cache_health():
+	return principal_cache.stats()
+
+
+@app.get('/health/password-hashing')
+def password_hashing_health():
+	return get_hash_pool_stats()
+
+
+@app.get('/health/chat-polling')
+def chat_polling_health():
+	return chat_notifier.stats()
+
+
+@app.get('/health/consolidation')
+def consolidation_health():
+	return get_consolidation_worker_stats()
+
+
+@app.get('/health/storage')
+def storage_health():
+	return get_storage_stats()
+
+
+@app.get('/health/problem-suggestion')
+def problem_suggestion_health():
+	return get_problem_suggestion_stats()
+
+
+@app.get('/health/llm-tokens')
+def llm_tokens_health():
+	return get_token_usage_stats()
+
+
+@app.get('/health/agent-cache')
+def agent_cache_health():
+	return get_teacher_agent_cache_stats()
+
+
+@app.get('/health/response-cache')
+def response_cache_health():
+	return response_cache.stats()
+
+
+@app.get('/health/llm-admission')
+def llm_admission_health():
+	return llm_admission.stats()
+
+
+@app.get('/health/llm-resilience')
+def llm_resilience_health():
+	return {**resilience.stats(), 'summary': summary_resilience.stats()}
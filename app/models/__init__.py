@@ -0,0 +1,10 @@
+from app.models.chat_message_metadata import ChatMessageMetadata
+from app.models.consolidation_job import ConsolidationJob
+from app.models.student_problem_stats import StudentProblemStats
+
+# Tabelas mantidas pelo backend; as demais pertencem ao gpt_teacher_db
+BACKEND_TABLES = [
+	ChatMessageMetadata.__table__,
+	ConsolidationJob.__table__,
+	StudentProblemStats.__table__,
+]
@@ -0,0 +1,26 @@
+from datetime import datetime
+
+from sqlalchemy import false
+from sqlmodel import Field, SQLModel
+
+# Colunas booleanas: NOT NULL com DEFAULT, para entrarem em tabelas que já
+# têm linhas (_add_missing_columns)
+_FALSE = {'server_default': false()}
+
+
+class ChatMessageMetadata(SQLModel, table=True):
+	"""Dados da geração de uma mensagem do agente (modelo usado e tokens)"""
+
+	__tablename__ = 'chat_message_metadata'
+
+	chat_message_id: str = Field(primary_key=True)
+	model_name: str | None = None
+	model_tier: str | None = None
+	model_fallback: bool = Field(default=False, sa_column_kwargs=_FALSE)
+	cached: bool = Field(default=False, sa_column_kwargs=_FALSE)
+	prompt_tokens: int | None = None
+	cached_prompt_tokens: int | None = None
+	completion_tokens: int | None = None
+	# Tokens contados pelo tokenizador local, não informados pelo provedor
+	usage_estimated: bool = Field(default=False, sa_column_kwargs=_FALSE)
+	created_at: datetime = Field(default_factory=datetime.utcnow)
@@ -0,0 +1,30 @@
+from datetime import datetime
+
+from sqlmodel import Field, SQLModel
+
+
+class ConsolidationJob(SQLModel, table=True):
+	"""
+	Geração pendente da consolidação de uma sessão encerrada. Uma por
+	sessão: enfileirar de novo a mesma sessão não cria outra tarefa.
+	"""
+
+	__tablename__ = 'consolidation_job'
+
+	session_id: str = Field(primary_key=True)
+	student_id: str
+	problem_id: str = Field(index=True)
+	# pending -> running -> done | failed (pending de novo nas retentativas)
+	status: str = Field(default='pending', index=True)
+	attempts: int = 0
+	last_error: str | None = None
+	# Próxima tentativa não antes disso (backoff entre retentativas)
+	run_after: datetime = Field(default_factory=datetime.utcnow)
+	# Início da tentativa atual (renovado antes de cada chamada ao modelo);
+	# tarefas 'running' antigas são retomadas
+	locked_at: datetime | None = None
+	# Reserva atual: só ela conclui ou devolve a tarefa, mesmo que o lease
+	# tenha vencido e outro worker a tenha retomado
+	locked_by: str | None = None
+	created_at: datetime = Field(default_factory=datetime.utcnow)
+	updated_at: datetime = Field(default_factory=datetime.utcnow)
@@ -0,0 +1,24 @@
+from datetime import datetime
+
+from sqlmodel import Field, SQLModel
+
+
+class StudentProblemStats(SQLModel, table=True):
+	"""
+	Contadores de um aluno em um problema, atualizados na mesma transação
+	que grava sessões e mensagens. A análise da turma soma estas linhas em
+	vez de varrer sessões e mensagens.
+	"""
+
+	__tablename__ = 'student_problem_stats'
+
+	problem_id: str = Field(primary_key=True)
+	student_id: str = Field(primary_key=True)
+	classroom_id: str = Field(index=True)
+	sessions_started: int = 0
+	sessions_closed: int = 0
+	# Soma da duração das sessões encerradas
+	session_seconds: float = 0
+	messages: int = 0
+	student_messages: int = 0
+	last_activity_at: datetime | None = None
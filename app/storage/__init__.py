@@ -0,0 +1,181 @@
+import asyncio
+import hashlib
+import hmac
+import mimetypes
+import re
+import time
+from collections.abc import Iterator
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import PurePath
+from typing import BinaryIO
+from urllib.parse import quote, unquote, urlencode
+
+from fastapi import UploadFile
+
+from app.core.config import settings
+from app.storage.base import StorageBackend
+
+# file_url dos problemas: files/<sha256>/<nome original>
+_FILE_URL = re.compile(r'^files/([0-9a-f]{64})/(.+)$')
+
+_stats = {'uploads': 0, 'deduplicated': 0, 'bytes_written': 0}
+
+
+class FileTooLargeError(ValueError):
+	"""Arquivo acima do limite de tamanho (ex.: STORAGE_MAX_UPLOAD_BYTES)"""
+
+
+@dataclass(frozen=True)
+class StoredFile:
+	digest: str
+	size: int
+	filename: str
+	# O mesmo conteúdo já estava no storage (nada foi gravado)
+	deduplicated: bool
+
+	@property
+	def file_url(self) -> str:
+		return f'files/{self.digest}/{quote(self.filename)}'
+
+
+@lru_cache
+def get_storage() -> StorageBackend:
+	"""Backend configurado (um por processo)"""
+	if settings.STORAGE_BACKEND == 'local':
+		from app.storage.local import LocalStorage
+
+		return LocalStorage(settings.STORAGE_LOCAL_PATH)
+	if settings.STORAGE_BACKEND == 's3':
+		from app.storage.s3 import S3Storage
+
+		return S3Storage(
+			bucket=settings.STORAGE_S3_BUCKET,
+			endpoint_url=settings.STORAGE_S3_ENDPOINT_URL,
+			region=settings.STORAGE_S3_REGION,
+			access_key=settings.STORAGE_S3_ACCESS_KEY,
+			secret_key=settings.STORAGE_S3_SECRET_KEY,
+		)
+	raise ValueError(f'Storage backend not found: {settings.STORAGE_BACKEND}')
+
+
+def _object_key(digest: str) -> str:
+	return f'sha256/{digest[:2]}/{digest}'
+
+
+def guess_content_type(filename: str) -> str:
+	return mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+
+
+def _safe_filename(filename: str | None) -> str:
+	# Só o nome, sem diretórios enviados pelo cliente
+	name = PurePath((filename or '').replace('\\', '/')).name
+	return name or 'file'
+
+
+def _hash_file(file: BinaryIO, max_bytes: int) -> tuple[str, int]:
+	digest = hashlib.sha256()
+	size = 0
+	while chunk := file.read(settings.STORAGE_CHUNK_BYTES):
+		size += len(chunk)
+		if size > max_bytes:
+			raise FileTooLargeError(f'File is larger than {max_bytes} bytes')
+		digest.update(chunk)
+	return digest.hexdigest(), size
+
+
+def _store(file: BinaryIO, filename: str, max_bytes: int) -> StoredFile:
+	file.seek(0)
+	digest, size = _hash_file(file, max_bytes)
+	key = _object_key(digest)
+	storage = get_storage()
+
+	# Endereçado pelo conteúdo: o mesmo arquivo em outra turma reaproveita
+	# o objeto já gravado
+	deduplicated = storage.size(key) is not None
+	if not deduplicated:
+		file.seek(0)
+		storage.put(key, file, guess_content_type(filename))
+		_stats['bytes_written'] += size
+
+	_stats['uploads'] += 1
+	_stats['deduplicated'] += deduplicated
+	return StoredFile(digest, size, filename, deduplicated)
+
+
+async def save_upload(upload: UploadFile) -> StoredFile:
+	"""
+	Grava o upload no storage, lendo-o em partes (o arquivo temporário do
+	multipart), sem carregar o conteúdo inteiro na memória
+	"""
+	return await asyncio.to_thread(
+		_store,
+		upload.file,
+		_safe_filename(upload.filename),
+		settings.STORAGE_MAX_UPLOAD_BYTES,
+	)
+
+
+def parse_file_url(file_url: str | None) -> tuple[str, str] | None:
+	"""(sha256, nome) de um file_url gravado pelo storage"""
+	match = _FILE_URL.match(file_url or '')
+	if match is None:
+		return None
+	return match[1], unquote(match[2])
+
+
+def _signature(digest: str, filename: str, expires: int) -> str:
+	message = f'{digest}:{filename}:{expires}'.encode()
+	return hmac.new(
+		settings.SECRET_KEY.encode(), message, hashlib.sha256
+	).hexdigest()
+
+
+def verify_download(
+	digest: str, filename: str, expires: int, signature: str
+) -> bool:
+	if expires < time.time():
+		return False
+	expected = _signature(digest, filename, expires)
+	return hmac.compare_digest(expected, signature)
+
+
+def download_url(digest: str, filename: str) -> str:
+	"""
+	Link de download válido por STORAGE_URL_EXPIRE_SECONDS: pré-assinado
+	no S3 ou, no storage local, a rota de arquivos da API com assinatura
+	"""
+	expires_in = settings.STORAGE_URL_EXPIRE_SECONDS
+	if settings.STORAGE_S3_PRESIGNED_URLS:
+		url = get_storage().presigned_url(
+			_object_key(digest),
+			expires_in,
+			filename,
+			guess_content_type(filename),
+		)
+		if url is not None:
+			return url
+
+	expires = int(time.time()) + expires_in
+	query = urlencode(
+		{
+			'name': filename,
+			'expires': expires,
+			'signature': _signature(digest, filename, expires),
+		}
+	)
+	return f'{settings.API_V1_STR}/files/{digest}?{query}'
+
+
+def stored_size(digest: str) -> int | None:
+	return get_storage().size(_object_key(digest))
+
+
+def read_file(digest: str, start: int, end: int) -> Iterator[bytes]:
+	return get_storage().read(
+		_object_key(digest), start, end, settings.STORAGE_CHUNK_BYTES
+	)
+
+
+def get_storage_stats() -> dict[str, int | str]:
+	return {'backend': settings.STORAGE_BACKEND, **_stats}
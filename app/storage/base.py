@@ -0,0 +1,43 @@
+from abc import ABC, abstractmethod
+from collections.abc import Iterator
+from typing import BinaryIO
+from urllib.parse import quote
+
+# Tipos que o navegador pode abrir direto; o resto (HTML, SVG, ...) é baixado
+# como anexo, para não executar conteúdo enviado no domínio da API
+INLINE_CONTENT_TYPES = frozenset({'application/pdf', 'text/plain'})
+
+
+def content_disposition(filename: str, content_type: str) -> str:
+	"""`inline` só para PDFs e texto; mantém o nome original (até não ASCII)"""
+	disposition = (
+		'inline' if content_type in INLINE_CONTENT_TYPES else 'attachment'
+	)
+	return f"{disposition}; filename*=UTF-8''{quote(filename)}"
+
+
+class StorageBackend(ABC):
+	"""
+	Guarda objetos imutáveis por chave. Os métodos são síncronos (disco ou
+	boto3) e rodam em threads, fora do event loop.
+	"""
+
+	@abstractmethod
+	def size(self, key: str) -> int | None:
+		"""Tamanho do objeto em bytes; None se não existe"""
+
+	@abstractmethod
+	def put(self, key: str, file: BinaryIO, content_type: str) -> None:
+		"""Grava o arquivo (lido em partes, do início) sob a chave"""
+
+	@abstractmethod
+	def read(
+		self, key: str, start: int, end: int, chunk_size: int
+	) -> Iterator[bytes]:
+		"""Bytes de `start` a `end` (inclusivo), em partes"""
+
+	def presigned_url(
+		self, key: str, expires_in: int, filename: str, content_type: str
+	) -> str | None:
+		"""URL de download direto no backend; None se não houver"""
+		return None
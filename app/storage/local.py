@@ -0,0 +1,51 @@
+import os
+import shutil
+import tempfile
+from collections.abc import Iterator
+from pathlib import Path
+from typing import BinaryIO
+
+from app.storage.base import StorageBackend
+
+
+class LocalStorage(StorageBackend):
+	"""Objetos em arquivos abaixo de `root` (um diretório por prefixo)"""
+
+	def __init__(self, root: str):
+		self.root = Path(root)
+
+	def _path(self, key: str) -> Path:
+		return self.root / key
+
+	def size(self, key: str) -> int | None:
+		try:
+			return self._path(key).stat().st_size
+		except FileNotFoundError:
+			return None
+
+	def put(self, key: str, file: BinaryIO, content_type: str) -> None:
+		path = self._path(key)
+		path.parent.mkdir(parents=True, exist_ok=True)
+		# Grava em um temporário e renomeia: quem lê nunca vê um arquivo
+		# pela metade, e uploads iguais em paralelo não se atrapalham
+		fd, temp_path = tempfile.mkstemp(dir=path.parent, suffix='.tmp')
+		try:
+			with os.fdopen(fd, 'wb') as temp:
+				shutil.copyfileobj(file, temp)
+			os.replace(temp_path, path)
+		except BaseException:
+			os.unlink(temp_path)
+			raise
+
+	def read(
+		self, key: str, start: int, end: int, chunk_size: int
+	) -> Iterator[bytes]:
+		with open(self._path(key), 'rb') as file:
+			file.seek(start)
+			remaining = end - start + 1
+			while remaining > 0:
+				chunk = file.read(min(chunk_size, remaining))
+				if not chunk:
+					break
+				remaining -= len(chunk)
+				yield chunk
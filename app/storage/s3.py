@@ -0,0 +1,79 @@
+from collections.abc import Iterator
+from typing import BinaryIO
+
+from app.storage.base import StorageBackend, content_disposition
+
+
+class S3Storage(StorageBackend):
+	"""
+	Objetos em um bucket S3 ou compatível (MinIO, R2, ...). O upload é
+	multipart, lendo o arquivo em partes.
+	"""
+
+	def __init__(
+		self,
+		bucket: str,
+		endpoint_url: str | None = None,
+		region: str | None = None,
+		access_key: str | None = None,
+		secret_key: str | None = None,
+	):
+		import boto3
+		from botocore.config import Config
+
+		self.bucket = bucket
+		self._client = boto3.client(
+			's3',
+			endpoint_url=endpoint_url,
+			region_name=region,
+			aws_access_key_id=access_key,
+			aws_secret_access_key=secret_key,
+			config=Config(signature_version='s3v4'),
+		)
+
+	def size(self, key: str) -> int | None:
+		from botocore.exceptions import ClientError
+
+		try:
+			head = self._client.head_object(Bucket=self.bucket, Key=key)
+		except ClientError as error:
+			if error.response['Error']['Code'] in ('404', 'NoSuchKey'):
+				return None
+			raise
+		return head['ContentLength']
+
+	def put(self, key: str, file: BinaryIO, content_type: str) -> None:
+		self._client.upload_fileobj(
+			file,
+			self.bucket,
+			key,
+			ExtraArgs={'ContentType': content_type},
+		)
+
+	def read(
+		self, key: str, start: int, end: int, chunk_size: int
+	) -> Iterator[bytes]:
+		response = self._client.get_object(
+			Bucket=self.bucket, Key=key, Range=f'bytes={start}-{end}'
+		)
+		body = response['Body']
+		try:
+			yield from body.iter_chunks(chunk_size)
+		finally:
+			body.close()
+
+	def presigned_url(
+		self, key: str, expires_in: int, filename: str, content_type: str
+	) -> str | None:
+		return self._client.generate_presigned_url(
+			'get_object',
+			Params={
+				'Bucket': self.bucket,
+				'Key': key,
+				'ResponseContentDisposition': content_disposition(
+					filename, content_type
+				),
+				'ResponseContentType': content_type,
+			},
+			ExpiresIn=expires_in,
+		)
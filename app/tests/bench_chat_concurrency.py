@@ -0,0 +1,252 @@
+"""
+Benchmark de concorrência do agente professor contra um LLM simulado.
+
+Modo `agent` (padrão): compara o caminho síncrono (invoke em um threadpool
+de 40 workers, como o padrão do Starlette) com o caminho assíncrono
+(ainvoke no event loop) para diferentes quantidades de conversas
+simultâneas. Não acessa rede nem banco: usa o FakeChatModel
+(app/llm/fake.py) e um checkpointer em memória.
+
+Modo `route`: envia as mensagens pela rota do chat (app inteiro, via
+ASGI), com o banco e o checkpointer configurados, e mostra também o
+máximo de conexões do pool do SQLAlchemy em uso. Cria professor, turma,
+problema, alunos e sessões com o prefixo `bench-`: use um banco de
+desenvolvimento. O provedor precisa ser o falso, e os limites de admissão
+altos o bastante para não medir a fila:
+
+	LLM_PROVIDER=fake FAKE_LLM_LATENCY_SECONDS=1 LLM_MAX_CONCURRENCY=1000 \
+	LLM_CLASSROOM_MAX_CONCURRENCY=1000 \
+	python -m app.tests.bench_chat_concurrency --mode route
+
+Uso:
+	python -m app.tests.bench_chat_concurrency --latency 1.0
+"""
+
+import argparse
+import asyncio
+import time
+import uuid
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+import httpx
+from gpt_teacher_db.gpt_teacher.models.classroom import ClassroomCreate
+from gpt_teacher_db.gpt_teacher.models.problem import ProblemCreate
+from gpt_teacher_db.gpt_teacher.models.student import Student
+from gpt_teacher_db.gpt_teacher.models.student_session import (
+	StudentSessionCreate,
+)
+from gpt_teacher_db.gpt_teacher.models.teacher import Teacher
+from langchain.agents import create_agent
+from langchain.messages import HumanMessage
+from langgraph.checkpoint.memory import InMemorySaver
+from sqlmodel import Session
+
+from app.agents.teacher_agent import get_prompt
+from app.core.config import settings
+from app.core.db import async_engine, engine
+from app.cruds import classroom as classroom_crud
+from app.cruds import problem as problem_crud
+from app.cruds import student_session as session_crud
+from app.llm.fake import FakeChatModel
+from app.main import app
+from app.utils.security import create_access_token
+
+# Tamanho padrão do threadpool do Starlette/AnyIO para rotas síncronas
+STARLETTE_THREADPOOL_SIZE = 40
+
+
+def build_agent(latency: float, tokens_per_second: float):
+	return create_agent(
+		model=FakeChatModel(
+			latency=latency, tokens_per_second=tokens_per_second
+		),
+		tools=[],
+		checkpointer=InMemorySaver(),
+		system_prompt=get_prompt(
+			problem_title='Soma de Dois Números',
+			problem_description='Dado dois números, retorne a soma deles.',
+		),
+	)
+
+
+def agent_payload(index: int) -> tuple[dict, dict]:
+	return (
+		{'messages': [HumanMessage(content='Meu código não funciona')]},
+		{'configurable': {'thread_id': f'bench-{index}'}},
+	)
+
+
+def run_sync(agent, concurrency: int) -> float:
+	start = time.perf_counter()
+	with ThreadPoolExecutor(max_workers=STARLETTE_THREADPOOL_SIZE) as pool:
+		futures = [
+			pool.submit(agent.invoke, *agent_payload(index))
+			for index in range(concurrency)
+		]
+		for future in futures:
+			future.result()
+	return time.perf_counter() - start
+
+
+async def run_async(agent, concurrency: int) -> float:
+	start = time.perf_counter()
+	await asyncio.gather(
+		*(agent.ainvoke(*agent_payload(index)) for index in range(concurrency))
+	)
+	return time.perf_counter() - start
+
+
+def create_route_fixtures(concurrency: int) -> list[tuple[str, str]]:
+	"""(sessão, token) de um aluno novo por conversa, no mesmo problema"""
+	prefix = f'bench-{uuid.uuid4().hex[:8]}'
+	with Session(engine) as session:
+		teacher = Teacher(
+			email=f'{prefix}@bench.local',
+			name=prefix,
+			hashed_password='-',
+			is_active=True,
+		)
+		session.add(teacher)
+		session.commit()
+		classroom = classroom_crud.create_classroom(
+			session,
+			ClassroomCreate(name=prefix, description=prefix),
+			str(teacher.id),
+		)
+		problem = problem_crud.create_problem(
+			session,
+			ProblemCreate(
+				title='Soma de Dois Números',
+				description='Dado dois números, retorne a soma deles.',
+			),
+			str(classroom.id),
+		)
+		conversations = []
+		for index in range(concurrency):
+			student = Student(
+				email=f'{prefix}-{index}@bench.local',
+				name=f'{prefix}-{index}',
+				hashed_password='-',
+				is_active=True,
+			)
+			session.add(student)
+			session.commit()
+			student_session = session_crud.create_student_session(
+				session,
+				StudentSessionCreate(problem_id=str(problem.id)),
+				str(student.id),
+			)
+			token = create_access_token(str(student.id), timedelta(hours=1))
+			conversations.append((str(student_session.id), token))
+	return conversations
+
+
+async def sample_checked_out(stop: asyncio.Event) -> int:
+	"""Maior número de conexões do pool assíncrono em uso ao mesmo tempo"""
+	peak = 0
+	while not stop.is_set():
+		peak = max(peak, async_engine.pool.checkedout())
+		await asyncio.sleep(0.01)
+	return peak
+
+
+async def run_route(
+	conversations: list[tuple[str, str]],
+) -> tuple[float, Counter, int]:
+	transport = httpx.ASGITransport(app=app)
+
+	async def send(index: int, session_id: str, token: str) -> int:
+		response = await client.post(
+			f'{settings.API_V1_STR}/call-agent/student-session/'
+			f'{session_id}/chat-messages',
+			headers={'Authorization': f'Bearer {token}'},
+			json={
+				'problem_title': 'Soma de Dois Números',
+				'problem_description': 'Dado dois números, retorne a soma.',
+				'student_code': 'def soma(a, b):\n    return a - b',
+				# Mensagens diferentes: nenhuma resposta vem do cache
+				'user_message': f'Meu código não funciona ({index})',
+				'session_id': session_id,
+			},
+		)
+		return response.status_code
+
+	async with httpx.AsyncClient(
+		transport=transport, base_url='http://bench', timeout=None
+	) as client:
+		stop = asyncio.Event()
+		sampler = asyncio.create_task(sample_checked_out(stop))
+		start = time.perf_counter()
+		statuses = await asyncio.gather(
+			*(
+				send(index, session_id, token)
+				for index, (session_id, token) in enumerate(conversations)
+			)
+		)
+		elapsed = time.perf_counter() - start
+		stop.set()
+		peak = await sampler
+	return elapsed, Counter(statuses), peak
+
+
+async def run_route_benchmark(concurrency_levels: list[int]) -> None:
+	if settings.LLM_PROVIDER != 'fake':
+		raise SystemExit('Route mode needs LLM_PROVIDER=fake')
+
+	print(f'Latência simulada do LLM: {settings.FAKE_LLM_LATENCY_SECONDS}s')
+	print(
+		f'Pool do SQLAlchemy: {settings.DB_POOL_SIZE} + '
+		f'{settings.DB_MAX_OVERFLOW} conexões'
+	)
+	print(
+		f'{"conversas":>10} {"tempo (s)":>10} {"req/s":>8} '
+		f'{"conexões":>9}  status'
+	)
+	# Lifespan da aplicação: checkpointer, pools e workers
+	async with app.router.lifespan_context(app):
+		for concurrency in concurrency_levels:
+			conversations = await asyncio.to_thread(
+				create_route_fixtures, concurrency
+			)
+			elapsed, statuses, peak = await run_route(conversations)
+			print(
+				f'{concurrency:>10} {elapsed:>10.2f} '
+				f'{concurrency / elapsed:>8.1f} {peak:>9}  {dict(statuses)}'
+			)
+
+
+def main():
+	parser = argparse.ArgumentParser()
+	parser.add_argument('--mode', choices=['agent', 'route'], default='agent')
+	parser.add_argument('--latency', type=float, default=1.0)
+	parser.add_argument('--tokens-per-second', type=float, default=0.0)
+	parser.add_argument(
+		'--concurrency', type=int, nargs='+', default=[10, 40, 100, 200, 400]
+	)
+	args = parser.parse_args()
+
+	if args.mode == 'route':
+		asyncio.run(run_route_benchmark(args.concurrency))
+		return
+
+	agent = build_agent(args.latency, args.tokens_per_second)
+
+	print(f'Latência simulada do LLM: {args.latency:.2f}s')
+	print(
+		f'{"conversas":>10} {"sync (s)":>10} {"async (s)":>10} '
+		f'{"sync req/s":>11} {"async req/s":>12}'
+	)
+	for concurrency in args.concurrency:
+		sync_elapsed = run_sync(agent, concurrency)
+		async_elapsed = asyncio.run(run_async(agent, concurrency))
+		print(
+			f'{concurrency:>10} {sync_elapsed:>10.2f} {async_elapsed:>10.2f} '
+			f'{concurrency / sync_elapsed:>11.1f} '
+			f'{concurrency / async_elapsed:>12.1f}'
+		)
+
+
+if __name__ == '__main__':
+	main()
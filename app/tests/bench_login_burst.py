@@ -0,0 +1,108 @@
+"""
+Benchmark de uma rajada de logins (bcrypt) no início de uma aula.
+
+Mede o tempo total da rajada, a latência de cada verificação de senha e o
+maior atraso do event loop (o quanto as outras requisições do worker ficam
+paradas) em três modos:
+
+- inline: bcrypt direto no event loop;
+- threads: bcrypt no threadpool padrão (como uma rota síncrona);
+- processos: bcrypt no pool de processos de hash (app/utils/hash_pool.py).
+
+Não acessa o banco: só verifica senhas contra um hash gerado no início.
+
+Uso:
+	python -m app.tests.bench_login_burst --logins 40 --rounds 12
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+
+from app.core.config import settings
+from app.utils import hash_pool
+from app.utils.security import pwd_context, verify_password
+
+PASSWORD = 'senha-do-aluno-123'
+
+
+async def measure_loop_lag(stop: asyncio.Event, interval: float = 0.01):
+	"""Maior atraso observado entre o sleep pedido e o acordar do loop"""
+	worst = 0.0
+	while not stop.is_set():
+		start = time.perf_counter()
+		await asyncio.sleep(interval)
+		worst = max(worst, time.perf_counter() - start - interval)
+	return worst
+
+
+async def verify(mode: str, hashed: str) -> float:
+	start = time.perf_counter()
+	if mode == 'inline':
+		verify_password(PASSWORD, hashed)
+	elif mode == 'threads':
+		await asyncio.to_thread(verify_password, PASSWORD, hashed)
+	else:
+		await hash_pool.run_in_hash_pool(verify_password, PASSWORD, hashed)
+	return time.perf_counter() - start
+
+
+async def run_burst(mode: str, logins: int, hashed: str) -> dict:
+	stop = asyncio.Event()
+	lag_task = asyncio.create_task(measure_loop_lag(stop))
+	await asyncio.sleep(0)
+
+	start = time.perf_counter()
+	latencies = await asyncio.gather(
+		*(verify(mode, hashed) for _ in range(logins))
+	)
+	elapsed = time.perf_counter() - start
+
+	stop.set()
+	latencies = sorted(latencies)
+	return {
+		'elapsed': elapsed,
+		'p50': statistics.median(latencies),
+		'p99': latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))],
+		'loop_lag': await lag_task,
+	}
+
+
+def main():
+	parser = argparse.ArgumentParser()
+	parser.add_argument('--logins', type=int, default=40)
+	parser.add_argument('--rounds', type=int, default=settings.BCRYPT_ROUNDS)
+	parser.add_argument(
+		'--workers', type=int, default=settings.PASSWORD_HASH_WORKERS or 2
+	)
+	args = parser.parse_args()
+
+	settings.PASSWORD_HASH_WORKERS = args.workers
+	hasher = pwd_context.handler().using(rounds=args.rounds, relaxed=True)
+	hashed = hasher.hash(PASSWORD)
+	hash_pool.open_hash_pool()
+
+	print(
+		f'{args.logins} logins, {hasher.name} rounds={args.rounds}, '
+		f'{args.workers} processos'
+	)
+	print(
+		f'{"modo":>10} {"total (s)":>10} {"p50 (s)":>9} {"p99 (s)":>9} '
+		f'{"logins/s":>9} {"lag loop (s)":>13}'
+	)
+	try:
+		for mode in ('inline', 'threads', 'processos'):
+			result = asyncio.run(run_burst(mode, args.logins, hashed))
+			print(
+				f'{mode:>10} {result["elapsed"]:>10.2f} '
+				f'{result["p50"]:>9.3f} {result["p99"]:>9.3f} '
+				f'{args.logins / result["elapsed"]:>9.1f} '
+				f'{result["loop_lag"]:>13.3f}'
+			)
+	finally:
+		hash_pool.close_hash_pool()
+
+
+if __name__ == '__main__':
+	main()
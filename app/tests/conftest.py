@@ -0,0 +1,146 @@
+import asyncio
+import os
+import uuid
+from datetime import timedelta
+from importlib import import_module
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlmodel import Session, SQLModel, create_engine
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+# Antes de importar o app: os testes nunca chamam um provedor de verdade
+os.environ['LLM_PROVIDER'] = 'fake'
+os.environ['FAKE_LLM_LATENCY_SECONDS'] = '0'
+os.environ['FAKE_LLM_TOKENS_PER_SECOND'] = '0'
+
+
+def _nullable(function):
+	def call(*values):
+		values = [value for value in values if value is not None]
+		return function(values) if values else None
+
+	return call
+
+
+def _add_postgres_functions(dbapi_connection, connection_record):
+	# Usadas nos upserts das estatísticas (app.cruds.analytics)
+	dbapi_connection.create_function('greatest', -1, _nullable(max))
+	dbapi_connection.create_function('least', -1, _nullable(min))
+
+
+@pytest.fixture
+def engines(tmp_path):
+	"""Banco SQLite em arquivo, com um engine síncrono e um assíncrono"""
+	from app.utils.query_counter import install_query_counter
+
+	path = tmp_path / 'test.db'
+	engine = create_engine(f'sqlite:///{path}')
+	async_engine = create_async_engine(f'sqlite+aiosqlite:///{path}')
+	for item in (engine, async_engine.sync_engine):
+		event.listen(item, 'connect', _add_postgres_functions)
+		install_query_counter(item)
+
+	# O app importa todos os modelos, do pacote do banco e do backend
+	import_module('app.main')
+	SQLModel.metadata.create_all(engine)
+	yield engine, async_engine
+	engine.dispose()
+	asyncio.run(async_engine.dispose())
+
+
+@pytest.fixture
+def client(engines, monkeypatch):
+	"""
+	TestClient do app sobre o SQLite, sem lifespan (worker e checkpointer
+	do Postgres) e com o checkpointer do agente em memória
+	"""
+	from fastapi.testclient import TestClient
+	from langgraph.checkpoint.memory import InMemorySaver
+
+	from app.agents import teacher_agent
+	from app.api.routes import chat_messages
+	from app.core import db
+	from app.main import app
+
+	engine, async_engine = engines
+
+	def get_db():
+		with Session(engine) as session:
+			yield session
+
+	async def get_async_db():
+		async with AsyncSession(
+			async_engine, expire_on_commit=False
+		) as session:
+			yield session
+
+	checkpointer = InMemorySaver()
+
+	async def get_checkpointer():
+		return checkpointer
+
+	app.dependency_overrides[db.get_db] = get_db
+	app.dependency_overrides[db.get_async_db] = get_async_db
+	monkeypatch.setattr(chat_messages, 'async_engine', async_engine)
+	monkeypatch.setattr(teacher_agent, 'get_checkpointer', get_checkpointer)
+	yield TestClient(app)
+	app.dependency_overrides.clear()
+
+
+@pytest.fixture
+def student_session(engines):
+	"""Sessão ativa de um aluno em um problema: (id da sessão, headers)"""
+	from gpt_teacher_db.gpt_teacher.models.classroom import ClassroomCreate
+	from gpt_teacher_db.gpt_teacher.models.problem import ProblemCreate
+	from gpt_teacher_db.gpt_teacher.models.student import Student
+	from gpt_teacher_db.gpt_teacher.models.student_session import (
+		StudentSessionCreate,
+	)
+	from gpt_teacher_db.gpt_teacher.models.teacher import Teacher
+
+	from app.cruds import classroom as classroom_crud
+	from app.cruds import problem as problem_crud
+	from app.cruds import student_session as session_crud
+	from app.utils.security import create_access_token
+
+	prefix = uuid.uuid4().hex[:8]
+	with Session(engines[0]) as session:
+		teacher = Teacher(
+			email=f'{prefix}-teacher@test.local',
+			name=prefix,
+			hashed_password='-',
+			is_active=True,
+		)
+		student = Student(
+			email=f'{prefix}-student@test.local',
+			name=prefix,
+			hashed_password='-',
+			is_active=True,
+		)
+		session.add_all([teacher, student])
+		session.commit()
+		classroom = classroom_crud.create_classroom(
+			session,
+			ClassroomCreate(name=prefix, description=prefix),
+			str(teacher.id),
+		)
+		problem = problem_crud.create_problem(
+			session,
+			ProblemCreate(
+				title='Soma de Dois Números',
+				description='Dado dois números, retorne a soma deles.',
+			),
+			str(classroom.id),
+		)
+		student_session = session_crud.create_student_session(
+			session,
+			StudentSessionCreate(problem_id=str(problem.id)),
+			str(student.id),
+		)
+		token = create_access_token(str(student.id), timedelta(hours=1))
+		return (
+			str(student_session.id),
+			{'Authorization': f'Bearer {token}'},
+		)
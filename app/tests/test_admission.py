@@ -0,0 +1,126 @@
+import asyncio
+
+import pytest
+
+from app.llm.admission import AdmissionRejected, LLMAdmission
+
+
+def _admission(**overrides) -> LLMAdmission:
+	options = {
+		'max_concurrency': 2,
+		'classroom_max_concurrency': 2,
+		'student_rate_per_minute': 0,
+		'student_burst': 1,
+		'max_wait': 1.0,
+		'max_queue': 10,
+	}
+	return LLMAdmission(**{**options, **overrides})
+
+
+def test_waiters_get_freed_slots():
+	async def scenario():
+		admission = _admission(max_concurrency=1)
+		first = await admission.acquire('s1', 'c1')
+		waiter = asyncio.create_task(admission.acquire('s2', 'c1'))
+		await asyncio.sleep(0)
+		assert admission.stats()['waiting'] == 1
+
+		first.release()
+		first.release()
+		second = await waiter
+		assert admission.stats()['active'] == 1
+		second.release()
+		assert admission.stats()['active'] == 0
+
+	asyncio.run(scenario())
+
+
+def test_classrooms_are_served_in_turns():
+	async def scenario():
+		admission = _admission(max_concurrency=1)
+		order = []
+
+		async def call(student_id, classroom_id):
+			async with admission.slot(student_id, classroom_id):
+				order.append(classroom_id)
+				await asyncio.sleep(0)
+
+		held = await admission.acquire('s0', 'a')
+		tasks = [
+			asyncio.create_task(call(f's{index}', classroom_id))
+			for index, classroom_id in enumerate(['a', 'a', 'a', 'b', 'b'])
+		]
+		await asyncio.sleep(0)
+		held.release()
+		await asyncio.gather(*tasks)
+		return order
+
+	assert asyncio.run(scenario()) == ['a', 'b', 'a', 'b', 'a']
+
+
+def test_classroom_limit_lets_other_classrooms_through():
+	async def scenario():
+		admission = _admission(max_concurrency=3, classroom_max_concurrency=1)
+		busy = await admission.acquire('s1', 'a')
+		waiter = asyncio.create_task(admission.acquire('s2', 'a'))
+		await asyncio.sleep(0)
+		other = await admission.acquire('s3', 'b')
+		assert admission.stats()['active_by_classroom'] == {'a': 1, 'b': 1}
+
+		busy.release()
+		(await waiter).release()
+		other.release()
+		assert admission.stats()['active'] == 0
+
+	asyncio.run(scenario())
+
+
+def test_wait_timeout_and_full_queue():
+	async def scenario():
+		admission = _admission(max_concurrency=1, max_wait=0.05, max_queue=1)
+		held = await admission.acquire('s1', 'c')
+		waiter = asyncio.create_task(admission.acquire('s2', 'c'))
+		await asyncio.sleep(0)
+		with pytest.raises(AdmissionRejected):
+			await admission.acquire('s3', 'c')
+		with pytest.raises(AdmissionRejected) as error:
+			await waiter
+		assert error.value.retry_after == 0.05
+
+		held.release()
+		stats = admission.stats()
+		assert (stats['queue_full'], stats['queue_timeouts']) == (1, 1)
+		assert (stats['active'], stats['waiting']) == (0, 0)
+
+	asyncio.run(scenario())
+
+
+def test_cancelled_waiter_does_not_leak_a_slot():
+	async def scenario():
+		admission = _admission(max_concurrency=1)
+		held = await admission.acquire('s1', 'c')
+		waiter = asyncio.create_task(admission.acquire('s2', 'c'))
+		await asyncio.sleep(0)
+		# A vaga é concedida e o pedido cancelado no mesmo ciclo
+		held.release()
+		waiter.cancel()
+		with pytest.raises(asyncio.CancelledError):
+			await waiter
+		assert admission.stats()['active'] == 0
+
+	asyncio.run(scenario())
+
+
+def test_student_rate_limit():
+	async def scenario():
+		admission = _admission(student_rate_per_minute=60, student_burst=2)
+		for _ in range(2):
+			(await admission.acquire('s1', 'c')).release()
+		with pytest.raises(AdmissionRejected) as error:
+			await admission.acquire('s1', 'c')
+		assert 0 < error.value.retry_after <= 1
+		# O limite é por aluno
+		(await admission.acquire('s2', 'c')).release()
+		assert admission.stats()['rate_limited'] == 1
+
+	asyncio.run(scenario())
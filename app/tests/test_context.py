@@ -0,0 +1,42 @@
+from app.agents.teacher_agent.context import (
+	CODE_UNCHANGED_BLOCK,
+	_replace_student_code,
+)
+
+CODE = 'def soma(a, b):\n' + ''.join(
+	f'    x{index} = a + b\n' for index in range(20)
+)
+
+
+def _message(code: str) -> str:
+	return f'Pergunta\n<student_code>{code}</student_code>\nFim'
+
+
+def test_first_code_is_kept():
+	assert _replace_student_code(_message(CODE), None) is None
+
+
+def test_message_without_code_is_kept():
+	assert _replace_student_code('Só uma pergunta', CODE) is None
+
+
+def test_unchanged_code():
+	assert _replace_student_code(_message(CODE), CODE) == (
+		f'Pergunta\n{CODE_UNCHANGED_BLOCK}\nFim'
+	)
+
+
+def test_small_change_becomes_a_diff():
+	changed = CODE.replace('x3 = a + b', 'x3 = a - b')
+	content = _replace_student_code(_message(changed), CODE)
+
+	assert content.startswith('Pergunta\n<student_code_diff>')
+	assert content.endswith('</student_code_diff>\nFim')
+	assert '-    x3 = a + b' in content
+	assert '+    x3 = a - b' in content
+	assert 'x10 = a + b' not in content
+
+
+def test_rewrite_keeps_the_full_code():
+	# O diff seria maior que o próprio código
+	assert _replace_student_code(_message('print(1)'), CODE) is None
@@ -0,0 +1,38 @@
+import pytest
+
+from app.utils.csv_import import CSVImportError, parse_csv
+
+
+def test_parse_comma_separated():
+	content = b'Name,Email\nAna,ana@x.com\n,\nBeto , beto@x.com \n'
+	assert parse_csv(content, 10) == [
+		{'name': 'Ana', 'email': 'ana@x.com'},
+		{'name': 'Beto', 'email': 'beto@x.com'},
+	]
+
+
+def test_parse_semicolon_separated_with_bom():
+	content = '﻿Nome;Matrícula\nÂnia;123\n'.encode()
+	assert parse_csv(content, 10) == [{'nome': 'Ânia', 'matrícula': '123'}]
+
+
+def test_missing_values_are_empty():
+	assert parse_csv(b'name,email\nAna\n', 10) == [
+		{'name': 'Ana', 'email': ''}
+	]
+
+
+def test_row_limit():
+	content = b'name\n' + b'\n'.join(b'a%d' % index for index in range(3))
+	assert len(parse_csv(content, 3)) == 3
+	with pytest.raises(CSVImportError, match='more than 2 rows'):
+		parse_csv(content, 2)
+
+
+@pytest.mark.parametrize(
+	('content', 'message'),
+	[(b'', 'header is missing'), ('nome\nç'.encode('latin-1'), 'UTF-8')],
+)
+def test_invalid_csv(content, message):
+	with pytest.raises(CSVImportError, match=message):
+		parse_csv(content, 10)
@@ -0,0 +1,42 @@
+import pytest
+
+from app.api.routes.files import _parse_range
+from app.storage.base import content_disposition
+
+
+@pytest.mark.parametrize(
+	('header', 'expected'),
+	[
+		('bytes=0-99', (0, 99)),
+		('bytes=100-', (100, 999)),
+		('bytes=900-5000', (900, 999)),
+		('bytes=-100', (900, 999)),
+		('bytes=-5000', (0, 999)),
+		('bytes= 10-20', (10, 20)),
+	],
+)
+def test_parse_range(header, expected):
+	assert _parse_range(header, 1000) == expected
+
+
+@pytest.mark.parametrize(
+	'header', [None, '', 'items=0-10', 'bytes=0-1,5-6', 'bytes=a-b']
+)
+def test_parse_range_serves_whole_file(header):
+	assert _parse_range(header, 1000) is None
+
+
+@pytest.mark.parametrize('header', ['bytes=1000-', 'bytes=20-10'])
+def test_parse_range_not_satisfiable(header):
+	with pytest.raises(ValueError):
+		_parse_range(header, 1000)
+
+
+def test_content_disposition():
+	assert content_disposition('lista 1.pdf', 'application/pdf') == (
+		"inline; filename*=UTF-8''lista%201.pdf"
+	)
+	assert content_disposition('notas.txt', 'text/plain').startswith('inline')
+	assert content_disposition('página.html', 'text/html') == (
+		"attachment; filename*=UTF-8''p%C3%A1gina.html"
+	)
@@ -0,0 +1,27 @@
+from datetime import UTC, datetime
+
+import pytest
+
+from app.utils.pagination import decode_cursor, encode_cursor
+
+
+def test_cursor_round_trip():
+	created_at = datetime(2024, 3, 1, 12, 30, 5, 123456, tzinfo=UTC)
+	cursor = encode_cursor(created_at, 42)
+
+	assert '=' not in cursor
+	assert decode_cursor(cursor) == (created_at, '42')
+
+
+def test_cursor_keeps_naive_datetimes():
+	created_at = datetime(2024, 3, 1, 12, 30)
+	assert decode_cursor(encode_cursor(created_at, 'a-b'))[0] == created_at
+
+
+@pytest.mark.parametrize(
+	'cursor',
+	['', 'not-base64!', encode_cursor(datetime(2024, 1, 1), 1)[:-3], 'WzFd'],
+)
+def test_malformed_cursor(cursor):
+	with pytest.raises(ValueError, match='Invalid cursor'):
+		decode_cursor(cursor)
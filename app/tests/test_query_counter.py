@@ -0,0 +1,92 @@
+import pytest
+
+# Modelos do pacote do banco e o SQLite assíncrono (extra test)
+pytest.importorskip('gpt_teacher_db')
+pytest.importorskip('aiosqlite')
+
+from gpt_teacher_db.gpt_teacher.models.chat_message import ChatMessageCreate
+from gpt_teacher_db.gpt_teacher.models.teacher import Teacher
+from sqlmodel import Session, select
+
+from app.core.config import settings
+from app.cruds import chat_message as message_crud
+from app.utils.pagination import PageParams
+from app.utils.query_counter import assert_max_queries, count_queries
+
+
+def _add_messages(engine, session_id: str, count: int) -> None:
+	with Session(engine) as session:
+		for index in range(count):
+			message_crud.create_chat_message(
+				session,
+				ChatMessageCreate(content=f'Mensagem {index}', role='user'),
+				session_id,
+			)
+
+
+def test_counts_and_repeated_statements(engines):
+	with Session(engines[0]) as session, count_queries() as stats:
+		for index in range(3):
+			session.exec(select(Teacher).where(Teacher.name == str(index)))
+
+	assert stats.count == 3
+	[(statement, times)] = stats.repeated(3)
+	assert statement.startswith('SELECT teacher.') and times == 3
+	assert stats.repeated(4) == []
+
+
+def test_assert_max_queries_reports_the_statements(engines):
+	with (
+		pytest.raises(AssertionError, match='at most 1 queries, got 2'),
+		Session(engines[0]) as session,
+		assert_max_queries(1),
+	):
+		session.exec(select(Teacher)).all()
+		session.exec(select(Teacher)).all()
+
+
+def test_message_list_queries_do_not_grow_with_messages(
+	client, engines, student_session
+):
+	session_id, headers = student_session
+	url = f'{settings.API_V1_STR}/student-session/{session_id}/chat-messages'
+
+	# Aluno, sessão, versão da lista (ETag) e a página
+	_add_messages(engines[0], session_id, 1)
+	with assert_max_queries(4):
+		response = client.get(url, headers=headers)
+	assert len(response.json()['items']) == 1
+
+	_add_messages(engines[0], session_id, 30)
+	with assert_max_queries(4):
+		response = client.get(url, headers=headers, params={'limit': 20})
+	assert response.status_code == 200
+	assert len(response.json()['items']) == 20
+
+
+def test_send_message_query_count(client, engines, student_session):
+	session_id, headers = student_session
+	url = (
+		f'{settings.API_V1_STR}/call-agent/student-session/'
+		f'{session_id}/chat-messages'
+	)
+	body = {
+		'problem_title': 'Soma de Dois Números',
+		'problem_description': 'Dado dois números, retorne a soma deles.',
+		'student_code': 'def soma(a, b):\n    return a - b',
+		'user_message': 'Meu código não funciona',
+		'session_id': session_id,
+	}
+
+	# Aluno e sessão; mensagem do aluno e a resposta, cada uma com o
+	# insert, as estatísticas e o refresh; e os metadados da resposta
+	with assert_max_queries(9):
+		response = client.post(url, headers=headers, json=body)
+	assert response.status_code == 200
+	assert response.json()['role'] == 'assistant'
+
+	with Session(engines[0]) as session:
+		page = message_crud.get_messages_by_session(
+			session, session_id, PageParams(limit=10)
+		)
+	assert [message.role for message in page.items] == ['user', 'assistant']
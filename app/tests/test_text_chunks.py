@@ -0,0 +1,44 @@
+import pytest
+
+from app.agents.problem_suggester import select_chunks
+from app.core.config import settings
+from app.utils import text_extraction
+from app.utils.text_extraction import chunk_text
+
+
+@pytest.fixture(autouse=True)
+def char_tokens(monkeypatch):
+	# Mesma contagem com ou sem tiktoken: ~4 caracteres por token
+	monkeypatch.setattr(
+		text_extraction, 'count_tokens', lambda text: max(1, len(text) // 4)
+	)
+
+
+def test_chunk_text_joins_paragraphs():
+	text = 'a' * 10 + '\n\n' + 'b' * 10 + '\n\n\n' + 'c' * 30
+	# 10 tokens ~ 40 caracteres
+	assert chunk_text(text, 10) == ['a' * 10 + '\n\n' + 'b' * 10, 'c' * 30]
+
+
+def test_chunk_text_cuts_long_paragraphs():
+	chunks = chunk_text('x' * 100, 10)
+	assert chunks == ['x' * 40, 'x' * 40, 'x' * 20]
+
+
+def test_chunk_text_skips_blank_text():
+	assert chunk_text('', 10) == []
+	assert chunk_text('\n\n  \n\n', 10) == []
+
+
+def test_select_chunks_keeps_everything_that_fits():
+	size = settings.PROBLEM_SUGGESTION_CHUNK_TOKENS
+	assert select_chunks(['a'] * 3, size * 3) == [0, 1, 2]
+	assert select_chunks([], size) == []
+
+
+def test_select_chunks_spreads_over_the_file():
+	size = settings.PROBLEM_SUGGESTION_CHUNK_TOKENS
+	assert select_chunks(['a'] * 10, size * 3) == [0, 4, 9]
+	assert select_chunks(['a'] * 10, size) == [0]
+	# Menos que um trecho de orçamento ainda manda o primeiro
+	assert select_chunks(['a'] * 10, 1) == [0]
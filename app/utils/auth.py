@@ -1,9 +1,17 @@
-from sqlmodel import Session, or_, select
+from fastapi import BackgroundTasks
+from sqlmodel import Session, or_, select, update
+from sqlmodel.ext.asyncio.session import AsyncSession
 
 from gpt_teacher_db.gpt_teacher.models.teacher import Teacher
 from gpt_teacher_db.gpt_teacher.models.student import Student
 
-from app.utils.security import verify_password
+from app.core.db import async_engine
+from app.utils.principal_cache import principal_cache
+from app.utils.security import (
+	acheck_password,
+	aget_password_hash,
+	verify_password,
+)
 
 
 def authenticate_teacher(
@@ -38,3 +46,85 @@ def authenticate_student(
 	if not verify_password(password, student.hashed_password):
 		return None
 	return student
+
+
+async def aupgrade_password_hash(
+	model: type[Teacher | Student],
+	user_id: str,
+	old_hash: str,
+	password: str,
+) -> None:
+	"""
+	Refaz o hash da senha no esquema/custo atual, após um login bem-sucedido.
+
+	Roda em background, com sessão própria. Só grava se o hash ainda for o
+	verificado, para não sobrescrever uma troca de senha concorrente.
+	"""
+	new_hash = await aget_password_hash(password)
+	async with AsyncSession(async_engine) as session:
+		await session.exec(
+			update(model)
+			.where(model.id == user_id, model.hashed_password == old_hash)
+			.values(hashed_password=new_hash)
+		)
+		await session.commit()
+	principal_cache.invalidate(model.__name__.lower(), str(user_id))
+
+
+async def _acheck_user_password(
+	user: Teacher | Student,
+	password: str,
+	background_tasks: BackgroundTasks | None,
+) -> bool:
+	valid, needs_update = await acheck_password(password, user.hashed_password)
+	if valid and needs_update and background_tasks is not None:
+		background_tasks.add_task(
+			aupgrade_password_hash,
+			type(user),
+			user.id,
+			user.hashed_password,
+			password,
+		)
+	return valid
+
+
+async def aauthenticate_teacher(
+	session: AsyncSession,
+	username: str,
+	password: str,
+	background_tasks: BackgroundTasks | None = None,
+) -> Teacher | None:
+	"""
+	Autentica um professor (sessão assíncrona, hash no pool de processos).
+	Com `background_tasks`, hashes antigos são refeitos após a resposta.
+	"""
+	statement = select(Teacher).where(Teacher.email == username)
+	teacher = (await session.exec(statement)).first()
+
+	if not teacher:
+		return None
+	if not await _acheck_user_password(teacher, password, background_tasks):
+		return None
+	return teacher
+
+
+async def aauthenticate_student(
+	session: AsyncSession,
+	username: str,
+	password: str,
+	background_tasks: BackgroundTasks | None = None,
+) -> Student | None:
+	"""
+	Autentica um aluno (sessão assíncrona, hash no pool de processos).
+	Com `background_tasks`, hashes antigos são refeitos após a resposta.
+	"""
+	statement = select(Student).where(
+		or_(Student.email == username, Student.registration_number == username)
+	)
+	student = (await session.exec(statement)).first()
+
+	if not student:
+		return None
+	if not await _acheck_user_password(student, password, background_tasks):
+		return None
+	return student
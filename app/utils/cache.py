@@ -0,0 +1,87 @@
+from collections import OrderedDict
+from collections.abc import Callable, Hashable
+from threading import Lock
+from time import monotonic
+from typing import Any
+
+
+def _expired(expires_at: float | None) -> bool:
+	return expires_at is not None and expires_at < monotonic()
+
+
+class LRUCache:
+	"""
+	Cache LRU em memória, limitado por quantidade de itens e thread-safe.
+
+	Com `ttl` (segundos), os itens também expiram após esse tempo.
+	Mantém contadores de hits/misses/evictions para monitoramento.
+	"""
+
+	def __init__(self, maxsize: int, ttl: float | None = None):
+		self.maxsize = maxsize
+		self.ttl = ttl
+		self._data: OrderedDict[Hashable, tuple[float | None, Any]] = (
+			OrderedDict()
+		)
+		self._lock = Lock()
+		self.hits = 0
+		self.misses = 0
+		self.evictions = 0
+
+	def get(self, key: Hashable) -> Any | None:
+		with self._lock:
+			item = self._data.get(key)
+			if item is not None and _expired(item[0]):
+				del self._data[key]
+				self.evictions += 1
+				item = None
+			if item is None:
+				self.misses += 1
+				return None
+			self._data.move_to_end(key)
+			self.hits += 1
+			return item[1]
+
+	def set(self, key: Hashable, value: Any, ttl: float | None = None) -> None:
+		"""`ttl` sobrescreve o TTL padrão do cache para este item"""
+		if self.maxsize <= 0:
+			return
+		ttl = ttl if ttl is not None else self.ttl
+		expires_at = monotonic() + ttl if ttl else None
+		with self._lock:
+			self._data[key] = (expires_at, value)
+			self._data.move_to_end(key)
+			while len(self._data) > self.maxsize:
+				self._data.popitem(last=False)
+				self.evictions += 1
+
+	def pop(self, key: Hashable) -> Any | None:
+		with self._lock:
+			item = self._data.pop(key, None)
+			return item[1] if item is not None else None
+
+	def discard_where(self, predicate: Callable[[Hashable], bool]) -> int:
+		"""Remove todas as chaves que satisfazem o predicado"""
+		with self._lock:
+			keys = [key for key in self._data if predicate(key)]
+			for key in keys:
+				del self._data[key]
+			return len(keys)
+
+	def clear(self) -> None:
+		with self._lock:
+			self._data.clear()
+
+	def __len__(self) -> int:
+		return len(self._data)
+
+	def stats(self) -> dict[str, int | float]:
+		lookups = self.hits + self.misses
+		return {
+			'size': len(self._data),
+			'maxsize': self.maxsize,
+			'hits': self.hits,
+			'misses': self.misses,
+			'evictions': self.evictions,
+			'hit_rate': self.hits / lookups if lookups else 0.0,
+		}
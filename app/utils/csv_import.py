@@ -0,0 +1,42 @@
+import csv
+import io
+
+
+class CSVImportError(ValueError):
+	"""Arquivo CSV inválido para importação"""
+
+
+def parse_csv(content: bytes, max_rows: int) -> list[dict[str, str]]:
+	"""
+	Lê um CSV com cabeçalho, separado por vírgula ou ponto e vírgula (como
+	exportam as planilhas em português). Os nomes das colunas ficam em
+	minúsculas e as linhas vazias são ignoradas.
+	"""
+	try:
+		text = content.decode('utf-8-sig')
+	except UnicodeDecodeError as error:
+		raise CSVImportError('CSV must be UTF-8 encoded') from error
+
+	try:
+		dialect = csv.Sniffer().sniff(text[:4096], delimiters=',;')
+	except csv.Error:
+		dialect = csv.excel
+
+	reader = csv.DictReader(io.StringIO(text), dialect=dialect)
+	if not reader.fieldnames:
+		raise CSVImportError('CSV header is missing')
+	reader.fieldnames = [name.strip().lower() for name in reader.fieldnames]
+
+	rows = []
+	for row in reader:
+		values = {
+			key: (value or '').strip()
+			for key, value in row.items()
+			if key is not None
+		}
+		if not any(values.values()):
+			continue
+		if len(rows) >= max_rows:
+			raise CSVImportError(f'CSV has more than {max_rows} rows')
+		rows.append(values)
+	return rows
@@ -0,0 +1,87 @@
+import asyncio
+import multiprocessing
+from collections.abc import Callable
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any
+
+from app.core.config import settings
+
+_executor: ProcessPoolExecutor | None = None
+_semaphore: asyncio.Semaphore | None = None
+_stats = {'waiting': 0, 'running': 0, 'completed': 0, 'max_depth': 0}
+
+
+def _noop() -> None:
+	return None
+
+
+def open_hash_pool() -> ProcessPoolExecutor | None:
+	"""
+	Cria o pool de processos para o hash de senhas (bcrypt), uma vez por
+	processo. Com PASSWORD_HASH_WORKERS=0 o hash roda em threads.
+
+	Os workers usam `spawn` (não herdam o event loop nem as conexões) e são
+	iniciados aqui, para o primeiro login não pagar o custo de subir um
+	processo.
+	"""
+	global _executor, _semaphore
+
+	if _executor is not None or settings.PASSWORD_HASH_WORKERS <= 0:
+		return _executor
+
+	_executor = ProcessPoolExecutor(
+		max_workers=settings.PASSWORD_HASH_WORKERS,
+		mp_context=multiprocessing.get_context('spawn'),
+	)
+	_semaphore = asyncio.Semaphore(settings.PASSWORD_HASH_MAX_PENDING)
+	for _ in range(settings.PASSWORD_HASH_WORKERS):
+		_executor.submit(_noop)
+	return _executor
+
+
+def close_hash_pool() -> None:
+	global _executor, _semaphore
+
+	if _executor is not None:
+		_executor.shutdown(wait=True, cancel_futures=True)
+	_executor = None
+	_semaphore = None
+
+
+async def run_in_hash_pool[T](func: Callable[..., T], *args: Any) -> T:
+	"""
+	Executa `func` (função de módulo, serializável) no pool de hash.
+
+	No máximo PASSWORD_HASH_MAX_PENDING chamadas ficam no executor; as
+	demais esperam aqui, e entram na profundidade da fila (`waiting`).
+	"""
+	executor = open_hash_pool()
+	if executor is None:
+		return await asyncio.to_thread(func, *args)
+
+	_stats['waiting'] += 1
+	_stats['max_depth'] = max(
+		_stats['max_depth'], _stats['waiting'] + _stats['running']
+	)
+	acquired = False
+	try:
+		async with _semaphore:
+			acquired = True
+			_stats['waiting'] -= 1
+			_stats['running'] += 1
+			try:
+				return await asyncio.get_running_loop().run_in_executor(
+					executor, func, *args
+				)
+			finally:
+				_stats['running'] -= 1
+				_stats['completed'] += 1
+	finally:
+		# Cancelada enquanto esperava a vez
+		if not acquired:
+			_stats['waiting'] -= 1
+
+
+def get_hash_pool_stats() -> dict[str, int]:
+	"""Profundidade da fila e chamadas concluídas, para monitoramento"""
+	return {'workers': settings.PASSWORD_HASH_WORKERS, **_stats}
@@ -0,0 +1,69 @@
+import asyncio
+from collections.abc import Iterator
+from contextlib import contextmanager
+
+
+class _Listener:
+	def __init__(self, loop: asyncio.AbstractEventLoop):
+		self._loop = loop
+		self._event = asyncio.Event()
+
+	def _wake(self) -> None:
+		# notify() pode vir de uma thread (rotas e cruds síncronos)
+		self._loop.call_soon_threadsafe(self._event.set)
+
+	async def wait(self, timeout: float) -> bool:
+		"""Espera uma notificação; False se o tempo acabar antes"""
+		try:
+			async with asyncio.timeout(timeout):
+				await self._event.wait()
+		except TimeoutError:
+			return False
+		self._event.clear()
+		return True
+
+
+class Notifier:
+	"""
+	Acorda as requisições que esperam novidades de uma chave (long-poll).
+
+	Vale só dentro do processo: com vários workers, quem espera deve
+	consultar o banco de tempos em tempos mesmo sem ser notificado. Uma
+	notificação entre `listen()` e `wait()` não se perde.
+	"""
+
+	def __init__(self):
+		self._listeners: dict[str, set[_Listener]] = {}
+		self.notifications = 0
+
+	@contextmanager
+	def listen(self, key: str) -> Iterator[_Listener]:
+		listener = _Listener(asyncio.get_running_loop())
+		self._listeners.setdefault(key, set()).add(listener)
+		try:
+			yield listener
+		finally:
+			listeners = self._listeners.get(key)
+			if listeners is not None:
+				listeners.discard(listener)
+				if not listeners:
+					del self._listeners[key]
+
+	def notify(self, key: str) -> None:
+		self.notifications += 1
+		for listener in list(self._listeners.get(key, ())):
+			listener._wake()
+
+	def stats(self) -> dict[str, int]:
+		return {
+			'keys': len(self._listeners),
+			'listeners': sum(map(len, self._listeners.values())),
+			'notifications': self.notifications,
+		}
+
+
+# Novas mensagens por sessão do aluno
+chat_notifier = Notifier()
+
+# Novas tarefas de consolidação (chave 'jobs')
+consolidation_notifier = Notifier()
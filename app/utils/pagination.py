@@ -0,0 +1,143 @@
+import base64
+import json
+from dataclasses import dataclass
+from datetime import datetime
+from functools import lru_cache
+from typing import Any
+
+from pydantic import BaseModel, create_model
+from sqlalchemy import tuple_
+from sqlmodel import Session
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+# Colunas sempre incluídas na projeção, pois formam o cursor
+CURSOR_FIELDS = ('id', 'created_at')
+
+
+class Page[T](BaseModel):
+	items: list[T]
+	next_cursor: str | None = None
+
+
+@dataclass(frozen=True)
+class PageParams:
+	limit: int
+	# (created_at, id) do último item da página anterior
+	after: tuple[datetime, str] | None = None
+	fields: tuple[str, ...] | None = None
+
+
+def encode_cursor(created_at: datetime, id: Any) -> str:
+	raw = json.dumps([created_at.isoformat(), str(id)])
+	return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, str]:
+	"""Decodifica o cursor; ValueError se estiver malformado"""
+	try:
+		padded = cursor + '=' * (-len(cursor) % 4)
+		created_at, id = json.loads(base64.urlsafe_b64decode(padded))
+		return datetime.fromisoformat(created_at), str(id)
+	except (TypeError, ValueError) as error:
+		raise ValueError('Invalid cursor') from error
+
+
+@lru_cache
+def partial_model(model: type[BaseModel]) -> type[BaseModel]:
+	"""
+	Versão do schema público com todos os campos opcionais, para respostas
+	com projeção (`fields=`). Usar com `response_model_exclude_unset=True`.
+	"""
+	fields = {
+		name: (field.annotation | None, None)
+		for name, field in model.model_fields.items()
+	}
+	return create_model(f'{model.__name__}Partial', **fields)
+
+
+def _coerce(column, value: Any) -> Any:
+	"""Converte o id do cursor para o tipo da coluna (ex.: UUID)"""
+	try:
+		return column.type.python_type(value)
+	except (NotImplementedError, TypeError, ValueError):
+		return value
+
+
+def _keyset_statement(
+	statement, model, params: PageParams, descending: bool
+):
+	key = tuple_(model.created_at, model.id)
+	if params.after is not None:
+		created_at, id = params.after
+		after = tuple_(created_at, _coerce(model.id, id))
+		statement = statement.where(key < after if descending else key > after)
+
+	statement = statement.order_by(
+		*(
+			column.desc() if descending else column.asc()
+			for column in (model.created_at, model.id)
+		)
+	).limit(params.limit + 1)
+
+	if params.fields:
+		statement = statement.with_only_columns(
+			*(getattr(model, name) for name in params.fields)
+		)
+	return statement
+
+
+def _build_page(rows: list, params: PageParams) -> Page:
+	next_cursor = None
+	if len(rows) > params.limit:
+		rows = rows[: params.limit]
+		last = rows[-1]
+		if params.fields:
+			next_cursor = encode_cursor(last['created_at'], last['id'])
+		else:
+			next_cursor = encode_cursor(last.created_at, last.id)
+
+	return Page(items=rows, next_cursor=next_cursor)
+
+
+def paginate(
+	session: Session,
+	statement,
+	model,
+	params: PageParams,
+	*,
+	descending: bool = False,
+) -> Page:
+	"""
+	Aplica paginação keyset em (created_at, id) a um select de `model`.
+
+	Busca `limit + 1` linhas para saber se há próxima página, sem COUNT nem
+	OFFSET. Com `params.fields`, só as colunas pedidas são lidas do banco e
+	os itens viram dicts.
+	"""
+	statement = _keyset_statement(statement, model, params, descending)
+	if params.fields:
+		# Só colunas: executa no Core, sem montar objetos do ORM
+		result = session.connection().execute(statement)
+		rows = [dict(row) for row in result.mappings().all()]
+	else:
+		rows = list(session.exec(statement).all())
+	return _build_page(rows, params)
+
+
+async def apaginate(
+	session: AsyncSession,
+	statement,
+	model,
+	params: PageParams,
+	*,
+	descending: bool = False,
+) -> Page:
+	"""Mesmo que `paginate`, em uma sessão assíncrona"""
+	statement = _keyset_statement(statement, model, params, descending)
+	if params.fields:
+		connection = await session.connection()
+		result = await connection.execute(statement)
+		rows = [dict(row) for row in result.mappings().all()]
+	else:
+		rows = list((await session.exec(statement)).all())
+	return _build_page(rows, params)
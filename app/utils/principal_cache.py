@@ -0,0 +1,123 @@
+import json
+import logging
+from threading import Lock
+from typing import Any
+
+from app.core.config import settings
+from app.utils.cache import LRUCache
+
+logger = logging.getLogger(__name__)
+
+REDIS_KEY_PREFIX = 'gpt-teacher:principal'
+
+
+class PrincipalCache:
+	"""
+	Cache do usuário autenticado (professor ou aluno), por (tipo, sub).
+
+	Guarda um snapshot (dict) das colunas do usuário, e não a instância do
+	ORM, que pertence à sessão que a carregou. Sem `redis_url` o cache é
+	local ao processo; com ele, é compartilhado entre os workers e a
+	invalidação vale para todos. Falhas do Redis contam como miss.
+	"""
+
+	def __init__(
+		self,
+		maxsize: int,
+		ttl: float,
+		redis_url: str | None,
+		negative_ttl: float | None = None,
+	):
+		self.ttl = ttl
+		self.negative_ttl = ttl if negative_ttl is None else negative_ttl
+		self._local = LRUCache(maxsize, ttl)
+		self._redis = None
+		if redis_url:
+			import redis
+
+			self._redis = redis.Redis.from_url(redis_url)
+		self._lock = Lock()
+		self.hits = 0
+		self.misses = 0
+		self.invalidations = 0
+
+	@property
+	def enabled(self) -> bool:
+		return self.ttl > 0
+
+	def _redis_key(self, kind: str, sub: str) -> str:
+		return f'{REDIS_KEY_PREFIX}:{kind}:{sub}'
+
+	def _count(self, hit: bool) -> None:
+		with self._lock:
+			if hit:
+				self.hits += 1
+			else:
+				self.misses += 1
+
+	def get(self, kind: str, sub: str) -> dict[str, Any] | None:
+		if not self.enabled:
+			return None
+
+		if self._redis is None:
+			snapshot = self._local.get((kind, sub))
+		else:
+			try:
+				raw = self._redis.get(self._redis_key(kind, sub))
+			except Exception:
+				logger.warning('Principal cache unavailable', exc_info=True)
+				raw = None
+			snapshot = json.loads(raw) if raw else None
+
+		self._count(snapshot is not None)
+		return snapshot
+
+	def set(self, kind: str, sub: str, snapshot: dict[str, Any]) -> None:
+		if not self.enabled:
+			return
+
+		# Snapshot vazio (sub inexistente) expira logo: o usuário pode ser
+		# criado em seguida, e não há invalidação para esse caso
+		ttl = self.ttl if snapshot else self.negative_ttl
+		if ttl <= 0:
+			return
+		if self._redis is None:
+			self._local.set((kind, sub), snapshot, ttl)
+			return
+		try:
+			self._redis.set(
+				self._redis_key(kind, sub),
+				json.dumps(snapshot),
+				px=int(ttl * 1000),
+			)
+		except Exception:
+			logger.warning('Principal cache unavailable', exc_info=True)
+
+	def invalidate(self, kind: str, sub: str) -> None:
+		with self._lock:
+			self.invalidations += 1
+		self._local.pop((kind, sub))
+		if self._redis is not None:
+			try:
+				self._redis.delete(self._redis_key(kind, sub))
+			except Exception:
+				logger.warning('Principal cache unavailable', exc_info=True)
+
+	def stats(self) -> dict[str, int | float | str]:
+		lookups = self.hits + self.misses
+		return {
+			'backend': 'local' if self._redis is None else 'redis',
+			'size': len(self._local),
+			'hits': self.hits,
+			'misses': self.misses,
+			'invalidations': self.invalidations,
+			'hit_rate': self.hits / lookups if lookups else 0.0,
+		}
+
+
+principal_cache = PrincipalCache(
+	maxsize=settings.AUTH_CACHE_SIZE,
+	ttl=settings.AUTH_CACHE_TTL_SECONDS,
+	redis_url=settings.AUTH_CACHE_REDIS_URL,
+	negative_ttl=settings.AUTH_CACHE_NEGATIVE_TTL_SECONDS,
+)
@@ -0,0 +1,168 @@
+import logging
+from collections import Counter
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from threading import Lock
+from time import perf_counter
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.datastructures import MutableHeaders
+
+from app.core.config import settings
+
+# Trecho do SQL mostrado nos logs e nas falhas de assert_max_queries
+STATEMENT_PREVIEW_CHARS = 200
+
+logger = logging.getLogger(__name__)
+
+
+class QueryStats:
+	"""Consultas SQL executadas (quantidade, tempo e SQL de cada uma)"""
+
+	def __init__(self):
+		self.count = 0
+		self.seconds = 0.0
+		self.statements: Counter[str] = Counter()
+		self._lock = Lock()
+
+	def add(self, statement: str, seconds: float) -> None:
+		# Cruds síncronos rodam em threads do pool
+		with self._lock:
+			self.count += 1
+			self.seconds += seconds
+			self.statements[statement] += 1
+
+	def repeated(self, threshold: int) -> list[tuple[str, int]]:
+		"""
+		SQL executado `threshold` vezes ou mais (os parâmetros ficam fora do
+		texto): em geral uma consulta por item de uma lista (N+1)
+		"""
+		return [
+			(statement, count)
+			for statement, count in self.statements.most_common()
+			if count >= threshold
+		]
+
+	def summary(self) -> str:
+		return '\n'.join(
+			f'{count}x {_preview(statement)}'
+			for statement, count in self.statements.most_common()
+		)
+
+
+# Contadores ativos: o do teste e o da requisição contam a mesma consulta
+_active: ContextVar[tuple[QueryStats, ...]] = ContextVar(
+	'query_counter_active', default=()
+)
+
+
+def _preview(statement: str) -> str:
+	statement = ' '.join(statement.split())
+	if len(statement) <= STATEMENT_PREVIEW_CHARS:
+		return statement
+	return statement[:STATEMENT_PREVIEW_CHARS] + '...'
+
+
+def _before_cursor_execute(
+	conn, cursor, statement, parameters, context, executemany
+):
+	conn.info.setdefault('query_counter_start', []).append(perf_counter())
+
+
+def _after_cursor_execute(
+	conn, cursor, statement, parameters, context, executemany
+):
+	start = conn.info['query_counter_start'].pop()
+	active = _active.get()
+	if not active:
+		return
+	elapsed = perf_counter() - start
+	for stats in active:
+		stats.add(statement, elapsed)
+
+
+def _handle_error(exception_context):
+	# Sem after_cursor_execute quando a consulta falha
+	starts = exception_context.connection.info.get('query_counter_start')
+	if starts:
+		starts.pop()
+
+
+def install_query_counter(engine: Engine) -> None:
+	"""
+	Conta as consultas do engine (no AsyncEngine, passar `sync_engine`).
+	Fora de count_queries e do middleware só mede o tempo e descarta.
+	"""
+	if event.contains(engine, 'after_cursor_execute', _after_cursor_execute):
+		return
+	event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+	event.listen(engine, 'after_cursor_execute', _after_cursor_execute)
+	event.listen(engine, 'handle_error', _handle_error)
+
+
+@contextmanager
+def count_queries() -> Iterator[QueryStats]:
+	"""Conta as consultas executadas dentro do bloco (inclusive em threads)"""
+	stats = QueryStats()
+	token = _active.set((*_active.get(), stats))
+	try:
+		yield stats
+	finally:
+		_active.reset(token)
+
+
+@contextmanager
+def assert_max_queries(limit: int) -> Iterator[QueryStats]:
+	"""
+	Falha (AssertionError) se o bloco executar mais de `limit` consultas.
+	Para testes e CI, em volta de uma chamada do TestClient:
+
+		with assert_max_queries(4):
+			client.get('/api/v1/classrooms/')
+	"""
+	with count_queries() as stats:
+		yield stats
+	if stats.count > limit:
+		raise AssertionError(
+			f'Expected at most {limit} queries, got {stats.count}:\n'
+			f'{stats.summary()}'
+		)
+
+
+class QueryCountMiddleware:
+	"""
+	Conta as consultas SQL de cada requisição: headers `X-DB-Queries` e
+	`X-DB-Time-Ms` (até o início da resposta; em streaming, o resto vai só
+	para o log) e aviso no log de SQL repetido (N+1)
+	"""
+
+	def __init__(self, app):
+		self.app = app
+
+	async def __call__(self, scope, receive, send):
+		if scope['type'] != 'http':
+			await self.app(scope, receive, send)
+			return
+
+		async def send_with_counts(message):
+			if message['type'] == 'http.response.start':
+				headers = MutableHeaders(scope=message)
+				headers.append('X-DB-Queries', str(stats.count))
+				headers.append('X-DB-Time-Ms', f'{stats.seconds * 1000:.1f}')
+			await send(message)
+
+		with count_queries() as stats:
+			await self.app(scope, receive, send_with_counts)
+
+		threshold = settings.QUERY_COUNTER_REPEAT_THRESHOLD
+		for statement, count in stats.repeated(threshold):
+			route = getattr(scope.get('route'), 'path', None) or scope['path']
+			logger.warning(
+				'SQL repetido %sx em %s %s (N+1?): %s',
+				count,
+				scope['method'],
+				route,
+				_preview(statement),
+			)
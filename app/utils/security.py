@@ -1,3 +1,5 @@
+import asyncio
+import hashlib
 from datetime import datetime, timedelta
 
 import jwt
@@ -5,8 +7,51 @@ from passlib.context import CryptContext
 from pydantic import BaseModel
 
 from app.core.config import settings
+from app.utils.hash_pool import run_in_hash_pool
+
+# Esquemas aceitos na verificação; o configurado gera os novos hashes e os
+# demais são marcados como obsoletos (refeitos no próximo login)
+PASSWORD_SCHEMES = ['bcrypt_sha256', 'argon2', 'bcrypt']
+
+# bcrypt puro ($2a$, $2b$, $2y$), sem identificação do esquema: o do antigo
+# security.py (senha direta) e o do security_v2 (pré-hash SHA-256) têm o
+# mesmo formato. PASSWORD_LEGACY_BCRYPT_FORMAT diz qual deles verificar
+LEGACY_BCRYPT_PREFIXES = ('$2a$', '$2b$', '$2y$')
+LEGACY_BCRYPT_FORMATS = ('bcrypt', 'sha256', 'both')
+
+
+def _build_pwd_context() -> CryptContext:
+	scheme = settings.PASSWORD_HASH_SCHEME
+	if scheme not in PASSWORD_SCHEMES:
+		raise ValueError(f'Unknown password hash scheme: {scheme}')
+	legacy_format = settings.PASSWORD_LEGACY_BCRYPT_FORMAT
+	if legacy_format not in LEGACY_BCRYPT_FORMATS:
+		raise ValueError(f'Unknown legacy bcrypt format: {legacy_format}')
+
+	# Custo fixo: hashes com custo diferente (maior ou menor) são refeitos
+	rounds = settings.BCRYPT_ROUNDS
+	return CryptContext(
+		schemes=PASSWORD_SCHEMES,
+		default=scheme,
+		deprecated='auto',
+		bcrypt__rounds=rounds,
+		bcrypt__min_rounds=rounds,
+		bcrypt__max_rounds=rounds,
+		bcrypt_sha256__rounds=rounds,
+		bcrypt_sha256__min_rounds=rounds,
+		bcrypt_sha256__max_rounds=rounds,
+		argon2__time_cost=settings.ARGON2_TIME_COST,
+		argon2__memory_cost=settings.ARGON2_MEMORY_COST,
+		argon2__parallelism=settings.ARGON2_PARALLELISM,
+	)
+
 
-pwd_context = CryptContext(schemes=['bcrypt'], deprecated='auto')
+pwd_context = _build_pwd_context()
+
+# Lotes do cadastro em massa no pool ao mesmo tempo, somando todas as
+# importações do processo: um por worker, para os logins que chegam entre
+# um lote e outro não esperarem a importação inteira
+_bulk_hash_slots = asyncio.Semaphore(max(1, settings.PASSWORD_HASH_WORKERS))
 
 ALGORITHM = 'HS256'
 
@@ -52,9 +97,92 @@ def decode_jwt_token(token: str, verify_exp: bool = True) -> TokenPayload:
 	return TokenPayload(**payload)
 
 
+def _legacy_prehash(password: str) -> str:
+	"""Pré-hash do antigo security_v2: SHA-256 (hex) da senha"""
+	return hashlib.sha256(password.encode()).hexdigest()
+
+
+def check_password(
+	plain_password: str, hashed_password: str
+) -> tuple[bool, bool]:
+	"""
+	Verifica a senha contra qualquer formato já usado no projeto.
+
+	Retorna (senha correta, hash precisa ser refeito no esquema/custo atual).
+	O prefixo do hash escolhe a verificação, então só um bcrypt roda (dois
+	para bcrypt puro com PASSWORD_LEGACY_BCRYPT_FORMAT='both').
+	"""
+	try:
+		if not hashed_password.startswith(LEGACY_BCRYPT_PREFIXES):
+			correct = pwd_context.verify(plain_password, hashed_password)
+			return correct, correct and pwd_context.needs_update(
+				hashed_password
+			)
+
+		legacy_format = settings.PASSWORD_LEGACY_BCRYPT_FORMAT
+		if legacy_format != 'sha256' and pwd_context.verify(
+			plain_password, hashed_password
+		):
+			return True, pwd_context.needs_update(hashed_password)
+		if legacy_format != 'bcrypt' and pwd_context.verify(
+			_legacy_prehash(plain_password), hashed_password
+		):
+			# Pré-hash do security_v2: sempre refeito
+			return True, True
+	except ValueError:
+		pass
+	return False, False
+
+
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-	return pwd_context.verify(plain_password, hashed_password)
+	return check_password(plain_password, hashed_password)[0]
 
 
 def get_password_hash(password: str) -> str:
 	return pwd_context.hash(password)
+
+
+async def averify_password(plain_password: str, hashed_password: str) -> bool:
+	"""verify_password fora do event loop, no pool de processos de hash"""
+	return await run_in_hash_pool(
+		verify_password, plain_password, hashed_password
+	)
+
+
+async def acheck_password(
+	plain_password: str, hashed_password: str
+) -> tuple[bool, bool]:
+	"""check_password fora do event loop, no pool de processos de hash"""
+	return await run_in_hash_pool(
+		check_password, plain_password, hashed_password
+	)
+
+
+async def aget_password_hash(password: str) -> str:
+	"""get_password_hash fora do event loop, no pool de processos de hash"""
+	return await run_in_hash_pool(get_password_hash, password)
+
+
+def get_password_hashes(passwords: list[str]) -> list[str]:
+	return [pwd_context.hash(password) for password in passwords]
+
+
+async def _ahash_chunk(passwords: list[str]) -> list[str]:
+	async with _bulk_hash_slots:
+		return await run_in_hash_pool(get_password_hashes, passwords)
+
+
+async def aget_password_hashes(
+	passwords: list[str], chunk_size: int = 8
+) -> list[str]:
+	"""
+	Hash de várias senhas (cadastro em lote), em lotes de `chunk_size`. No
+	máximo um lote por worker fica no pool; logins entram na fila entre os
+	lotes e esperam no máximo um lote por worker.
+	"""
+	chunks = [
+		passwords[start : start + chunk_size]
+		for start in range(0, len(passwords), chunk_size)
+	]
+	results = await asyncio.gather(*(_ahash_chunk(chunk) for chunk in chunks))
+	return [hashed for chunk in results for hashed in chunk]
@@ -0,0 +1,252 @@
+import inspect
+import logging
+from bisect import bisect_left
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import lru_cache, wraps
+from threading import Lock
+from time import perf_counter
+
+from starlette.datastructures import MutableHeaders
+
+from app.core.config import settings
+
+# Limites dos buckets (segundos), de consultas rápidas a chamadas ao LLM
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+logger = logging.getLogger(__name__)
+
+
+def _escape(value: str) -> str:
+	return value.replace('\\', '\\\\').replace('"', '\\"')
+
+
+class Histogram:
+	"""Histograma acumulado no processo, exportado no formato Prometheus"""
+
+	def __init__(self, name: str, help: str, labels: tuple[str, ...]):
+		self.name = name
+		self.help = help
+		self.labels = labels
+		# labels -> (contagem por bucket, soma, total)
+		self._series: dict[tuple[str, ...], list] = {}
+		self._lock = Lock()
+
+	def observe(self, labels: tuple[str, ...], value: float) -> None:
+		index = bisect_left(BUCKETS, value)
+		with self._lock:
+			series = self._series.get(labels)
+			if series is None:
+				series = self._series[labels] = [[0] * len(BUCKETS), 0.0, 0]
+			if index < len(BUCKETS):
+				series[0][index] += 1
+			series[1] += value
+			series[2] += 1
+
+	def _format_labels(self, values: tuple[str, ...], **extra: str) -> str:
+		pairs = [*zip(self.labels, values), *extra.items()]
+		labels = ','.join(
+			f'{name}="{_escape(value)}"' for name, value in pairs
+		)
+		return '{' + labels + '}'
+
+	def render(self) -> list[str]:
+		lines = [
+			f'# HELP {self.name} {self.help}',
+			f'# TYPE {self.name} histogram',
+		]
+		with self._lock:
+			series = {
+				labels: (list(buckets), total, count)
+				for labels, (buckets, total, count) in self._series.items()
+			}
+		for labels, (buckets, total, count) in sorted(series.items()):
+			cumulative = 0
+			for bound, hits in zip(BUCKETS, buckets):
+				cumulative += hits
+				label = self._format_labels(labels, le=str(bound))
+				lines.append(f'{self.name}_bucket{label} {cumulative}')
+			label = self._format_labels(labels, le='+Inf')
+			lines.append(f'{self.name}_bucket{label} {count}')
+			label = self._format_labels(labels)
+			lines.append(f'{self.name}_sum{label} {total}')
+			lines.append(f'{self.name}_count{label} {count}')
+		return lines
+
+
+request_duration = Histogram(
+	'http_request_duration_seconds',
+	'Duração das requisições HTTP por rota',
+	('method', 'route', 'status'),
+)
+stage_duration = Histogram(
+	'stage_duration_seconds',
+	'Duração por etapa (auth, db, checkpoint, agent, llm) e operação',
+	('stage', 'name'),
+)
+
+
+def render_metrics() -> str:
+	lines = [*request_duration.render(), *stage_duration.render()]
+	return '\n'.join(lines) + '\n'
+
+
+class _RequestTimings:
+	"""Tempo total de cada etapa dentro de uma requisição"""
+
+	def __init__(self):
+		self.stages: dict[str, float] = {}
+		self._lock = Lock()
+
+	def add(self, stage: str, seconds: float) -> None:
+		# Cruds síncronos rodam em threads do pool
+		with self._lock:
+			self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+
+	def server_timing(self, total: float) -> str:
+		entries = [
+			f'{stage};dur={seconds * 1000:.1f}'
+			for stage, seconds in self.stages.items()
+		]
+		entries.append(f'total;dur={total * 1000:.1f}')
+		return ', '.join(entries)
+
+
+_request: ContextVar[_RequestTimings | None] = ContextVar(
+	'telemetry_request', default=None
+)
+# Etapas em andamento: uma consulta dentro de outra conta uma vez só
+_active: ContextVar[frozenset[str]] = ContextVar(
+	'telemetry_active', default=frozenset()
+)
+
+
+@lru_cache(maxsize=1)
+def _get_tracer():
+	"""Tracer do OpenTelemetry (extra opcional), se habilitado"""
+	if not settings.TELEMETRY_OTEL_ENABLED:
+		return None
+	from opentelemetry import trace
+
+	return trace.get_tracer('gpt-teacher-backend')
+
+
+@contextmanager
+def _timed(stage: str, name: str) -> Iterator[None]:
+	active = _active.get()
+	token = _active.set(active | {stage})
+	start = perf_counter()
+	try:
+		yield
+	finally:
+		elapsed = perf_counter() - start
+		_active.reset(token)
+		stage_duration.observe((stage, name), elapsed)
+		timings = _request.get()
+		if timings is not None and stage not in active:
+			timings.add(stage, elapsed)
+
+
+@contextmanager
+def span(stage: str, name: str) -> Iterator[None]:
+	"""
+	Mede um trecho da etapa `stage`: histograma por operação, total da
+	etapa na requisição atual e, com OpenTelemetry, um span
+	"""
+	tracer = _get_tracer()
+	if tracer is None:
+		with _timed(stage, name):
+			yield
+		return
+	with (
+		tracer.start_as_current_span(
+			f'{stage} {name}', attributes={'stage': stage}
+		),
+		_timed(stage, name),
+	):
+		yield
+
+
+def traced(stage: str, name: str | None = None) -> Callable:
+	"""
+	Decorador: mede cada chamada da função (síncrona ou async). O nome
+	padrão é `<módulo>.<função>`, ex.: 'problem.get_problem_by_id'
+	"""
+
+	def decorator(func: Callable) -> Callable:
+		module = func.__module__.rsplit('.', 1)[-1]
+		label = name or f'{module}.{func.__name__}'
+
+		if inspect.iscoroutinefunction(func):
+
+			@wraps(func)
+			async def async_wrapper(*args, **kwargs):
+				with span(stage, label):
+					return await func(*args, **kwargs)
+
+			return async_wrapper
+
+		@wraps(func)
+		def wrapper(*args, **kwargs):
+			with span(stage, label):
+				return func(*args, **kwargs)
+
+		return wrapper
+
+	return decorator
+
+
+class TelemetryMiddleware:
+	"""
+	Mede cada requisição: histograma por rota, header `Server-Timing` com o
+	tempo de cada etapa e log das requisições lentas
+	"""
+
+	def __init__(self, app):
+		self.app = app
+
+	async def __call__(self, scope, receive, send):
+		if scope['type'] != 'http':
+			await self.app(scope, receive, send)
+			return
+
+		timings = _RequestTimings()
+		token = _request.set(timings)
+		start = perf_counter()
+		status = 500
+
+		async def send_with_timing(message):
+			nonlocal status
+			if message['type'] == 'http.response.start':
+				status = message['status']
+				if settings.TELEMETRY_SERVER_TIMING:
+					headers = MutableHeaders(scope=message)
+					headers.append(
+						'Server-Timing',
+						timings.server_timing(perf_counter() - start),
+					)
+			await send(message)
+
+		try:
+			await self.app(scope, receive, send_with_timing)
+		finally:
+			_request.reset(token)
+			elapsed = perf_counter() - start
+			# Template da rota (sem ids), para não explodir as séries
+			route = getattr(scope.get('route'), 'path', None) or 'unmatched'
+			request_duration.observe(
+				(scope['method'], route, str(status)), elapsed
+			)
+			if elapsed >= settings.TELEMETRY_SLOW_REQUEST_SECONDS:
+				logger.warning(
+					'Requisição lenta: %s %s status=%s total=%.3fs %s',
+					scope['method'],
+					route,
+					status,
+					elapsed,
+					' '.join(
+						f'{stage}={seconds:.3f}s'
+						for stage, seconds in timings.stages.items()
+					),
+				)
@@ -0,0 +1,129 @@
+import asyncio
+import io
+import multiprocessing
+import re
+from concurrent.futures import ProcessPoolExecutor
+
+from app.core.config import settings
+from app.llm.tokens import count_tokens
+
+TEXT_EXTENSIONS = ('.txt', '.md', '.markdown')
+
+_PARAGRAPH_RE = re.compile(r'\n\s*\n')
+
+_executor: ProcessPoolExecutor | None = None
+
+
+class UnsupportedFileError(ValueError):
+	"""Arquivo sem texto que possa ser extraído"""
+
+
+def _extract_pdf(content: bytes, max_pages: int) -> str:
+	try:
+		from pypdf import PdfReader
+		from pypdf.errors import PdfReadError, PdfStreamError
+	except ImportError as error:
+		raise UnsupportedFileError(
+			'PDF support is not installed (pdf extra)'
+		) from error
+
+	try:
+		reader = PdfReader(io.BytesIO(content))
+		pages = reader.pages[:max_pages]
+		return '\n\n'.join(page.extract_text() or '' for page in pages)
+	except (PdfReadError, PdfStreamError) as error:
+		# Mensagem simples: a exceção do pypdf volta de outro processo
+		raise UnsupportedFileError(f'Could not read PDF: {error}') from None
+
+
+def extract_text(content: bytes, filename: str, max_pages: int) -> str:
+	name = filename.lower()
+	if name.endswith('.pdf'):
+		return _extract_pdf(content, max_pages)
+	if name.endswith(TEXT_EXTENSIONS):
+		return content.decode('utf-8-sig', errors='replace')
+	raise UnsupportedFileError(
+		'Only PDF, Markdown and text files are supported'
+	)
+
+
+def _split_paragraph(paragraph: str, chunk_tokens: int) -> list[str]:
+	"""Corta o parágrafo em pedaços de até ~`chunk_tokens` tokens"""
+	tokens = count_tokens(paragraph)
+	if tokens <= chunk_tokens:
+		return [paragraph]
+	# Corte por caracteres, na proporção de tokens do próprio parágrafo
+	size = max(1, len(paragraph) * chunk_tokens // tokens)
+	return [
+		paragraph[start : start + size]
+		for start in range(0, len(paragraph), size)
+	]
+
+
+def chunk_text(text: str, chunk_tokens: int) -> list[str]:
+	"""
+	Divide o texto em trechos de até `chunk_tokens` tokens, juntando
+	parágrafos inteiros; parágrafos maiores que isso são cortados
+	"""
+	pieces = []
+	for paragraph in _PARAGRAPH_RE.split(text):
+		paragraph = paragraph.strip()
+		if paragraph:
+			pieces.extend(_split_paragraph(paragraph, chunk_tokens))
+
+	chunks, current, used = [], [], 0
+	for piece in pieces:
+		size = count_tokens(piece)
+		if current and used + size > chunk_tokens:
+			chunks.append('\n\n'.join(current))
+			current, used = [], 0
+		current.append(piece)
+		used += size
+	if current:
+		chunks.append('\n\n'.join(current))
+	return chunks
+
+
+def extract_chunks(
+	content: bytes, filename: str, max_pages: int, chunk_tokens: int
+) -> list[str]:
+	"""Extrai e divide o texto (roda no pool de processos)"""
+	return chunk_text(extract_text(content, filename, max_pages), chunk_tokens)
+
+
+def close_extraction_pool() -> None:
+	global _executor
+
+	if _executor is not None:
+		_executor.shutdown(wait=True, cancel_futures=True)
+	_executor = None
+
+
+def _get_executor() -> ProcessPoolExecutor | None:
+	"""
+	Processos criados na primeira sugestão (uso esporádico); com
+	PROBLEM_SUGGESTION_WORKERS=0 a extração roda em threads
+	"""
+	global _executor
+
+	if _executor is None and settings.PROBLEM_SUGGESTION_WORKERS > 0:
+		_executor = ProcessPoolExecutor(
+			max_workers=settings.PROBLEM_SUGGESTION_WORKERS,
+			mp_context=multiprocessing.get_context('spawn'),
+		)
+	return _executor
+
+
+async def aextract_chunks(content: bytes, filename: str) -> list[str]:
+	"""
+	Extração fora do event loop e da thread da requisição: um PDF grande
+	ocupa um processo do pool, não o servidor
+	"""
+	return await asyncio.get_running_loop().run_in_executor(
+		_get_executor(),
+		extract_chunks,
+		content,
+		filename,
+		settings.PROBLEM_SUGGESTION_MAX_PAGES,
+		settings.PROBLEM_SUGGESTION_CHUNK_TOKENS,
+	)